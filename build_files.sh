@@ -16,4 +16,7 @@ python manage.py create_sample_data
 # Collect static files for WhiteNoise
 python manage.py collectstatic --noinput --clear
 
+# Generate the OpenAPI schema once, as hashed files served from STATIC_ROOT
+python manage.py build_openapi_schema
+
 echo "Build completed successfully!"
@@ -1,35 +1,112 @@
 from django.contrib import admin
-from .models import Author, Book, Member, BorrowRecord
+from .models import Author, Book, Member, BorrowRecord, Hold
+from .pagination import EstimatedCountPaginator
+from .search import search_books
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: no exact
+    ``COUNT(*)`` of the page's result or of the whole table, and no facet
+    counts per filter choice.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+def prefix_range(field, prefix):
+    """Lookups matching ``field`` values that start with ``prefix``, as an index range scan."""
+    return {f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'}
+
+
+def search_members(queryset, search_term):
+    """Members matching an id, an exact email or the start of a name, each through an index."""
+    search_term = search_term.strip()
+    if not search_term:
+        return queryset
+    if search_term.isdigit():
+        return queryset.filter(pk=search_term)
+    if '@' in search_term:
+        return queryset.filter(email=search_term)
+    return queryset.filter(**prefix_range('name', search_term))
 
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ['name', 'books_count']
     search_fields = ['name']
+    search_help_text = 'Start of the author name'
 
+    @admin.display(description='Number of Books', ordering='books_count')
     def books_count(self, obj):
-        return obj.books.count()
-    books_count.short_description = 'Number of Books'
+        # Denormalized counter, so no per-row COUNT query
+        return obj.books_count
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the normalized_name index instead of LIKE scans over search_fields
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(**prefix_range('normalized_name', Author.normalize_name(search_term))), False
 
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdmin):
     list_display = ['title', 'author', 'isbn', 'category', 'availability_status']
+    list_select_related = ['author']
     list_filter = ['category', 'availability_status']
+    ordering = ['-id']
     search_fields = ['title', 'author__name', 'isbn']
     autocomplete_fields = ['author']
 
+    def get_queryset(self, request):
+        # Book.__str__, as listed by autocomplete, includes the author's name
+        return super().get_queryset(request).select_related('author')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the full-text index instead of LIKE scans over search_fields
+        return search_books(queryset, search_term), False
+
 
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'membership_date']
+class MemberAdmin(LargeTableAdmin):
+    list_display = ['name', 'email', 'membership_date', 'active_loans_count']
     list_filter = ['membership_date']
+    ordering = ['name', 'id']
     search_fields = ['name', 'email']
+    search_help_text = 'Member id, exact email or start of the name'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by indexes instead of LIKE scans over search_fields
+        return search_members(queryset, search_term), False
 
 
 @admin.register(BorrowRecord)
-class BorrowRecordAdmin(admin.ModelAdmin):
+class BorrowRecordAdmin(LargeTableAdmin):
     list_display = ['book', 'member', 'borrow_date', 'return_date']
+    # Book.__str__ includes the author's name
+    list_select_related = ['book__author', 'member']
     list_filter = ['borrow_date']
     search_fields = ['book__title', 'member__name']
+    search_help_text = 'Loan or member id, member email, start of the member name or words of the book title'
+    autocomplete_fields = ['book', 'member']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Find the members and books first, then their loans through the
+        # (member, borrow_date, id) and book indexes
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=search_term) | queryset.filter(member_id=search_term), False
+        members = search_members(Member.objects.all(), search_term).values('pk')
+        books = search_books(Book.objects.all(), search_term).values('pk')
+        return queryset.filter(member__in=members) | queryset.filter(book__in=books), False
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ['book', 'member', 'position', 'created_at']
+    list_select_related = ['book__author', 'member']
+    ordering = ['book', 'position']
     autocomplete_fields = ['book', 'member']
@@ -0,0 +1,11 @@
+from django.urls import path, include
+
+from .async_views import AsyncReadRouter
+from .urls import router
+
+async_router = AsyncReadRouter()
+async_router.registry.extend(router.registry)
+
+urlpatterns = [
+    path('', include(async_router.urls)),
+]
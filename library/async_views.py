@@ -0,0 +1,158 @@
+"""
+Native async read path for the library ViewSets under ASGI.
+
+DRF views are synchronous, so under ASGI every request is run in a worker
+thread for its whole duration, including the slow database round trips.
+``AsyncReadRouter`` routes GET/HEAD ``list`` and ``retrieve`` requests of
+ViewSets using ``AsyncReadMixin`` to coroutines instead: authentication,
+permission checks, serialization and rendering run on the event loop, and
+only the queries themselves leave it, through Django's async ORM. Every
+other request falls back to the regular synchronous view.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+class AsyncReadMixin:
+    """Adds ``alist`` and ``aretrieve`` coroutines to a ViewSet."""
+    async_reads = False
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not initkwargs.get('async_reads') or actions.get('get') not in READ_ACTIONS:
+            return view
+
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(view)(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = view.actions
+            for method, action in view.actions.items():
+                setattr(self, method, getattr(self, action))
+            return await self.adispatch(view, request, *args, **kwargs)
+
+        return async_view
+
+    async def adispatch(self, sync_view, request, *args, **kwargs):
+        """Async counterpart of ``APIView.dispatch`` for read actions."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.format_kwarg = self.get_format_suffix(**kwargs)
+            request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+            # The browsable API renders forms that query the database synchronously
+            if not isinstance(request.accepted_renderer, JSONRenderer):
+                return await sync_to_async(sync_view)(request._request, *args, **kwargs)
+
+            # Anonymous until authenticated, so error handling never falls
+            # back to DRF's synchronous authentication
+            request.user, request.auth = AnonymousUser(), None
+            request.user, request.auth = await self.aauthenticate(request)
+            self.check_permissions(request)
+            self.check_throttles(request)
+            await self.ainitial(request, *args, **kwargs)
+
+            handler = self.alist if self.action == 'list' else self.aretrieve
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render_response(response)
+
+    async def ainitial(self, request, *args, **kwargs):
+        """
+        Hook for work to await once the request is authenticated and
+        permitted, such as the lookups ``get_queryset`` relies on: it runs on
+        the event loop, where only the async ORM may query the database.
+        """
+
+    async def aauthenticate(self, request):
+        """Return ``(user, auth)`` for the request without blocking the event loop."""
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                result = await authenticator.aauthenticate(request)
+            elif isinstance(authenticator, SessionAuthentication):
+                # CSRF is only enforced for unsafe methods, which never get here
+                user = await request._request.auser()
+                result = (user, None) if user.is_active else None
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+
+            if result is not None:
+                request._authenticator = authenticator
+                return result
+
+        return AnonymousUser(), None
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # Pagination evaluates the page slice synchronously, so it is run as
+        # a single async ORM-style call rather than one hop per statement
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    async def aget_object(self):
+        """Async counterpart of ``GenericAPIView.get_object``."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def render_response(self, response):
+        """
+        Render a DRF response into a plain ``HttpResponse``, as Django would
+        otherwise hand the deferred rendering to a worker thread.
+        """
+        if not isinstance(response, Response):
+            return response
+
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+
+class AsyncReadRouter(DefaultRouter):
+    """``DefaultRouter`` serving ``AsyncReadMixin`` reads from coroutines."""
+
+    def get_routes(self, viewset):
+        routes = super().get_routes(viewset)
+        if not issubclass(viewset, AsyncReadMixin):
+            return routes
+        return [route._replace(initkwargs={**route.initkwargs, 'async_reads': True}) for route in routes]
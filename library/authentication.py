@@ -0,0 +1,203 @@
+"""
+JWT authentication for the library API.
+
+Access tokens carry the user's role (``is_staff``) and linked ``member_id``
+as claims, so ``StatelessJWTAuthentication`` can authenticate a request
+with a ``TokenUser`` built from the token alone. Tokens also carry a
+``token_version``: a keyed digest of the user's password hash, active
+flag, role and member id. It is compared against the current version,
+which is cached in-process for ``TOKEN_VERSION_TTL`` seconds, so changing
+or deactivating a user revokes their tokens within that window without a
+query per request.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import models as jwt_models, serializers as jwt_serializers, tokens
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+VERSION_CLAIM = 'token_version'
+VERSION_FIELDS = ('password', 'is_active', 'is_staff', 'member_profile__id')
+MAX_CACHED_VERSIONS = 10000
+
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _version_ttl():
+    return getattr(settings, 'TOKEN_VERSION_TTL', 30)
+
+
+def _compute_version(password, is_active, is_staff, member_id):
+    if not is_active:
+        return None
+    value = f'{password}:{is_active}:{is_staff}:{member_id}'
+    return salted_hmac('library.authentication.token_version', value).hexdigest()[:16]
+
+
+def _versions_query(user_id):
+    return User.objects.filter(pk=user_id).values_list(*VERSION_FIELDS)
+
+
+def _remember_version(user_id, row):
+    version = _compute_version(*row) if row is not None else None
+    with _versions_lock:
+        if len(_versions) >= MAX_CACHED_VERSIONS:
+            _versions.clear()
+        _versions[user_id] = (version, time.monotonic())
+    return version
+
+
+def _cached_version(user_id):
+    """Return ``(hit, version)`` from the in-process cache."""
+    entry = _versions.get(user_id)
+    if entry is None or entry[1] + _version_ttl() <= time.monotonic():
+        return False, None
+    return True, entry[0]
+
+
+def get_token_version(user_id):
+    """The current token version of a user, or ``None`` if the user is inactive or gone."""
+    hit, version = _cached_version(user_id)
+    if hit:
+        return version
+    return _remember_version(user_id, _versions_query(user_id).first())
+
+
+async def aget_token_version(user_id):
+    """Async counterpart of ``get_token_version``."""
+    hit, version = _cached_version(user_id)
+    if hit:
+        return version
+    return _remember_version(user_id, await _versions_query(user_id).afirst())
+
+
+def forget_token_version(user_id):
+    """Drop a user's cached token version, so this process re-reads it on the next request."""
+    with _versions_lock:
+        _versions.pop(user_id, None)
+
+
+def add_role_claims(token, user):
+    """Add the role, member id and token version claims of ``user`` to ``token``."""
+    row = _versions_query(user.pk).first()
+    password, is_active, is_staff, member_id = row
+    token['is_staff'] = is_staff
+    token['member_id'] = member_id
+    token[VERSION_CLAIM] = _remember_version(user.pk, row)
+    return token
+
+
+class RefreshToken(tokens.RefreshToken):
+    """Refresh token whose claims, and those of its access tokens, include the user's role."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_role_claims(super().for_user(user), user)
+
+
+class AccessToken(tokens.AccessToken):
+    """Access token carrying the user's role claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_role_claims(super().for_user(user), user)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenUser(jwt_models.TokenUser):
+    """User backed by the claims of a validated access token."""
+
+    @property
+    def member_id(self):
+        return self.token.get('member_id')
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """
+    simplejwt's ``JWTAuthentication`` with an ``aauthenticate`` coroutine, so
+    async views can authenticate with the async ORM instead of a thread hop.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Authenticates tokens carrying role claims as a ``TokenUser``, without
+    loading the user. Tokens issued without them fall back to loading the
+    user from the database.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        self.check_version(validated_token, get_token_version(user_id))
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    async def aget_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return await super().aget_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        self.check_version(validated_token, await aget_token_version(user_id))
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_version(self, validated_token, version):
+        if version is None:
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        if validated_token[VERSION_CLAIM] != version:
+            raise AuthenticationFailed(
+                _("The user's account has changed since this token was issued."), code="token_revoked"
+            )
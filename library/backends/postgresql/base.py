@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from ..timing import ConnectionTimingMixin
+
+
+class DatabaseWrapper(ConnectionTimingMixin, base.DatabaseWrapper):
+    """PostgreSQL backend recording per-request connection timings."""
@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from ..timing import ConnectionTimingMixin
+
+
+class DatabaseWrapper(ConnectionTimingMixin, base.DatabaseWrapper):
+    """SQLite backend recording per-request connection timings."""
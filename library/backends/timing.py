@@ -0,0 +1,76 @@
+"""
+Per-request database connection and query timings.
+
+``ConnectionTimingMixin`` is mixed into the project's database backends and
+records, for every connection a request opens or checks out of the pool:
+
+* ``wait``: time to obtain the raw connection, i.e. a pool checkout
+  (waiting for a free connection and health-checking it) or, without a
+  pool, a new TCP/TLS connection;
+* ``acquire``: the whole of ``connect()``, i.e. ``wait`` plus the session
+  setup Django runs on each connection.
+
+Connections reused across requests through ``CONN_MAX_AGE`` are not
+reconnected, so they record nothing. Every query a request executes is
+counted in ``queries``, and its time in ``query_time``.
+"""
+import time
+from contextvars import ContextVar
+
+_timings = ContextVar('library_connection_timings', default=None)
+
+
+class ConnectionTimings:
+    def __init__(self):
+        self.wait = 0.0
+        self.acquire = 0.0
+        self.connections = 0
+        self.queries = 0
+        self.query_time = 0.0
+
+
+def start_request_timings():
+    """Start collecting timings for the current request and return the collector."""
+    timings = ConnectionTimings()
+    _timings.set(timings)
+    return timings
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's timings."""
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.query_time += time.perf_counter() - started
+        timings.queries += 1
+
+
+class ConnectionTimingMixin:
+    """Database wrapper mixin recording connection and query timings into the current request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(record_query)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            timings = _timings.get()
+            if timings is not None:
+                timings.acquire += time.perf_counter() - started
+                timings.connections += 1
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            timings = _timings.get()
+            if timings is not None:
+                timings.wait += time.perf_counter() - started
@@ -0,0 +1,358 @@
+"""
+Two-tier cache backend: a bounded in-process LRU in front of a shared cache.
+
+Every operation goes to the shared backend (``OPTIONS['SHARED']``, another
+alias in ``CACHES``), which all processes see. Values of the key namespaces
+listed in ``OPTIONS['LOCAL_TIMEOUTS']`` are also kept in process memory for
+that many seconds, so a hot key costs no round trip to the shared backend.
+A key's namespace is the segment after ``library:``: ``response``,
+``version``, ``count``, ...
+
+Only namespaces that tolerate a stale local copy belong in
+``LOCAL_TIMEOUTS``. Cached responses are keyed on model versions and never
+change once written, so they can live locally as long as in the shared
+tier. The version counters themselves are what other processes' writes
+change: keeping them locally for a second bounds how long a process keeps
+serving responses built before another process's write, while this
+process's own writes update its copy immediately. Everything else, such as
+locks and the replica stickiness markers, is read from the shared backend
+only.
+
+The in-process tier is shared by the threads of a process and holds at
+most ``OPTIONS['LOCAL_MAX_ENTRIES']`` entries, evicting the least recently
+used. Values are pickled, as in ``LocMemCache``, so callers cannot mutate
+each other's copies. Hits in either tier, misses and evictions are counted
+per namespace and exported by ``library.metrics``.
+
+``FileCache`` is the shared tier used locally: Django's file-based cache
+with an ``add`` and an ``incr`` that are atomic across threads and
+processes, as the stampede locks and version counters of ``library.cache``
+need. Those locks and counters are kept out of reach of the
+``MAX_ENTRIES`` culling, which only evicts cached values.
+"""
+import glob
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+OUTCOMES = ('local_hit', 'shared_hit', 'miss')
+OTHER_NAMESPACE = 'other'
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+_missing = object()
+
+
+def key_namespace(key):
+    """The namespace of a ``library:<namespace>:...`` key."""
+    prefix, _, rest = key.partition(':')
+    if prefix != 'library' or not rest:
+        return OTHER_NAMESPACE
+    return rest.partition(':')[0]
+
+
+class NamespaceStats:
+    __slots__ = ('local_hit', 'shared_hit', 'miss', 'evictions')
+
+    def __init__(self):
+        self.local_hit = 0
+        self.shared_hit = 0
+        self.miss = 0
+        self.evictions = 0
+
+
+class LocalTier:
+    """Pickled values with their expiry and namespace, least recently used first."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, namespace):
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = NamespaceStats()
+        return stats
+
+    def get(self, key):
+        """The value of ``key``, or ``_missing`` if it is absent or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _missing
+            pickled, expires, _ = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return _missing
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, namespace, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (pickled, time.monotonic() + timeout, namespace)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                _, (_, _, evicted_namespace) = self.entries.popitem(last=False)
+                self._stats(evicted_namespace).evictions += 1
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def record(self, namespace, outcome):
+        with self.lock:
+            stats = self._stats(namespace)
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+
+def _tier(name, max_entries):
+    with _tiers_lock:
+        tier = _tiers.get(name)
+        if tier is None:
+            tier = _tiers[name] = LocalTier(max_entries)
+        return tier
+
+
+def cache_stats():
+    """``{namespace: NamespaceStats}`` summed over every two-tier cache of this process."""
+    totals = {}
+    for tier in list(_tiers.values()):
+        with tier.lock:
+            for namespace, stats in tier.stats.items():
+                total = totals.get(namespace)
+                if total is None:
+                    total = totals[namespace] = NamespaceStats()
+                for field in NamespaceStats.__slots__:
+                    setattr(total, field, getattr(total, field) + getattr(stats, field))
+    return totals
+
+
+def reset_cache_stats():
+    for tier in list(_tiers.values()):
+        with tier.lock:
+            tier.stats.clear()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeouts = dict(options.get('LOCAL_TIMEOUTS', {}))
+        # Django creates a backend instance per thread; the tier is per process
+        self.local = _tier(name or self.shared_alias, options.get('LOCAL_MAX_ENTRIES', 1000))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        # The shared backend validates keys; the local tier takes any string
+        return self.make_key(key, version=version)
+
+    def _local_timeout(self, namespace, timeout=DEFAULT_TIMEOUT):
+        """Seconds to keep a value of ``namespace`` locally, or ``None`` to not keep it."""
+        local_timeout = self.local_timeouts.get(namespace)
+        if local_timeout is None:
+            return None
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            if timeout <= 0:
+                return None
+            local_timeout = min(local_timeout, timeout)
+        return local_timeout
+
+    def _keep(self, key, version, value, timeout=DEFAULT_TIMEOUT):
+        namespace = key_namespace(key)
+        local_timeout = self._local_timeout(namespace, timeout)
+        if local_timeout is not None:
+            self.local.set(self._local_key(key, version), namespace, value, local_timeout)
+
+    def get(self, key, default=None, version=None):
+        namespace = key_namespace(key)
+        local_timeout = self._local_timeout(namespace)
+        if local_timeout is not None:
+            local_key = self._local_key(key, version)
+            value = self.local.get(local_key)
+            if value is not _missing:
+                self.local.record(namespace, 'local_hit')
+                return value
+
+        value = self.shared.get(key, _missing, version=version)
+        if value is _missing:
+            self.local.record(namespace, 'miss')
+            return default
+        self.local.record(namespace, 'shared_hit')
+        if local_timeout is not None:
+            self.local.set(local_key, namespace, value, local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remote = {}, []
+        for key in keys:
+            namespace = key_namespace(key)
+            if self._local_timeout(namespace) is not None:
+                value = self.local.get(self._local_key(key, version))
+                if value is not _missing:
+                    self.local.record(namespace, 'local_hit')
+                    found[key] = value
+                    continue
+            remote.append(key)
+
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            for key in remote:
+                if key in fetched:
+                    self.local.record(key_namespace(key), 'shared_hit')
+                    self._keep(key, version, fetched[key])
+                else:
+                    self.local.record(key_namespace(key), 'miss')
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        if self._local_timeout(key_namespace(key)) is not None:
+            if self.local.get(self._local_key(key, version)) is not _missing:
+                return True
+        return self.shared.has_key(key, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Not kept locally: adds take locks and seed counters, which are read
+        # back from the shared tier whoever won
+        return self.shared.add(key, value, timeout, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._drop(key, version)
+        self._keep(key, version, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self._drop(key, version)
+            if key not in failed:
+                self._keep(key, version, value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._drop(key, version)
+        self._keep(key, version, value)
+        return value
+
+    def delete(self, key, version=None):
+        self._drop(key, version)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._drop(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def _drop(self, key, version):
+        self.local.delete(self._local_key(key, version))
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+
+class FileCache(FileBasedCache):
+    # Keys whose loss would break coordination between processes rather
+    # than cost a recomputation; culling only lists the top-level directory
+    pinned_namespaces = ('version',)
+    pinned_suffix = ':lock'
+    pinned_dirname = 'pinned'
+
+    @property
+    def _pinned_dir(self):
+        return os.path.join(self._dir, self.pinned_dirname)
+
+    def _is_pinned(self, key):
+        return key_namespace(key) in self.pinned_namespaces or key.endswith(self.pinned_suffix)
+
+    def _key_to_file(self, key, version=None):
+        fname = super()._key_to_file(key, version)
+        if self._is_pinned(key):
+            return os.path.join(self._pinned_dir, os.path.basename(fname))
+        return fname
+
+    def _createdir(self):
+        super()._createdir()
+        os.makedirs(self._pinned_dir, 0o700, exist_ok=True)
+
+    def clear(self):
+        super().clear()
+        for fname in glob.glob(f'*{self.cache_suffix}', root_dir=self._pinned_dir):
+            self._delete(os.path.join(self._pinned_dir, fname))
+
+    def incr(self, key, delta=1, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        # A get() and set() pair would lose concurrent increments, so the
+        # read and the rewrite hold the key's lock file, which is never
+        # removed; the entry keeps its expiry
+        with open(fname[:-len(self.cache_suffix)] + '.lock', 'ab') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                try:
+                    with open(fname, 'rb') as f:
+                        expiry = pickle.load(f)
+                        value = pickle.loads(zlib.decompress(f.read()))
+                except (FileNotFoundError, EOFError):
+                    expiry = 0
+                if expiry is not None and expiry < time.time():
+                    raise ValueError("Key '%s' not found" % key)
+                value += delta
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(fname))
+                try:
+                    with open(fd, 'wb') as f:
+                        f.write(pickle.dumps(expiry, self.pickle_protocol))
+                        f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+                    os.replace(tmp_path, fname)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+            finally:
+                locks.unlock(lock)
+        return value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            # Unlike the rename in set(), a hard link fails if the key's file
+            # exists; has_key() removes an expired one, so retry once
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    if self.has_key(key, version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
@@ -0,0 +1,66 @@
+"""Helpers shared by the benchmark management commands."""
+import statistics
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+
+def percentile(latencies, fraction):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(latencies, statuses, elapsed, errors=None):
+    """
+    Throughput, latency percentiles and error count of a benchmark run.
+    Errors are responses with a 4xx or 5xx status, unless counted by the caller.
+    """
+    if errors is None:
+        errors = sum(1 for status in statuses if status >= 400)
+    return {
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4),
+    }
+
+
+def wsgi_request(app, method, path, query='', headers=None, body=b''):
+    """
+    Send a request straight to a WSGI application and read the whole
+    response. Returns ``(latency, status, response_headers, content)``.
+    """
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    }
+    for name, value in (headers or {}).items():
+        if name.lower() == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        else:
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+    setup_testing_defaults(environ)
+
+    started_response = []
+    started = time.perf_counter()
+    response = app(environ, lambda status, response_headers, exc_info=None: started_response.append(
+        (int(status.split()[0]), dict(response_headers))
+    ))
+    content = b''.join(response)
+    if hasattr(response, 'close'):
+        response.close()
+    status, response_headers = started_response[0]
+    return time.perf_counter() - started, status, response_headers, content
+
+
+def wsgi_get(app, path, query='', headers=None):
+    """``wsgi_request`` for a GET, returning ``(latency, status, response_headers)``."""
+    latency, status, response_headers, _ = wsgi_request(app, 'GET', path, query, headers)
+    return latency, status, response_headers
@@ -0,0 +1,120 @@
+"""
+Raw bulk writes for the catalog import and the synthetic dataset generator.
+
+``copy_rows`` streams rows through ``COPY ... FROM STDIN`` on PostgreSQL,
+with psycopg 3 or psycopg2. ``RowWriter`` writes a model's rows with
+``COPY`` where available and a single ``executemany`` INSERT elsewhere,
+skipping ``Model.save()``, signals and per-object overhead, so callers
+maintain counters and the SQLite search index themselves.
+"""
+import csv
+import io
+from contextlib import contextmanager
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+
+def copy_rows(cursor, copy_sql, rows):
+    """Send ``rows`` to a ``COPY ... FROM STDIN`` statement on a Django cursor."""
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy'):  # psycopg 3
+        with raw_cursor.copy(copy_sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:  # psycopg2
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        raw_cursor.copy_expert(f'{copy_sql} WITH (FORMAT csv)', buffer)
+
+
+def secondary_indexes(model):
+    """``(name, CREATE INDEX statement)`` of the non-unique indexes on ``model``'s table."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s',
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+                [table],
+            )
+        else:
+            return []
+        return [(name, sql) for name, sql in cursor.fetchall() if not sql.upper().startswith('CREATE UNIQUE')]
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """
+    Drop the non-unique indexes of ``models`` for the duration of a bulk load
+    and rebuild them afterwards, which sorts each index once instead of
+    updating it row by row. Unique indexes stay, so constraints still hold.
+    """
+    indexes = [index for model in models for index in secondary_indexes(model)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for name, sql in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, sql in indexes:
+                cursor.execute(sql)
+
+
+class RowWriter:
+    """Writes tuples of ``fields`` values, primary key included, into ``model``'s table."""
+
+    def __init__(self, model, fields, use_copy=None):
+        quote = connection.ops.quote_name
+        model_fields = [model._meta.get_field(name) for name in fields]
+        table = quote(model._meta.db_table)
+        columns = ', '.join(quote(field.column) for field in model_fields)
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+
+        self.use_copy = use_copy
+        if use_copy:
+            self.sql = f'COPY {table} ({columns}) FROM STDIN'
+        else:
+            placeholders = ', '.join(['%s'] * len(model_fields))
+            self.sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+        # psycopg adapts dates itself; other drivers get Django's database values
+        self.adapters = [] if use_copy else [
+            (index, self.adapter(field)) for index, field in enumerate(model_fields) if self.adapter(field)
+        ]
+
+    @staticmethod
+    def adapter(field):
+        internal_type = field.get_internal_type()
+        if internal_type == 'DateTimeField':
+            if connection.vendor == 'sqlite' and settings.USE_TZ:
+                # What adapt_datetimefield_value stores, without its per-call checks
+                return lambda value: str(value.astimezone(dt_timezone.utc).replace(tzinfo=None))
+            return connection.ops.adapt_datetimefield_value
+        if internal_type == 'DateField':
+            return connection.ops.adapt_datefield_value
+        return None
+
+    def write(self, rows):
+        if self.adapters:
+            rows = [self.adapt(row) for row in rows]
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                copy_rows(cursor, self.sql, rows)
+            else:
+                cursor.executemany(self.sql, rows)
+
+    def adapt(self, row):
+        row = list(row)
+        for index, adapter in self.adapters:
+            if row[index] is not None:
+                row[index] = adapter(row[index])
+        return row
@@ -0,0 +1,223 @@
+"""
+Versioned response caching for read-heavy ViewSets.
+
+Every model has a version counter in the cache that is bumped on each write.
+Cached responses are keyed on the versions of the models they were built
+from, so a write invalidates them without having to find and delete keys.
+"""
+import asyncio
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from .replicas import mark_models_written
+
+VERSION_KEY = 'library:version:{}'
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.02
+
+
+def _initial_version():
+    # Counters start at the current time, so a counter lost to eviction can
+    # never come back at a version an older cached response was built from
+    return time.time_ns() // 1000
+
+
+def get_versions(models):
+    """Return the current version counter of each model."""
+    keys = [VERSION_KEY.format(model._meta.label_lower) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_version(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models):
+    """Async counterpart of ``get_versions``."""
+    keys = [VERSION_KEY.format(model._meta.label_lower) for model in models]
+    versions = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, _initial_version(), timeout=None)
+        versions.update(await cache.aget_many(missing))
+    return [versions[key] for key in keys]
+
+
+def bump_version(*models):
+    """
+    Invalidate everything cached from the given models.
+
+    The counters are bumped immediately, so the writer's next read is fresh,
+    and again when the transaction commits, so a response cached from the
+    pre-commit state by a concurrent reader is discarded too.
+    """
+    def bump():
+        # Before the new versions are visible, so no response is cached
+        # under them from a replica that lacks the write
+        mark_models_written(*models)
+        for model in models:
+            key = VERSION_KEY.format(model._meta.label_lower)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    Return the cached value for ``key``, computing it on a miss.
+
+    Concurrent misses collapse onto one computation: the first caller takes
+    a lock and computes, the others wait for its result for up to
+    ``LOCK_WAIT`` seconds before computing it themselves. ``compute`` may
+    return ``None`` for a value that must not be cached.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
+
+
+async def aget_or_compute(key, compute, timeout):
+    """Async counterpart of ``get_or_compute``; ``compute`` is a coroutine function."""
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = await compute()
+            if value is not None:
+                await cache.aset(key, value, timeout)
+            return value
+        finally:
+            await cache.adelete(lock_key)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+    return await compute()
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for the ``list`` and ``retrieve`` actions of a ViewSet.
+
+    Rendered JSON responses are cached per path, query string, role and the
+    versions of ``cache_models``, and carry a strong ETag derived from that
+    key, so a matching ``If-None-Match`` is answered with a 304 without
+    running the view. The ``alist``/``aretrieve`` coroutines of
+    ``AsyncReadMixin`` are cached the same way.
+    """
+    cache_models = ()
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, versions):
+        role = 'librarian' if request.user.is_staff else 'member'
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        location = hashlib.sha256(f'{request.build_absolute_uri(request.path)}?{query}'.encode()).hexdigest()
+        versions = '.'.join(str(version) for version in versions)
+        return f'library:response:{self.basename}:{role}:{versions}:{location}'
+
+    def get_response_headers(self, key):
+        etag = '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+        return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    def is_not_modified(self, request, headers):
+        return headers['ETag'] in parse_etags(request.headers.get('If-None-Match', ''))
+
+    def render_cacheable(self, request, response, uncached):
+        """Rendered content of a 200 response, or ``None`` (keeping the response) for anything else."""
+        if response.status_code != 200:
+            uncached.append(response)
+            return None
+        return request.accepted_renderer.render(
+            response.data, request.accepted_media_type, self.get_renderer_context()
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        # Only the JSON representation is cached; the browsable API is not
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, get_versions(self.cache_models))
+        headers = self.get_response_headers(key)
+        if self.is_not_modified(request, headers):
+            return HttpResponseNotModified(headers=headers)
+
+        uncached = []
+
+        def compute():
+            return self.render_cacheable(request, handler(request, *args, **kwargs), uncached)
+
+        content = get_or_compute(key, compute, self.cache_timeout)
+        if uncached:
+            return uncached[0]
+        return HttpResponse(content, content_type=request.accepted_renderer.media_type, headers=headers)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """Async counterpart of ``cached_response`` for a coroutine ``handler``."""
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return await handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, await aget_versions(self.cache_models))
+        headers = self.get_response_headers(key)
+        if self.is_not_modified(request, headers):
+            return HttpResponseNotModified(headers=headers)
+
+        uncached = []
+
+        async def compute():
+            return self.render_cacheable(request, await handler(request, *args, **kwargs), uncached)
+
+        content = await aget_or_compute(key, compute, self.cache_timeout)
+        if uncached:
+            return uncached[0]
+        return HttpResponse(content, content_type=request.accepted_renderer.media_type, headers=headers)
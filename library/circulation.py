@@ -0,0 +1,99 @@
+"""
+Set-based batch variants of borrowing and returning books.
+
+Each batch runs in one transaction with a constant number of queries,
+whatever its size, and reports an outcome for every item in request order.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+
+from .cache import bump_version
+from .counters import adjust_counter
+from .holds import hand_off
+from .models import Book, Member, BorrowRecord
+
+
+def _failure(item, code, error):
+    return {**item, 'status': code, 'error': error}
+
+
+def bulk_borrow(items):
+    """
+    Open loans for a list of ``{'book_id', 'member_id'}`` items.
+
+    A book requested more than once in the batch is lent to the first item
+    only; the rest conflict just as they would against an existing loan.
+    """
+    book_ids = {item['book_id'] for item in items}
+    member_ids = {item['member_id'] for item in items}
+
+    with transaction.atomic():
+        existing_members = set(Member.objects.filter(pk__in=member_ids).values_list('pk', flat=True))
+        book_statuses = dict(
+            Book.objects.select_for_update()
+            .filter(pk__in=book_ids)
+            .values_list('pk', 'availability_status')
+        )
+
+        results = []
+        claimed = {}
+        for item in items:
+            book_id = item['book_id']
+            if book_id not in book_statuses or item['member_id'] not in existing_members:
+                results.append(_failure(item, status.HTTP_404_NOT_FOUND, 'Book or member not found.'))
+            elif book_statuses[book_id] != 'available' or book_id in claimed:
+                results.append(_failure(item, status.HTTP_409_CONFLICT, 'Book is not available for borrowing.'))
+            else:
+                claimed[book_id] = BorrowRecord(book_id=book_id, member_id=item['member_id'])
+                results.append(item)
+
+        if claimed:
+            Book.objects.filter(pk__in=claimed).update(
+                availability_status='borrowed', times_borrowed=F('times_borrowed') + 1
+            )
+            adjust_counter(Member, 'active_loans_count', [record.member_id for record in claimed.values()])
+            BorrowRecord.objects.bulk_create(claimed.values())
+            bump_version(BorrowRecord, Book)
+
+    for result in results:
+        if 'status' not in result:
+            result.update(status=status.HTTP_201_CREATED, borrow_record_id=claimed[result['book_id']].pk)
+    return results
+
+
+def bulk_return(borrow_record_ids):
+    """Close the open loans with the given ids, handing each book to its hold queue's head."""
+    with transaction.atomic():
+        records = {
+            pk: (book_id, member_id, return_date)
+            for pk, book_id, member_id, return_date in BorrowRecord.objects.select_for_update()
+            .filter(pk__in=set(borrow_record_ids))
+            .values_list('pk', 'book_id', 'member_id', 'return_date')
+        }
+
+        results = []
+        returning = set()
+        for pk in borrow_record_ids:
+            item = {'borrow_record_id': pk}
+            if pk not in records:
+                results.append(_failure(item, status.HTTP_404_NOT_FOUND, 'Borrowing record not found.'))
+            elif records[pk][2] or pk in returning:
+                results.append(_failure(item, status.HTTP_400_BAD_REQUEST, 'Book has already been returned.'))
+            else:
+                returning.add(pk)
+                results.append({**item, 'status': status.HTTP_200_OK})
+
+        next_loans = {}
+        if returning:
+            BorrowRecord.objects.filter(pk__in=returning).update(return_date=timezone.now())
+            adjust_counter(Member, 'active_loans_count', [records[pk][1] for pk in returning], sign=-1)
+            next_loans = hand_off(records[pk][0] for pk in returning)
+            bump_version(BorrowRecord, Book)
+
+    for result in results:
+        if result['status'] == status.HTTP_200_OK:
+            next_loan = next_loans.get(records[result['borrow_record_id']][0])
+            result['next_borrow_record_id'] = next_loan.pk if next_loan else None
+    return results
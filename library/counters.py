@@ -0,0 +1,58 @@
+"""
+Helpers for the denormalized counters on Author, Book and Member.
+
+Counters are adjusted with ``F()`` expressions inside the transaction that
+changes the underlying rows, and can be recomputed in bulk with the
+``reconcile_counters`` management command if they ever drift.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+
+def adjust_counter(model, field, pks, sign=1):
+    """
+    Add (or, with ``sign=-1``, subtract) one to ``field`` for every occurrence
+    of a primary key in ``pks``, in a single UPDATE statement.
+    """
+    counts = Counter(pks)
+    if not counts:
+        return
+    delta = Case(*(When(pk=pk, then=Value(count)) for pk, count in counts.items()))
+    value = F(field) + delta if sign > 0 else Greatest(F(field) - delta, 0)
+    model.objects.filter(pk__in=counts).update(**{field: value})
+
+
+def count_of(model, field, **filters):
+    """Subquery counting the ``model`` rows whose ``field`` points at the outer row."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}, **filters)
+            .order_by().values(field).annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    )
+
+
+def reconcile(queryset, field, actual, batch_size=10000):
+    """
+    Recompute ``field`` from the ``actual`` expression for every row of
+    ``queryset`` whose stored value has drifted, one primary-key range at a
+    time. Returns the number of rows fixed.
+    """
+    fixed = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return fixed
+        fixed += (
+            queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+            .annotate(actual=actual)
+            .exclude(**{field: F('actual')})
+            .update(**{field: actual})
+        )
+        last_pk = pks[-1]
@@ -0,0 +1,97 @@
+"""
+Row counts for paginating large tables.
+
+An exact ``COUNT(*)`` visits every matching row, which on the borrow
+records table means millions of rows per page load. ``approximate_count``
+counts exactly up to a threshold and, past it, asks the planner instead:
+``pg_class.reltuples`` for a whole table, the row estimate of ``EXPLAIN``
+for a filtered queryset. Databases without planner statistics (SQLite) fall
+back to an exact count.
+
+``cached_count`` keeps estimates in the cache for a short while, keyed on
+the query's SQL, so paging through a large list runs neither the bounded
+count nor the planner on every page.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+COUNT_KEY = 'library:count:{}:{}'
+
+
+def _exact_count_threshold():
+    return getattr(settings, 'EXACT_COUNT_THRESHOLD', 10000)
+
+
+def _estimate_timeout():
+    return getattr(settings, 'ESTIMATED_COUNT_TIMEOUT', 60)
+
+
+def estimated_count(queryset):
+    """The planner's row estimate for ``queryset``, or ``None`` if the database has none."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            reltuples = cursor.fetchone()[0]
+            if reltuples >= 0:  # -1 until the table is first vacuumed or analyzed
+                return reltuples
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def approximate_count(queryset, threshold=None):
+    """
+    Return ``(count, exact)`` for ``queryset``: the exact count when it is at
+    most ``threshold`` rows (``EXACT_COUNT_THRESHOLD`` by default), else the
+    planner's estimate, which is never below the rows already counted.
+    """
+    if threshold is None:
+        threshold = _exact_count_threshold()
+    # Stops after threshold + 1 rows instead of visiting every match, and
+    # selects only the keys, so annotations are not computed for each row
+    counted = queryset.order_by().values('pk')[:threshold + 1].count()
+    if counted <= threshold:
+        return counted, True
+
+    estimate = estimated_count(queryset)
+    if estimate is None:
+        return queryset.count(), True
+    return max(estimate, counted), False
+
+
+def cached_count(queryset, threshold=None):
+    """
+    ``approximate_count`` with estimates cached per query (its SQL and
+    parameters) for ``ESTIMATED_COUNT_TIMEOUT`` seconds. Exact counts are
+    cheap by definition and never cached, so they always reflect writes.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:  # queryset.none()
+        return 0, True
+    signature = hashlib.sha256(repr((queryset.db, sql, params)).encode()).hexdigest()
+    key = COUNT_KEY.format(queryset.model._meta.label_lower, signature)
+    estimate = cache.get(key)
+    if estimate is not None:
+        return estimate, False
+
+    count, exact = approximate_count(queryset, threshold)
+    if not exact:
+        cache.set(key, count, _estimate_timeout())
+    return count, exact
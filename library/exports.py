@@ -0,0 +1,70 @@
+import csv
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin:
+    """
+    Adds a ``GET .../export/?export_format=csv|ndjson`` action to a ViewSet.
+
+    Rows honour the same query-parameter filters as the list view and are read
+    with ``QuerySet.iterator()``, which uses a server-side cursor on
+    PostgreSQL, then encoded as they are sent. ``export_fields`` maps each
+    output column to the (possibly joined) field it is read from, and should
+    mirror the ViewSet's serializer fields.
+    """
+    export_fields = {}
+    export_filename = 'export'
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream every matching row as CSV or newline-delimited JSON."""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'export_format must be csv or ndjson.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        rows = queryset.values_list(*self.export_fields.values()).iterator(chunk_size=self.export_chunk_size)
+
+        if export_format == 'csv':
+            content, content_type = self._encode_csv(rows), 'text/csv'
+        else:
+            content, content_type = self._encode_ndjson(rows), 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.{export_format}"'
+        return response
+
+    def _chunks(self, rows):
+        while chunk := list(islice(rows, self.export_chunk_size)):
+            yield chunk
+
+    def _encode_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.export_fields)
+        for chunk in self._chunks(rows):
+            yield ''.join(writer.writerow(row) for row in chunk)
+
+    def _encode_ndjson(self, rows):
+        encoder = JSONEncoder(ensure_ascii=False)
+        columns = list(self.export_fields)
+        for chunk in self._chunks(rows):
+            yield ''.join(encoder.encode(dict(zip(columns, row))) + '\n' for row in chunk)
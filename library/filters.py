@@ -0,0 +1,19 @@
+from rest_framework.filters import BaseFilterBackend
+
+
+class QueryParameterFilterBackend(BaseFilterBackend):
+    """
+    Filter a ViewSet's queryset with its ``filter_serializer_class``.
+
+    The serializer validates the query parameters (invalid values are
+    rejected with a 400) and applies them in its ``filter_queryset`` method.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        serializer_class = getattr(view, 'filter_serializer_class', None)
+        if serializer_class is None:
+            return queryset
+
+        serializer = serializer_class(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.filter_queryset(queryset)
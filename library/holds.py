@@ -0,0 +1,97 @@
+"""
+FIFO hold queues for books that are out on loan.
+
+A hold's ``position`` is a ticket number drawn from its book's queue: the
+tail is the highest position and the head the lowest, both single seeks on
+the ``(book, position)`` unique index, so joining a queue and handing a
+returned book to its head cost the same whatever the queue length.
+
+Joining a queue and returning a book both lock the book row first, so a
+hold can never be added to the queue of a book that has just become
+available, and a returned book only becomes available when nobody is
+waiting for it.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from .counters import adjust_counter
+from .models import Book, BorrowRecord, Hold, Member
+
+
+class HoldNotPlaced(Exception):
+    """Raised when a member cannot join a book's hold queue."""
+
+
+def place_hold(book_id, member_id):
+    """Add ``member_id`` to the tail of ``book_id``'s hold queue and return the hold."""
+    with transaction.atomic():
+        availability_status = (
+            Book.objects.select_for_update()
+            .filter(pk=book_id)
+            .values_list('availability_status', flat=True)
+            .first()
+        )
+        if availability_status is None:
+            raise Book.DoesNotExist
+        if not Member.objects.filter(pk=member_id).exists():
+            raise Member.DoesNotExist
+        if availability_status == 'available':
+            raise HoldNotPlaced('Book is available for borrowing.')
+        if BorrowRecord.objects.filter(book_id=book_id, member_id=member_id, return_date__isnull=True).exists():
+            raise HoldNotPlaced('Member already has this book on loan.')
+
+        tail = Hold.objects.filter(book_id=book_id).order_by('-position').values_list('position', flat=True).first()
+        try:
+            with transaction.atomic():
+                return Hold.objects.create(book_id=book_id, member_id=member_id, position=(tail or 0) + 1)
+        except IntegrityError:
+            raise HoldNotPlaced('Member already has a hold on this book.')
+
+
+def hand_off(book_ids):
+    """
+    Lend each of the just-returned ``book_ids`` to the head of its hold queue,
+    and make the books nobody is waiting for available, in a constant number
+    of queries. Must run in the transaction that closed the loans; returns
+    ``{book_id: BorrowRecord}`` for the books that were handed off.
+    """
+    book_ids = set(book_ids)
+    # Also locks the books against place_hold until the transaction ends
+    Book.objects.filter(pk__in=book_ids).update(availability_status='available')
+    head_position = Hold.objects.filter(book_id=OuterRef('book_id')).order_by('position').values('position')[:1]
+    heads = list(
+        Hold.objects.select_for_update()
+        .filter(book_id__in=book_ids, position=Subquery(head_position))
+        .values_list('pk', 'book_id', 'member_id')
+    )
+
+    loans = [BorrowRecord(book_id=book_id, member_id=member_id) for _, book_id, member_id in heads]
+    if loans:
+        Hold.objects.filter(pk__in=[pk for pk, _, _ in heads]).delete()
+        # Claimed in the same transaction, so nobody else sees the books available
+        Book.objects.filter(pk__in=[loan.book_id for loan in loans]).update(
+            availability_status='borrowed', times_borrowed=F('times_borrowed') + 1
+        )
+        adjust_counter(Member, 'active_loans_count', [loan.member_id for loan in loans])
+        BorrowRecord.objects.bulk_create(loans)
+    return {loan.book_id: loan for loan in loans}
+
+
+def set_queue_positions(holds):
+    """
+    Set ``queue_position`` on each of ``holds``, 1 for the head of the queue,
+    numbering the whole queues of their books in one query. The numbering
+    can't be an annotation of the holds' own queryset: its filters, such as
+    a member's scope or a lookup by pk, would cut the queues short.
+    """
+    if not holds:
+        return
+    positions = dict(
+        Hold.objects.using(holds[0]._state.db)
+        .filter(book_id__in={hold.book_id for hold in holds})
+        .annotate(queue_position=Window(RowNumber(), partition_by=F('book_id'), order_by=F('position').asc()))
+        .values_list('pk', 'queue_position')
+    )
+    for hold in holds:
+        hold.queue_position = positions.get(hold.pk)
@@ -0,0 +1,264 @@
+"""
+Scenario-based load generation for the ``load_test`` command.
+
+A run logs in as a librarian and a member, samples the catalog, then has
+``concurrency`` workers repeatedly pick a scenario by weight until the
+duration is up:
+
+* ``browse``: a member pages through, searches, filters and opens books;
+* ``login``: a member obtains a JWT pair;
+* ``circulation``: borrows of a few popular books, so workers contend for
+  them (a 409 is an expected outcome), each successful one returned;
+* ``librarian``: create, update and delete an author and a book.
+
+Every request is recorded under its endpoint, and the run is reported per
+endpoint as JSON. Requests go straight to the WSGI application, or to a
+running server through ``HTTPTransport``.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from .benchmarking import summarize, wsgi_request
+from .models import Book
+
+SCENARIOS = {}
+DEFAULT_MIX = {'browse': 60, 'circulation': 25, 'librarian': 10, 'login': 5}
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def scenario(function):
+    SCENARIOS[function.__name__] = function
+    return function
+
+
+class WSGITransport:
+    """Calls the WSGI application in-process, against the configured database."""
+    name = 'wsgi'
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, method, path, query, headers, body):
+        latency, status, _, content = wsgi_request(self.app, method, path, query, headers, body)
+        return latency, status, content
+
+
+class HTTPTransport:
+    """Sends requests to a running server, over one keep-alive session per thread."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.name = self.base_url
+        self.session_class = requests.Session
+        self.local = threading.local()
+
+    def __call__(self, method, path, query, headers, body):
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = self.session_class()
+        url = f'{self.base_url}{path}?{query}' if query else f'{self.base_url}{path}'
+        started = time.perf_counter()
+        response = session.request(method, url, headers=headers, data=body)
+        return time.perf_counter() - started, response.status_code, response.content
+
+
+class Recorder:
+    """Latencies and statuses per endpoint, for a single worker."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(list)
+        self.errors = Counter()
+
+    def record(self, endpoint, latency, status, error):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint].append(status)
+        if error:
+            self.errors[endpoint] += 1
+
+
+class Client:
+    def __init__(self, transport, recorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    def request(self, method, endpoint, path=None, query=None, data=None, token=None, expected=(200,)):
+        """
+        Send a request and record it under ``endpoint``. Returns the status
+        and, for an expected status, the decoded JSON body.
+        """
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        body = b''
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if isinstance(query, dict):
+            query = urlencode(query)
+
+        latency, status, content = self.transport(method, path or endpoint, query or '', headers, body)
+        self.recorder.record(f'{method} {endpoint}', latency, status, status not in expected)
+        if status in expected and content:
+            return status, json.loads(content)
+        return status, None
+
+
+class Context:
+    """What the scenarios share: tokens, credentials and sampled ids."""
+
+    def __init__(self, credentials, hot_books, seed):
+        self.credentials = credentials
+        self.hot_books = hot_books
+        self.seed = seed
+        self.tokens = {}
+
+    def setup(self, transport):
+        client = Client(transport, Recorder())
+        for role, credentials in self.credentials.items():
+            status, tokens = client.request('POST', '/auth/jwt/create/', data=credentials)
+            if tokens is None:
+                raise LoadTestError(
+                    f"Logging in as '{credentials['username']}' failed with status {status}. "
+                    'Run create_test_users, or pass the credentials.'
+                )
+            self.tokens[role] = tokens['access']
+
+        _, books = client.request(
+            'GET', '/api/books/', query={'page_size': 100}, token=self.tokens['member']
+        )
+        _, members = client.request(
+            'GET', '/api/members/', query={'page_size': 100}, token=self.tokens['librarian']
+        )
+        books = books['results'] if books else []
+        members = members['results'] if members else []
+        if not books or not members:
+            raise LoadTestError('The database has no books or members. Run create_sample_data first.')
+
+        self.book_ids = [book['id'] for book in books]
+        self.hot_book_ids = random.Random(self.seed).sample(self.book_ids, min(self.hot_books, len(books)))
+        self.member_ids = [member['id'] for member in members]
+        self.search_terms = sorted({word for book in books for word in book['title'].split() if len(word) > 3})
+        self.search_terms = self.search_terms or [books[0]['title']]
+
+
+@scenario
+def browse(client, context, rng):
+    token = context.tokens['member']
+    _, page = client.request('GET', '/api/books/', token=token)
+    if page and page['next']:
+        next_page = urlsplit(page['next'])
+        client.request('GET', '/api/books/?cursor', next_page.path, next_page.query, token=token)
+    search = {'search': rng.choice(context.search_terms)}
+    client.request('GET', '/api/books/?search', '/api/books/', search, token=token)
+    category = rng.choice(Book.CATEGORY_CHOICES)[0]
+    client.request('GET', '/api/books/?category', '/api/books/', {'category': category}, token=token)
+    client.request('GET', '/api/books/{id}/', f'/api/books/{rng.choice(context.book_ids)}/', token=token)
+    client.request('GET', '/api/authors/', token=token)
+
+
+@scenario
+def login(client, context, rng):
+    client.request('POST', '/auth/jwt/create/', data=context.credentials['member'])
+
+
+@scenario
+def circulation(client, context, rng):
+    token = context.tokens['librarian']
+    status, record = client.request(
+        'POST', '/api/borrow-records/borrow/',
+        data={'book_id': rng.choice(context.hot_book_ids), 'member_id': rng.choice(context.member_ids)},
+        token=token, expected=(201, 409),
+    )
+    if status == 201:
+        client.request(
+            'POST', '/api/borrow-records/return_book/', data={'borrow_record_id': record['id']}, token=token
+        )
+    client.request('GET', '/api/borrow-records/', token=token)
+
+
+@scenario
+def librarian(client, context, rng):
+    token = context.tokens['librarian']
+    suffix = uuid.uuid4().int % 10**12
+    _, author = client.request(
+        'POST', '/api/authors/', data={'name': f'Load Test Author {suffix}'}, token=token, expected=(201,)
+    )
+    if author is None:
+        return
+    _, book = client.request(
+        'POST', '/api/books/',
+        data={'title': f'Load Test Book {suffix}', 'author': author['id'], 'isbn': f'9{suffix:012d}'},
+        token=token, expected=(201,),
+    )
+    if book is not None:
+        path = f"/api/books/{book['id']}/"
+        client.request('PATCH', '/api/books/{id}/', path, data={'category': 'science'}, token=token)
+        client.request('DELETE', '/api/books/{id}/', path, token=token, expected=(204,))
+    client.request('DELETE', '/api/authors/{id}/', f"/api/authors/{author['id']}/", token=token, expected=(204,))
+
+
+def run(transport, context, mix, concurrency, duration):
+    """Run the scenario ``mix`` for ``duration`` seconds and return the report."""
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(context.seed + index)
+        client = Client(transport, Recorder())
+        iterations = Counter()
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            SCENARIOS[name](client, context, rng)
+            iterations[name] += 1
+        return client.recorder, iterations
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies, statuses, errors, iterations = defaultdict(list), defaultdict(list), Counter(), Counter()
+    for recorder, worker_iterations in outcomes:
+        for endpoint, endpoint_latencies in recorder.latencies.items():
+            latencies[endpoint].extend(endpoint_latencies)
+            statuses[endpoint].extend(recorder.statuses[endpoint])
+        errors.update(recorder.errors)
+        iterations.update(worker_iterations)
+    if not latencies:
+        raise LoadTestError('No requests completed; increase the duration.')
+
+    endpoints = {}
+    for endpoint in sorted(latencies):
+        endpoints[endpoint] = {
+            'requests': len(latencies[endpoint]),
+            **summarize(latencies[endpoint], statuses[endpoint], elapsed, errors[endpoint]),
+            'statuses': {str(status): count for status, count in sorted(Counter(statuses[endpoint]).items())},
+        }
+    every_latency = [latency for endpoint_latencies in latencies.values() for latency in endpoint_latencies]
+    every_status = [status for endpoint_statuses in statuses.values() for status in endpoint_statuses]
+    return {
+        'target': transport.name,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'seed': context.seed,
+        'mix': mix,
+        'scenarios': dict(sorted(iterations.items())),
+        'total': {
+            'requests': len(every_latency),
+            **summarize(every_latency, every_status, elapsed, sum(errors.values())),
+        },
+        'endpoints': endpoints,
+    }
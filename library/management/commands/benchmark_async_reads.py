@@ -0,0 +1,124 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from library.authentication import AccessToken
+from library.benchmarking import summarize, wsgi_get
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent read throughput of the WSGI app and the native '
+        'async read path of the ASGI app, in-process against the configured database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/books/', help='Endpoint to request')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per run')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--username', default='librarian', help='User the JWT is issued for')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0,
+            help='Simulated network latency added to every query, as with a remote database'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' not found. Run create_test_users first.")
+
+        if options['db_latency_ms']:
+            self.add_db_latency(options['db_latency_ms'] / 1000)
+
+        authorization = f'Bearer {AccessToken.for_user(user)}'
+        path, _, query = options['path'].partition('?')
+
+        results = {
+            'path': options['path'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'db_latency_ms': options['db_latency_ms'],
+            'wsgi': self.run_wsgi(path, query, authorization, options['requests'], options['concurrency']),
+            'asgi': asyncio.run(
+                self.run_asgi(path, query, authorization, options['requests'], options['concurrency'])
+            ),
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def add_db_latency(self, seconds):
+        def delay(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            connection.execute_wrappers.append(delay)
+
+        connection_created.connect(install, weak=False)
+        for connection in connections.all():
+            connection.execute_wrappers.append(delay)
+
+    def run_wsgi(self, path, query, authorization, total, concurrency):
+        from library_management.wsgi import app
+
+        def request(_):
+            latency, status, headers = wsgi_get(app, path, query, {'Authorization': authorization})
+            return latency, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(request, range(total)))
+        elapsed = time.perf_counter() - started
+        return summarize([latency for latency, _ in outcomes], [status for _, status in outcomes], elapsed)
+
+    async def run_asgi(self, path, query, authorization, total, concurrency):
+        from library_management.asgi import application
+
+        host = 'localhost'
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'headers': [
+                    (b'host', host.encode()),
+                    (b'authorization', authorization.encode()),
+                    (b'accept', b'application/json'),
+                ],
+                'server': (host, 80),
+                'client': ('127.0.0.1', 0),
+            }
+            received = asyncio.Event()
+            statuses = []
+
+            async def receive():
+                if not received.is_set():
+                    received.set()
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(scope, receive, send)
+                return time.perf_counter() - started, statuses[0]
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(request() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return summarize([latency for latency, _ in outcomes], [status for _, status in outcomes], elapsed)
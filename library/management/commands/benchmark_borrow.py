@@ -0,0 +1,157 @@
+import json
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from library import holds
+from library.benchmarking import summarize
+from library.models import Author, Book, BookNotAvailable, BorrowRecord, Member
+
+PATHS = ('legacy', 'conditional')
+
+
+def legacy_borrow(book_id, member_id):
+    """The read-check-write borrow that predates the conditional UPDATE."""
+    book = Book.objects.get(pk=book_id)
+    member = Member.objects.get(pk=member_id)
+    if book.availability_status != 'available':
+        return None
+    book.availability_status = 'borrowed'
+    book.save()
+    record = BorrowRecord(book=book, member=member)
+    models.Model.save(record)  # skips BorrowRecord.save(), which claims the book itself
+    return record.pk
+
+
+def legacy_return(record_id):
+    record = BorrowRecord.objects.select_related('book').get(pk=record_id)
+    if record.return_date:
+        return False
+    record.return_date = timezone.now()
+    record.book.availability_status = 'available'
+    record.book.save()
+    models.Model.save(record)
+    return True
+
+
+def conditional_borrow(book_id, member_id):
+    """What the borrow endpoint runs: a conditional UPDATE claims the book."""
+    try:
+        with transaction.atomic():
+            record = BorrowRecord(book_id=book_id, member_id=member_id)
+            record.save()
+            BorrowRecord.objects.select_related('book', 'member').get(pk=record.pk)
+        return record.pk
+    except BookNotAvailable:
+        return None
+
+
+def conditional_return(record_id):
+    """What the return endpoint runs: a conditional UPDATE closes the loan."""
+    with transaction.atomic():
+        returned = BorrowRecord.objects.filter(pk=record_id, return_date__isnull=True).update(
+            return_date=timezone.now()
+        )
+        if returned:
+            book_id = BorrowRecord.objects.values_list('book_id', flat=True).get(pk=record_id)
+            holds.hand_off([book_id])
+    return bool(returned)
+
+
+OPERATIONS = {
+    'legacy': (legacy_borrow, legacy_return),
+    'conditional': (conditional_borrow, conditional_return),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of the legacy read-check-write borrow path with '
+        'the conditional UPDATE path, with threads borrowing and returning a few '
+        'shared books. Creates its own books and members and deletes them afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent workers per path')
+        parser.add_argument('--cycles', type=int, default=200, help='Borrow attempts per worker')
+        parser.add_argument('--books', type=int, default=4, help='Books the workers contend for')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS))
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        author = Author.objects.create(name=f'Borrow Benchmark {tag}')
+        try:
+            results = {'threads': options['threads'], 'cycles': options['cycles'], 'books': options['books']}
+            for path in options['paths']:
+                book_ids = [
+                    Book.objects.create(
+                        title=f'Benchmark {tag} {path} {index}', author=author, isbn=self.isbn(tag, path, index)
+                    ).pk
+                    for index in range(options['books'])
+                ]
+                member_ids = [
+                    Member.objects.create(name=f'Benchmark {index}', email=f'{tag}-{path}-{index}@benchmark.invalid').pk
+                    for index in range(options['threads'])
+                ]
+                results[path] = self.run(path, book_ids, member_ids, options)
+        finally:
+            Member.objects.filter(email__startswith=f'{tag}-', email__endswith='@benchmark.invalid').delete()
+            author.delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def isbn(tag, path, index):
+        return f'{int(tag, 16) % 10**6:06d}{PATHS.index(path)}{index:06d}'
+
+    def run(self, path, book_ids, member_ids, options):
+        borrow, return_ = OPERATIONS[path]
+        latencies, statuses, errors = [], [], []
+        lock = threading.Lock()
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            member_id = member_ids[index]
+            local = []
+            try:
+                for _ in range(options['cycles']):
+                    started = time.perf_counter()
+                    try:
+                        record_id = borrow(rng.choice(book_ids), member_id)
+                        status = 201 if record_id else 409
+                        if record_id:
+                            return_(record_id)
+                    except IntegrityError:
+                        # The one-open-loan constraint caught a race the legacy check let through
+                        status = 500
+                    local.append((time.perf_counter() - started, status))
+            finally:
+                connection.close()
+            with lock:
+                for latency, status in local:
+                    latencies.append(latency)
+                    statuses.append(status)
+                    errors.append(status >= 500)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(latencies, statuses, elapsed, sum(errors))
+        summary['loans'] = statuses.count(201)
+        summary['conflicts'] = statuses.count(409)
+        summary['loans_per_s'] = round(summary['loans'] / elapsed, 1)
+        # Books marked borrowed with no open loan can never be borrowed again
+        summary['books_stranded'] = Book.objects.filter(
+            pk__in=book_ids, availability_status='borrowed'
+        ).exclude(borrow_records__return_date__isnull=True).count()
+        return summary
@@ -0,0 +1,87 @@
+import json
+import re
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from library.authentication import AccessToken
+from library.benchmarking import summarize, wsgi_get
+
+MODES = ('off', 'persistent', 'pool')
+DEFAULT_POOL = {'min_size': 1, 'max_size': 4, 'max_lifetime': 300, 'max_idle': 60, 'timeout': 10}
+ACQUIRE_TIMING = re.compile(r'db-acquire;dur=([\d.]+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure request latency through the WSGI app with database connection '
+        'reuse off, through persistent connections, and through the psycopg pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/borrow-records/', help='Endpoint to request')
+        parser.add_argument('--requests', type=int, default=200, help='Sequential requests per mode')
+        parser.add_argument('--username', default='librarian', help='User the JWT is issued for')
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=list(MODES),
+            help='Connection modes to run; pool needs PostgreSQL with psycopg 3'
+        )
+
+    def handle(self, *args, **options):
+        wrapper = connections['default']
+        if 'pool' in options['modes'] and wrapper.vendor != 'postgresql':
+            raise CommandError('Connection pooling needs PostgreSQL; pass --modes off persistent.')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' not found. Run create_test_users first.")
+
+        from library_management.wsgi import app
+
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        path, _, query = options['path'].partition('?')
+        original = {
+            'CONN_MAX_AGE': wrapper.settings_dict['CONN_MAX_AGE'],
+            'pool': wrapper.settings_dict['OPTIONS'].get('pool'),
+        }
+        pool_options = original['pool'] if isinstance(original['pool'], dict) else DEFAULT_POOL
+
+        results = {'path': options['path'], 'requests': options['requests']}
+        try:
+            for mode in options['modes']:
+                self.configure(wrapper, mode, pool_options)
+                wsgi_get(app, path, query, headers)  # warm up imports and caches
+                results[mode] = self.run(app, path, query, headers, options['requests'])
+        finally:
+            self.configure(wrapper, None, original['pool'], original['CONN_MAX_AGE'])
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def configure(self, wrapper, mode, pool_options, conn_max_age=0):
+        """Switch the default connection to ``mode`` (``None`` restores the given settings)."""
+        connections.close_all()
+        if hasattr(wrapper, 'close_pool'):
+            wrapper.close_pool()
+
+        settings_dict = wrapper.settings_dict
+        settings_dict['OPTIONS'].pop('pool', None)
+        settings_dict['CONN_MAX_AGE'] = 60 if mode == 'persistent' else conn_max_age
+        if mode == 'pool' or (mode is None and pool_options):
+            settings_dict['OPTIONS']['pool'] = pool_options
+
+    def run(self, app, path, query, headers, total):
+        latencies, statuses, acquire = [], [], []
+        started = time.perf_counter()
+        for _ in range(total):
+            latency, status, response_headers = wsgi_get(app, path, query, headers)
+            latencies.append(latency)
+            statuses.append(status)
+            match = ACQUIRE_TIMING.search(response_headers.get('Server-Timing', ''))
+            acquire.append(float(match.group(1)) if match else 0.0)
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(latencies, statuses, elapsed)
+        summary['acquire_mean_ms'] = round(statistics.fmean(acquire), 2)
+        summary['requests_connecting'] = sum(1 for duration in acquire if duration)
+        return summary
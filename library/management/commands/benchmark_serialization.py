@@ -0,0 +1,86 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from library.models import Author, Book, BorrowRecord, Member
+from library.projections import Projection
+from library.serializers import BookSerializer, BorrowRecordSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark the projected list serialization against the '
+        'ModelSerializers on synthetic rows that are rolled back afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per list page')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path; the best is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.populate(options['rows'])
+                results = {
+                    'rows': options['rows'],
+                    'book': self.compare(BookSerializer, Book.objects.select_related('author'), options),
+                    'borrow_record': self.compare(
+                        BorrowRecordSerializer, BorrowRecord.objects.select_related('book', 'member'), options
+                    ),
+                }
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def populate(self, count):
+        author = Author.objects.create(name='Benchmark Author')
+        user = User.objects.create_user('benchmark-serialization')
+        member = Member.objects.create(user=user, name='Benchmark Member', email='benchmark@library.com')
+        prefix = f'{int(time.time()) % 10**5:05d}'
+        books = Book.objects.bulk_create([
+            Book(title=f'Benchmark Book {i}', author=author, isbn=f'{prefix}{i:08d}')
+            for i in range(count)
+        ])
+        now = timezone.now()
+        BorrowRecord.objects.bulk_create([
+            BorrowRecord(book=book, member=member, return_date=now if i % 2 else None)
+            for i, book in enumerate(books)
+        ])
+        self.book_ids = [book.pk for book in books]
+
+    def compare(self, serializer_class, queryset, options):
+        """Best time in ms to fetch and render one page each way, checking the output matches."""
+        field = 'pk' if queryset.model is Book else 'book_id'
+        queryset = queryset.filter(**{f'{field}__in': self.book_ids}).order_by('id')[:options['rows']]
+        projection = Projection.for_serializer(serializer_class)
+        renderer = JSONRenderer()
+
+        def serialized():
+            return renderer.render(serializer_class(queryset.all(), many=True).data)
+
+        def projected():
+            return renderer.render(projection.represent(projection.project(queryset.all())))
+
+        if serialized() != projected():
+            raise AssertionError(f'{serializer_class.__name__}: projected output differs')
+
+        timings = {}
+        for name, run in (('serializer_ms', serialized), ('projection_ms', projected)):
+            best = float('inf')
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - started)
+            timings[name] = round(best * 1000, 2)
+        timings['speedup'] = round(timings['serializer_ms'] / timings['projection_ms'], 1)
+        return timings
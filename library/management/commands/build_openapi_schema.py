@@ -0,0 +1,45 @@
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+from library_management.docs_urls import api_info
+from library_management.views import SCHEMA_DIRECTORY, SCHEMA_MANIFEST
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the OpenAPI schema once, as JSON and YAML files named by their '
+        'content hash in STATIC_ROOT, for the docs views to serve'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default=None,
+            help=f'Directory to write to (default: STATIC_ROOT/{SCHEMA_DIRECTORY})'
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options['output'] or Path(settings.STATIC_ROOT) / SCHEMA_DIRECTORY)
+        # No request and no url: the schema has no host, so it is valid for any domain
+        schema = OpenAPISchemaGenerator(api_info).get_schema(request=None, public=True)
+        content = {
+            'json': OpenAPICodecJson(validators=[]).encode(schema),
+            'yaml': OpenAPICodecYaml(validators=[]).encode(schema),
+        }
+        digest = hashlib.sha256(content['json']).hexdigest()[:12]
+
+        directory.mkdir(parents=True, exist_ok=True)
+        manifest = {'hash': digest}
+        for extension, data in content.items():
+            manifest[extension] = f'schema.{digest}.{extension}'
+            (directory / manifest[extension]).write_bytes(data)
+        (directory / SCHEMA_MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {manifest['json']} and {manifest['yaml']} ({len(schema['paths'])} paths) to {directory}"
+        ))
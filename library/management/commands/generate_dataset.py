@@ -0,0 +1,283 @@
+import random
+import time
+from bisect import bisect
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from library.bulk import RowWriter, deferred_indexes
+from library.cache import bump_version
+from library.models import Author, Book, Member, BorrowRecord
+from library.search import update_search_index
+
+DAY = 24 * 60 * 60
+ISBN_PREFIX = '999'  # 999 + a 10-digit book id: unused by real ISBNs, and unique
+
+FIRST_NAMES = (
+    'Ada', 'Alan', 'Amara', 'Ana', 'Boris', 'Chen', 'Clara', 'Dmitri', 'Elena', 'Emeka', 'Fatima', 'Grace',
+    'Hana', 'Ivan', 'Jonas', 'Kenji', 'Lena', 'Lucia', 'Marco', 'Maya', 'Nadia', 'Omar', 'Priya', 'Rosa',
+    'Samuel', 'Sofia', 'Tomas', 'Uma', 'Victor', 'Yara',
+)
+LAST_NAMES = (
+    'Abe', 'Adeyemi', 'Berg', 'Costa', 'Dubois', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen', 'Kim',
+    'Kowalski', 'Li', 'Mensah', 'Moreau', 'Novak', 'Okafor', 'Patel', 'Quinn', 'Rossi', 'Santos', 'Silva',
+    'Tanaka', 'Usman', 'Varga', 'Weber', 'Xu', 'Yilmaz', 'Zhang', 'Zimmer',
+)
+ADJECTIVES = (
+    'Silent', 'Broken', 'Hidden', 'Last', 'Golden', 'Distant', 'Burning', 'Quiet', 'Crimson', 'Forgotten',
+    'Endless', 'Wandering', 'Hollow', 'Bright', 'Frozen', 'Secret', 'Lost', 'Northern', 'Ancient', 'Restless',
+)
+NOUNS = (
+    'River', 'Empire', 'Garden', 'Machine', 'Harbor', 'Kingdom', 'Orchard', 'Signal', 'Mountain', 'Library',
+    'Winter', 'Compass', 'Archive', 'Island', 'Engine', 'Lantern', 'Frontier', 'Theory', 'Voyage', 'Circuit',
+    'Cathedral', 'Atlas', 'Meridian', 'Garrison', 'Horizon',
+)
+
+
+def zipf_counts(total, n, exponent, rng, cap=None):
+    """
+    Split ``total`` over ``n`` ranks in proportion to ``1 / rank ** exponent``,
+    rounding each share up or down at random so the expected counts are exact.
+    Shares over ``cap`` are moved to the next most popular ranks with room.
+    """
+    weights = [1 / rank ** exponent for rank in range(1, n + 1)]
+    scale = total / sum(weights)
+    counts = []
+    for weight in weights:
+        expected = weight * scale
+        count = int(expected)
+        counts.append(count + (rng.random() < expected - count))
+    counts[0] = max(0, counts[0] + total - sum(counts))
+
+    if cap is not None:
+        excess = sum(max(0, count - cap) for count in counts)
+        counts = [min(count, cap) for count in counts]
+        for index in range(n):
+            if not excess:
+                break
+            moved = min(cap - counts[index], excess)
+            counts[index] += moved
+            excess -= moved
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic dataset of authors, books, members and years of loan history, '
+        'deterministically from a seed, with COPY on PostgreSQL and bulk INSERTs elsewhere'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--authors', type=int, default=1000, help='Authors to create')
+        parser.add_argument('--books', type=int, default=50000, help='Books to create')
+        parser.add_argument(
+            '--author-skew', type=float, default=1.1,
+            help='Zipf exponent of books per author: author k writes in proportion to 1/k^skew'
+        )
+        parser.add_argument('--members', type=int, default=10000, help='Members to create')
+        parser.add_argument('--loans', type=int, default=500000, help='Loans to create')
+        parser.add_argument(
+            '--popularity-skew', type=float, default=1.0,
+            help='Zipf exponent of loans per book, over books in a random popularity order'
+        )
+        parser.add_argument(
+            '--member-skew', type=float, default=0.5, help='Zipf exponent of loans per member'
+        )
+        parser.add_argument('--years', type=float, default=5, help='Years of loan history')
+        parser.add_argument(
+            '--on-loan', type=float, default=0.05,
+            help='Share of borrowed books whose latest loan is still open'
+        )
+        parser.add_argument(
+            '--until', type=date.fromisoformat, default=None,
+            help='Date the loan history ends on, YYYY-MM-DD (default: today); fix it to reproduce a dataset exactly'
+        )
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows written per statement')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk inserts instead of COPY on PostgreSQL')
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Maintain the book and loan indexes row by row instead of rebuilding them after the load'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['authors'], options['books'], options['members']) < 1 or options['loans'] < 0:
+            raise CommandError('--authors, --books and --members must be positive and --loans not negative.')
+
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        until = options['until'] or date.today()
+        self.end = datetime.combine(until, dt_time(), dt_timezone.utc).timestamp()
+        self.start = self.end - options['years'] * 365 * DAY
+        self.written = 0
+        started = time.monotonic()
+
+        self.first_ids = {model: self.next_id(model) for model in (Author, Book, Member, BorrowRecord)}
+        self.plan()
+        indexed = () if options['keep_indexes'] else (Book, BorrowRecord)
+        with deferred_indexes(*indexed):
+            self.write_authors()
+            self.write_books()
+            self.write_members()
+            self.write_loans()
+            loaded = time.monotonic()
+        self.stdout.write(f'Rebuilt indexes in {time.monotonic() - loaded:.1f}s')
+
+        # Rows were written with explicit ids; move PostgreSQL's sequences past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Author, Book, Member, BorrowRecord]):
+                cursor.execute(sql)
+        bump_version(Author, Book, Member, BorrowRecord)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {self.written:,} rows in {elapsed:.1f}s ({self.written / elapsed:,.0f} rows/sec)'
+        ))
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def plan(self):
+        """Draw the books per author, loans per book and the open loans, before writing anything."""
+        rng, options = self.rng, self.options
+        self.books_per_author = zipf_counts(options['books'], options['authors'], options['author_skew'], rng)
+        # A copy is out for days at a time, so a book takes at most one loan a week
+        max_loans = max(1, int((self.end - self.start) / (7 * DAY)))
+        if options['loans'] > max_loans * options['books']:
+            raise CommandError(f"{options['books']} books take at most {max_loans * options['books']} loans.")
+        self.loans_per_book = zipf_counts(
+            options['loans'], options['books'], options['popularity_skew'], rng, cap=max_loans
+        )
+        rng.shuffle(self.loans_per_book)
+
+        member_weights = [1 / rank ** options['member_skew'] for rank in range(1, options['members'] + 1)]
+        self.member_cumulative = list(accumulate(member_weights))
+
+        # The member holding each book that is on loan, so active_loans_count
+        # is known when the members are written
+        first_book = self.first_ids[Book]
+        self.open_loans = {}
+        self.active_loans = [0] * options['members']
+        for index, loans in enumerate(self.loans_per_book):
+            if loans and rng.random() < options['on_loan']:
+                member = self.pick_member()
+                self.open_loans[first_book + index] = member
+                self.active_loans[member - self.first_ids[Member]] += 1
+
+    def pick_member(self):
+        index = bisect(self.member_cumulative, self.rng.random() * self.member_cumulative[-1])
+        return self.first_ids[Member] + min(index, len(self.member_cumulative) - 1)
+
+    def write(self, model, fields, rows, on_batch=None):
+        writer = RowWriter(model, fields, self.use_copy)
+        batch_size = self.options['batch_size']
+        started = time.monotonic()
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                count += self.write_batch(writer, batch, on_batch)
+                batch = []
+        if batch:
+            count += self.write_batch(writer, batch, on_batch)
+
+        self.written += count
+        rate = count / max(time.monotonic() - started, 1e-9)
+        self.stdout.write(f'{model.__name__}: {count:,} rows ({rate:,.0f} rows/sec)')
+
+    def write_batch(self, writer, batch, on_batch):
+        with transaction.atomic():
+            writer.write(batch)
+            if on_batch:
+                on_batch(batch)
+        return len(batch)
+
+    def write_authors(self):
+        rng = self.rng
+
+        def rows():
+            for index, books in enumerate(self.books_per_author):
+                name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                yield (
+                    self.first_ids[Author] + index, name, f'Synthetic author of {books} books.',
+                    Author.normalize_name(name), books,
+                )
+
+        self.write(Author, ['id', 'name', 'biography', 'normalized_name', 'books_count'], rows())
+
+    def write_books(self):
+        rng = self.rng
+        categories = [value for value, label in Book.CATEGORY_CHOICES]
+
+        def rows():
+            book_id = self.first_ids[Book]
+            for index, books in enumerate(self.books_per_author):
+                for _ in range(books):
+                    title = f'The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}'
+                    if rng.random() < 0.3:
+                        title += f' of the {rng.choice(NOUNS)}'
+                    status = 'borrowed' if book_id in self.open_loans else 'available'
+                    yield (
+                        book_id, title, self.first_ids[Author] + index, f'{ISBN_PREFIX}{book_id:010d}',
+                        rng.choice(categories), status, self.loans_per_book[book_id - self.first_ids[Book]],
+                    )
+                    book_id += 1
+
+        def index_batch(batch):
+            update_search_index([row[0] for row in batch])
+
+        self.write(
+            Book, ['id', 'title', 'author', 'isbn', 'category', 'availability_status', 'times_borrowed'],
+            rows(), index_batch,
+        )
+
+    def write_members(self):
+        rng = self.rng
+        first_day = datetime.fromtimestamp(self.start, dt_timezone.utc).date()
+        days = max(1, int((self.end - self.start) / DAY))
+
+        def rows():
+            for index, active in enumerate(self.active_loans):
+                member_id = self.first_ids[Member] + index
+                name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                yield (
+                    member_id, name, f'member{member_id}@synthetic.library.test',
+                    first_day + timedelta(days=rng.randrange(days)), active,
+                )
+
+        self.write(Member, ['id', 'name', 'email', 'membership_date', 'active_loans_count'], rows())
+
+    def write_loans(self):
+        rng = self.rng
+        span = self.end - self.start
+        utc = dt_timezone.utc
+
+        def rows():
+            loan_id = self.first_ids[BorrowRecord]
+            for index, loans in enumerate(self.loans_per_book):
+                if not loans:
+                    continue
+                book_id = self.first_ids[Book] + index
+                # Each loan falls in its own slot of the history, so a book's
+                # loans never overlap; they last 3 to 28 days, or half a slot
+                slot = span / loans
+                for number in range(loans):
+                    if number == loans - 1 and book_id in self.open_loans:
+                        borrowed = self.end - rng.random() * min(slot, 21 * DAY)
+                        member_id = self.open_loans[book_id]
+                        yield (loan_id, book_id, member_id, datetime.fromtimestamp(borrowed, utc), None)
+                    else:
+                        borrowed = self.start + (number + rng.random() * 0.5) * slot
+                        returned = borrowed + min(slot * 0.5, rng.uniform(3 * DAY, 28 * DAY))
+                        yield (
+                            loan_id, book_id, self.pick_member(),
+                            datetime.fromtimestamp(borrowed, utc), datetime.fromtimestamp(returned, utc),
+                        )
+                    loan_id += 1
+
+        self.write(BorrowRecord, ['id', 'book', 'member', 'borrow_date', 'return_date'], rows())
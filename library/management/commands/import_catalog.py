@@ -0,0 +1,195 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Min
+from library.bulk import copy_rows
+from library.cache import bump_version
+from library.counters import count_of
+from library.models import Author, Book
+from library.search import update_search_index
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream books from a CSV or JSON Lines file into the catalog, upserting '
+        'authors by normalized name and books by ISBN'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file with title, author, isbn and category columns')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows committed per transaction')
+        parser.add_argument('--checkpoint', help='Progress file used to resume (default: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk inserts instead of COPY on PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        start = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        if start:
+            self.stdout.write(f'Resuming after row {start}')
+
+        committed = start
+        imported = skipped = 0
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as source:
+            rows = islice(self.read_rows(source, file_format), start, None)
+            for batch in batched(rows, options['batch_size']):
+                with transaction.atomic():
+                    books, invalid = self.prepare_books(batch)
+                    isbns = [book.isbn for book in books]
+                    author_ids = {book.author_id for book in books}
+                    author_ids.update(Book.objects.filter(isbn__in=isbns).values_list('author_id', flat=True))
+                    if use_copy:
+                        self.copy_books(books)
+                    else:
+                        self.insert_books(books)
+                    Author.objects.filter(pk__in=author_ids).update(books_count=count_of(Book, 'author'))
+                    update_search_index(Book.objects.filter(isbn__in=isbns).values_list('pk', flat=True))
+                    bump_version(Author, Book)
+
+                committed += len(batch)
+                imported += len(books)
+                skipped += invalid
+                self.write_checkpoint(checkpoint, committed)
+
+                rate = (committed - start) / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f'{committed} rows committed ({rate:,.0f} rows/sec)')
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} books in {elapsed:.1f}s, skipped {skipped} invalid rows'
+        ))
+
+    def read_rows(self, source, file_format):
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+    def prepare_books(self, rows):
+        """Resolve authors and build unsaved books for a batch; the last row wins for a repeated ISBN."""
+        categories = {value for value, label in Book.CATEGORY_CHOICES}
+        valid = []
+        for row in rows:
+            title = (row.get('title') or '').strip()
+            author = (row.get('author') or '').strip()
+            isbn = (row.get('isbn') or '').replace('-', '').strip()
+            if title and author and isbn and len(isbn) <= 13:
+                valid.append((title[:200], author[:200], isbn, row.get('category'), row.get('biography') or ''))
+
+        author_ids = self.upsert_authors(valid)
+        books = {
+            isbn: Book(
+                title=title,
+                author_id=author_ids[Author.normalize_name(author)],
+                isbn=isbn,
+                category=category if category in categories else 'other',
+            )
+            for title, author, isbn, category, biography in valid
+        }
+        return list(books.values()), len(rows) - len(valid)
+
+    def upsert_authors(self, rows):
+        """
+        Map the normalized author names of a batch to ids, creating missing
+        authors. Names are not unique, as two authors can share one: an
+        import reuses the oldest author with a name and never merges others.
+        """
+        new_authors = {}
+        for title, name, isbn, category, biography in rows:
+            new_authors.setdefault(Author.normalize_name(name), Author(name=name, biography=biography))
+
+        self.lock_author_names(new_authors)
+        author_ids = dict(
+            Author.objects.filter(normalized_name__in=new_authors)
+            .values('normalized_name').annotate(oldest=Min('id')).values_list('normalized_name', 'oldest')
+        )
+        missing = []
+        for normalized_name, author in new_authors.items():
+            if normalized_name not in author_ids:
+                author.normalized_name = normalized_name
+                missing.append(author)
+
+        Author.objects.bulk_create(missing)
+        author_ids.update((author.normalized_name, author.pk) for author in missing)
+        return author_ids
+
+    def lock_author_names(self, normalized_names):
+        """
+        On PostgreSQL, hold a transaction-level advisory lock per name until
+        the batch commits, so a concurrent import waits instead of creating
+        the same author. Locks are taken in key order, which cannot deadlock.
+        """
+        if connection.vendor != 'postgresql' or not normalized_names:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(key) FROM '
+                '(SELECT DISTINCT hashtext(name) AS key FROM unnest(%s::text[]) AS name ORDER BY key) AS keys',
+                [sorted(normalized_names)],
+            )
+
+    def insert_books(self, books):
+        Book.objects.bulk_create(
+            books,
+            update_conflicts=True,
+            unique_fields=['isbn'],
+            update_fields=['title', 'author', 'category'],
+        )
+
+    def copy_books(self, books):
+        """COPY a batch into a staging table and upsert it with a single INSERT ... SELECT."""
+        rows = [(book.title, book.author_id, book.isbn, book.category) for book in books]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE library_book_import '
+                '(title varchar(200), author_id bigint, isbn varchar(13), category varchar(20)) '
+                'ON COMMIT DROP'
+            )
+            copy_rows(cursor, 'COPY library_book_import (title, author_id, isbn, category) FROM STDIN', rows)
+
+            cursor.execute(
+                "INSERT INTO library_book (title, author_id, isbn, category, availability_status) "
+                "SELECT title, author_id, isbn, category, 'available' FROM library_book_import "
+                "ON CONFLICT (isbn) DO UPDATE SET "
+                "title = EXCLUDED.title, author_id = EXCLUDED.author_id, category = EXCLUDED.category"
+            )
+
+    def read_checkpoint(self, checkpoint):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return json.load(f)['rows']
+
+    def write_checkpoint(self, checkpoint, rows):
+        # Batches are idempotent upserts, so a crash between a commit and
+        # this write only means one batch is applied twice on resume
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'rows': rows}, f)
+        os.replace(temporary, checkpoint)
@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from library.loadtest import DEFAULT_MIX, SCENARIOS, Context, HTTPTransport, LoadTestError, WSGITransport, run
+
+
+def parse_mix(value):
+    """Parse ``browse=60,login=5,...`` into scenario weights."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in SCENARIOS or not weight.strip().isdigit():
+            raise CommandError(
+                f"Invalid scenario weight '{item}'. Expected name=weight with names from {', '.join(SCENARIOS)}."
+            )
+        mix[name.strip()] = int(weight)
+    if not any(mix.values()):
+        raise CommandError('At least one scenario needs a positive weight.')
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the API with a weighted mix of catalog browsing, logins, borrow/return '
+        'contention on popular books and librarian CRUD; reports per-endpoint throughput, '
+        'latency percentiles and error rate as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default=None,
+            help='Server to load, e.g. http://localhost:8000 (default: the WSGI app in-process)'
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+        parser.add_argument(
+            '--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Scenario weights, as name=weight pairs'
+        )
+        parser.add_argument('--hot-books', type=int, default=3, help='Popular books the circulation scenario borrows')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for scenario choices, so runs are comparable')
+        parser.add_argument('--librarian', default='librarian:password123', help='Librarian username:password')
+        parser.add_argument('--member', default='member:password123', help='Member username:password')
+        parser.add_argument('--output', default=None, help='Also write the report to this file')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if options['base_url']:
+            transport = HTTPTransport(options['base_url'])
+        else:
+            from library_management.wsgi import app
+
+            transport = WSGITransport(app)
+
+        credentials = {}
+        for role in ('librarian', 'member'):
+            username, _, password = options[role].partition(':')
+            credentials[role] = {'username': username, 'password': password}
+
+        context = Context(credentials, options['hot_books'], options['seed'])
+        try:
+            context.setup(transport)
+            report = run(transport, context, mix, options['concurrency'], options['duration'])
+        except LoadTestError as e:
+            raise CommandError(str(e))
+        if not options['base_url']:
+            report['database'] = connection.vendor
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter, so every import is a cold one
+COLD_START_SCRIPT = '''
+import importlib, json, sys, time
+started = time.perf_counter()
+module, attribute = sys.argv[1].rsplit('.', 1)
+app = getattr(importlib.import_module(module), attribute)
+loaded = time.perf_counter()
+from library.benchmarking import wsgi_get
+latency, status, headers = wsgi_get(app, sys.argv[2], sys.argv[3])
+print(json.dumps({
+    'startup_ms': round((loaded - started) * 1000, 1),
+    'first_response_ms': round(latency * 1000, 1),
+    'time_to_first_response_ms': round((time.perf_counter() - started) * 1000, 1),
+    'status': status,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile a cold start of the WSGI application: time to the first response '
+        'for a path and python -X importtime self time aggregated per app'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/books/', help='Path of the first request')
+        parser.add_argument('--top', type=int, default=15, help='Apps and modules to list')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        path, _, query = options['path'].partition('?')
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START_SCRIPT, settings.WSGI_APPLICATION, path, query],
+            capture_output=True, text=True, cwd=settings.BASE_DIR, env=env,
+        )
+        if result.returncode:
+            raise CommandError(f'Cold start failed:\n{result.stderr[-2000:]}')
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = self.parse_importtime(result.stderr)
+        report['import_ms'] = round(sum(modules.values()) / 1000, 1)
+        report['apps'] = self.per_app(modules)[:options['top']]
+        report['modules'] = [
+            {'module': module, 'self_ms': round(micros / 1000, 1)}
+            for module, micros in sorted(modules.items(), key=lambda item: -item[1])[:options['top']]
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{options['path']}: {report['time_to_first_response_ms']}ms to first response "
+            f"({report['startup_ms']}ms startup + {report['first_response_ms']}ms first request, "
+            f"status {report['status']}); {report['import_ms']}ms importing"
+        )
+        self.stdout.write('\nImport self time per app:')
+        for row in report['apps']:
+            self.stdout.write(f"  {row['self_ms']:>8.1f}ms  {row['modules']:>4} modules  {row['app']}")
+        self.stdout.write('\nSlowest modules:')
+        for row in report['modules']:
+            self.stdout.write(f"  {row['self_ms']:>8.1f}ms  {row['module']}")
+
+    def parse_importtime(self, output):
+        """Map each imported module to its self time in microseconds."""
+        modules = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            fields = line[len('import time:'):].split('|')
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue  # the header line
+            modules[fields[2].strip()] = int(fields[0])
+        return modules
+
+    def per_app(self, modules):
+        """Aggregate module self times by installed app, else by top-level package."""
+        app_names = sorted((config.name for config in apps.get_app_configs()), key=len, reverse=True)
+        totals = defaultdict(lambda: [0, 0])
+        for module, micros in modules.items():
+            owner = next(
+                (name for name in app_names if module == name or module.startswith(name + '.')),
+                module.split('.')[0],
+            )
+            totals[owner][0] += micros
+            totals[owner][1] += 1
+        return [
+            {'app': owner, 'self_ms': round(micros / 1000, 1), 'modules': count}
+            for owner, (micros, count) in sorted(totals.items(), key=lambda item: -item[1][0])
+        ]
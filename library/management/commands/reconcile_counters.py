@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from library.cache import bump_version
+from library.counters import count_of, reconcile
+from library.models import Author, Book, Member, BorrowRecord
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized book and loan counters and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows checked per UPDATE statement')
+
+    def handle(self, *args, **options):
+        counters = [
+            (Author, 'books_count', count_of(Book, 'author')),
+            (Book, 'times_borrowed', count_of(BorrowRecord, 'book')),
+            (Member, 'active_loans_count', count_of(BorrowRecord, 'member', return_date__isnull=True)),
+        ]
+        for model, field, actual in counters:
+            fixed = reconcile(model.objects.all(), field, actual, options['batch_size'])
+            if fixed:
+                bump_version(model)
+            self.stdout.write(f'{model.__name__}.{field}: fixed {fixed} rows')
+
+        self.stdout.write(self.style.SUCCESS('Counters reconciled successfully!'))
@@ -0,0 +1,189 @@
+"""
+Per-route request metrics in the Prometheus text format.
+
+``MetricsMiddleware`` records, per resolved route (``book-list``,
+``borrowrecord-borrow``, ...) and method: a latency histogram, status
+codes, response bytes, and the SQL queries and connection time collected
+by the database backends (see ``library.backends.timing``). The hits,
+misses and evictions of the two-tier cache (``library.backends.twotier``)
+are exported per key namespace alongside.
+
+Recording takes no lock. Each thread aggregates into its own shard, which
+only that thread writes to; ``render_metrics`` sums the shards when the
+metrics endpoint is scraped. The shards of threads that have exited are
+folded into one retired total whenever a thread registers a shard or the
+endpoint is scraped, so thread-per-request servers and executor threads
+do not grow the list. Counts are per process, as with any multi-process
+Prometheus target.
+"""
+import threading
+from bisect import bisect_left
+
+from .backends.twotier import OUTCOMES, cache_stats, reset_cache_stats
+
+# Upper bounds in seconds, as in the Prometheus client's defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+UNRESOLVED_ROUTE = 'unresolved'
+
+_shards = []  # (thread, shard) of the threads that have recorded
+_retired = {}  # the summed shards of threads that have exited
+_shards_lock = threading.Lock()
+_local = threading.local()
+
+
+class RouteStats:
+    __slots__ = ('buckets', 'latency', 'statuses', 'bytes', 'queries', 'query_time', 'connection_time')
+
+    def __init__(self):
+        # One count per bucket, plus +Inf
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency = 0.0
+        self.statuses = {}
+        self.bytes = 0
+        self.queries = 0
+        self.query_time = 0.0
+        self.connection_time = 0.0
+
+
+def _retire_dead_shards():
+    """Fold the shards of exited threads, which no longer write to them, into ``_retired``."""
+    live = []
+    for thread, shard in _shards:
+        if thread.is_alive():
+            live.append((thread, shard))
+        else:
+            _add(_retired, shard)
+    _shards[:] = live
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _retire_dead_shards()
+            _shards.append((threading.current_thread(), shard))
+    return shard
+
+
+def route_stats(route, method):
+    """The current thread's stats for ``route`` and ``method``."""
+    shard = _shard()
+    stats = shard.get((route, method))
+    if stats is None:
+        stats = shard[(route, method)] = RouteStats()
+    return stats
+
+
+def record_request(route, method, status, latency, size, timings=None):
+    stats = route_stats(route, method)
+    stats.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+    stats.latency += latency
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    stats.bytes += size
+    if timings is not None:
+        stats.queries += timings.queries
+        stats.query_time += timings.query_time
+        stats.connection_time += timings.acquire
+
+
+def reset_metrics():
+    with _shards_lock:
+        _retired.clear()
+        for _, shard in _shards:
+            shard.clear()
+    reset_cache_stats()
+
+
+def _add(totals, shard):
+    """Add the stats of ``shard`` to those in ``totals``."""
+    # Copy first: the owning thread may add routes while we read
+    for key, stats in list(shard.items()):
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = RouteStats()
+        total.buckets = [a + b for a, b in zip(total.buckets, stats.buckets)]
+        total.latency += stats.latency
+        for status, count in list(stats.statuses.items()):
+            total.statuses[status] = total.statuses.get(status, 0) + count
+        total.bytes += stats.bytes
+        total.queries += stats.queries
+        total.query_time += stats.query_time
+        total.connection_time += stats.connection_time
+
+
+def collect():
+    """Sum every thread's stats into ``{(route, method): RouteStats}``."""
+    totals = {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _add(totals, _retired)
+        shards = [shard for _, shard in _shards]
+    for shard in shards:
+        _add(totals, shard)
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def render_metrics():
+    """All recorded metrics in the Prometheus text exposition format."""
+    totals = sorted(collect().items())
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+
+    def counter(name, help_text, value):
+        family(name, 'counter', help_text, [
+            f'{name}{_labels(route=route, method=method)} {value(stats)}'
+            for (route, method), stats in totals
+        ])
+
+    histogram = []
+    for (route, method), stats in totals:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+            cumulative += count
+            labels = _labels(route=route, method=method, le=bound)
+            histogram.append(f'library_http_request_duration_seconds_bucket{labels} {cumulative}')
+        labels = _labels(route=route, method=method)
+        histogram.append(f'library_http_request_duration_seconds_sum{labels} {stats.latency}')
+        histogram.append(f'library_http_request_duration_seconds_count{labels} {cumulative}')
+    family('library_http_request_duration_seconds', 'histogram', 'Request latency.', histogram)
+
+    family('library_http_requests_total', 'counter', 'Requests by response status.', [
+        f'library_http_requests_total{_labels(route=route, method=method, status=status)} {count}'
+        for (route, method), stats in totals
+        for status, count in sorted(stats.statuses.items())
+    ])
+    counter('library_http_response_bytes_total', 'Response body bytes.', lambda stats: stats.bytes)
+    counter('library_db_queries_total', 'SQL queries executed.', lambda stats: stats.queries)
+    counter(
+        'library_db_query_duration_seconds_total', 'Time spent executing SQL queries.',
+        lambda stats: stats.query_time,
+    )
+    counter(
+        'library_db_connection_duration_seconds_total', 'Time spent opening database connections.',
+        lambda stats: stats.connection_time,
+    )
+
+    namespaces = sorted(cache_stats().items())
+    family('library_cache_requests_total', 'counter', 'Cache reads by namespace and outcome.', [
+        f'library_cache_requests_total{_labels(namespace=namespace, result=outcome)} {getattr(stats, outcome)}'
+        for namespace, stats in namespaces
+        for outcome in OUTCOMES
+    ])
+    family('library_cache_evictions_total', 'counter', 'Entries evicted from the in-process cache.', [
+        f'library_cache_evictions_total{_labels(namespace=namespace)} {stats.evictions}'
+        for namespace, stats in namespaces
+    ])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,148 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .backends.timing import start_request_timings
+from .metrics import UNRESOLVED_ROUTE, record_request, route_stats
+
+
+class ConnectionTimingMiddleware:
+    """
+    Report the time each request spent getting database connections in a
+    ``Server-Timing`` header, and on ``request.db_timings`` for other
+    middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.db_timings = start_request_timings()
+        return self.add_header(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        request.db_timings = start_request_timings()
+        return self.add_header(request, await self.get_response(request))
+
+    def add_header(self, request, response):
+        timings = request.db_timings
+        if timings.connections:
+            entries = [
+                f'db-wait;dur={timings.wait * 1000:.2f}',
+                f'db-acquire;dur={timings.acquire * 1000:.2f};desc="{timings.connections} connection(s)"',
+            ]
+            if response.has_header('Server-Timing'):
+                entries.insert(0, response['Server-Timing'])
+            response['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record each request's latency, status, response size and database
+    timings under its resolved route, for the metrics endpoint. Goes before
+    ``ConnectionTimingMiddleware``, whose ``request.db_timings`` it reads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        return self.record(request, self.get_response(request), started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        return self.record(request, await self.get_response(request), started)
+
+    def record(self, request, response, started):
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match else UNRESOLVED_ROUTE
+        if not response.streaming:
+            size = len(response.content)
+        elif response.has_header('Content-Length'):
+            size = int(response['Content-Length'])  # files, which keep their file wrapper
+        else:
+            # Counted as the body is sent; the latency is time to the first byte
+            size = 0
+            self.count_streamed_bytes(response, route, request.method)
+        record_request(
+            route, request.method, response.status_code, time.perf_counter() - started,
+            size, getattr(request, 'db_timings', None),
+        )
+        return response
+
+    def count_streamed_bytes(self, response, route, method):
+        content = response.streaming_content
+
+        # Added to the shard of whichever thread finishes the stream
+        if response.is_async:
+            async def counted():
+                size = 0
+                try:
+                    async for chunk in content:
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    route_stats(route, method).bytes += size
+        else:
+            def counted():
+                size = 0
+                try:
+                    for chunk in content:
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    route_stats(route, method).bytes += size
+
+        response.streaming_content = counted()
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, usable without an async-to-sync hop under ASGI.
+
+    ``WhiteNoiseMiddleware`` is sync-only, so Django would run every ASGI
+    request through a thread to pass it. Here, finding a file is a lookup
+    in the table WhiteNoise builds at startup, or, with autorefresh, a
+    look at the disk in a thread for URLs under a static prefix. Serving a
+    static file, which opens it, also goes to a thread; every other request
+    reaches the async views directly.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Only URLs under these can be files, so no other request needs a lookup
+        self.file_prefixes = tuple({self.static_prefix, *(prefix for _, prefix in self.directories)})
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if request.path_info.startswith(self.file_prefixes):
+            if self.autorefresh:
+                static_file = await sync_to_async(self.find_file)(request.path_info)
+            else:
+                static_file = self.files.get(request.path_info)
+            if static_file is not None:
+                return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
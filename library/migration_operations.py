@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    Add an index without blocking writes to the table.
+
+    Uses ``CREATE INDEX CONCURRENTLY`` on PostgreSQL and falls back to a plain
+    ``CREATE INDEX`` on other databases. Migrations using this operation must
+    set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, **self._concurrently(schema_editor))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, **self._concurrently(schema_editor))
+
+    def describe(self):
+        return super().describe() + ' concurrently'
+
+    @staticmethod
+    def _concurrently(schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            return {'concurrently': True}
+        return {}
+
+
+class AddUniqueConstraintConcurrently(migrations.AddConstraint):
+    """
+    Add a ``UniqueConstraint`` without blocking writes to the table.
+
+    On PostgreSQL the unique index is built with ``CREATE UNIQUE INDEX
+    CONCURRENTLY``. A plain constraint on fields is then attached to it with
+    ``ADD CONSTRAINT ... UNIQUE USING INDEX``, which is a catalog change.
+    One with a condition, expressions or included columns stays a unique
+    index, as Django creates it. Other databases add the constraint as
+    usual. Migrations using this operation must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.add_constraint(model, self.constraint)
+            return
+
+        quote = schema_editor.quote_name
+        table, name = quote(model._meta.db_table), quote(self.constraint.name)
+        if self._is_index():
+            sql = str(self.constraint.create_sql(model, schema_editor))
+            schema_editor.execute(sql.replace('CREATE UNIQUE INDEX ', 'CREATE UNIQUE INDEX CONCURRENTLY ', 1), params=None)
+            return
+        columns = ', '.join(quote(model._meta.get_field(field).column) for field in self.constraint.fields)
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})', params=None)
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}', params=None)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if schema_editor.connection.vendor != 'postgresql':
+            schema_editor.remove_constraint(model, self.constraint)
+            return
+        if self._is_index():
+            schema_editor.execute(
+                f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.constraint.name)}', params=None
+            )
+        else:
+            schema_editor.remove_constraint(model, self.constraint)
+
+    def _is_index(self):
+        constraint = self.constraint
+        return bool(constraint.condition or constraint.expressions or constraint.include or constraint.opclasses)
+
+    def describe(self):
+        return super().describe() + ' concurrently'
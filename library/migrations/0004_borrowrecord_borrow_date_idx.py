@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+from library.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('library', '0003_member_user'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='borrowrecord',
+            index=models.Index(fields=['borrow_date', 'id'], name='borrowrecord_borrow_date_idx'),
+        ),
+    ]
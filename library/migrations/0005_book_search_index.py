@@ -0,0 +1,153 @@
+from django.db import migrations
+
+
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE library_book ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION library_book_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(NEW.isbn, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT name FROM library_author WHERE id = NEW.author_id), ''
+            )), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER library_book_search_vector
+    BEFORE INSERT OR UPDATE OF title, isbn, author_id ON library_book
+    FOR EACH ROW EXECUTE FUNCTION library_book_search_vector_update()
+    """,
+    """
+    CREATE FUNCTION library_author_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE library_book SET title = title WHERE author_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER library_author_search_vector
+    AFTER UPDATE OF name ON library_author
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION library_author_search_vector_update()
+    """,
+    # Existing rows are indexed by backfill_search_vectors, below
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER IF EXISTS library_author_search_vector ON library_author",
+    "DROP FUNCTION IF EXISTS library_author_search_vector_update()",
+    "DROP TRIGGER IF EXISTS library_book_search_vector ON library_book",
+    "DROP FUNCTION IF EXISTS library_book_search_vector_update()",
+    "ALTER TABLE library_book DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE library_book_fts USING fts5(title, author_name, isbn)",
+    """
+    CREATE TRIGGER library_book_fts_insert AFTER INSERT ON library_book BEGIN
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        VALUES (NEW.id, NEW.title, (SELECT name FROM library_author WHERE id = NEW.author_id), NEW.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER library_book_fts_update AFTER UPDATE OF title, isbn, author_id ON library_book BEGIN
+        DELETE FROM library_book_fts WHERE rowid = OLD.id;
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        VALUES (NEW.id, NEW.title, (SELECT name FROM library_author WHERE id = NEW.author_id), NEW.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER library_book_fts_delete AFTER DELETE ON library_book BEGIN
+        DELETE FROM library_book_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER library_author_fts_update AFTER UPDATE OF name ON library_author
+    WHEN OLD.name IS NOT NEW.name BEGIN
+        DELETE FROM library_book_fts WHERE rowid IN (SELECT id FROM library_book WHERE author_id = NEW.id);
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        SELECT id, title, NEW.name, isbn FROM library_book WHERE author_id = NEW.id;
+    END
+    """,
+    """
+    INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+    SELECT library_book.id, library_book.title, library_author.name, library_book.isbn
+    FROM library_book JOIN library_author ON library_author.id = library_book.author_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS library_author_fts_update",
+    "DROP TRIGGER IF EXISTS library_book_fts_delete",
+    "DROP TRIGGER IF EXISTS library_book_fts_update",
+    "DROP TRIGGER IF EXISTS library_book_fts_insert",
+    "DROP TABLE IF EXISTS library_book_fts",
+]
+
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def run_statements(statements):
+    """Build a RunPython callable running the statements for the matching vendor."""
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def backfill_search_vectors(apps, schema_editor):
+    """
+    Fill the search vector of existing books in id batches, each committed on
+    its own, so no statement locks more than a batch of rows.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT max(id) FROM library_book')
+        last_id = cursor.fetchone()[0] or 0
+        for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                'UPDATE library_book SET title = title '
+                'WHERE id > %s AND id <= %s AND search_vector IS NULL',
+                [start, start + BACKFILL_BATCH_SIZE],
+            )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS library_book_search_vector_idx '
+            'ON library_book USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS library_book_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    # The backfill commits batch by batch, and CREATE INDEX CONCURRENTLY
+    # cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('library', '0004_borrowrecord_borrow_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_statements({'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+            atomic=True,
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+from library.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('library', '0005_book_search_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(fields=['category', 'id'], name='book_category_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(fields=['availability_status', 'id'], name='book_availability_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='borrowrecord',
+            index=models.Index(fields=['member', 'borrow_date', 'id'], name='borrowrecord_member_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='borrowrecord',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['borrow_date', 'id'], name='borrowrecord_open_loans_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:46
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Now
+
+from library.migration_operations import AddUniqueConstraintConcurrently
+
+
+def close_duplicate_open_loans(apps, schema_editor):
+    """
+    Concurrent borrows could open several loans on one book before this
+    constraint existed. Keep the newest open loan of each book, which the
+    book's status was last set from, and close the others.
+    """
+    BorrowRecord = apps.get_model('library', 'BorrowRecord')
+    newer_open_loan = BorrowRecord.objects.filter(
+        book_id=OuterRef('book_id'), return_date__isnull=True, pk__gt=OuterRef('pk')
+    )
+    BorrowRecord.objects.filter(return_date__isnull=True).filter(Exists(newer_open_loan)).update(return_date=Now())
+
+
+class Migration(migrations.Migration):
+
+    # CREATE UNIQUE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('library', '0006_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_loans, migrations.RunPython.noop, atomic=True),
+        AddUniqueConstraintConcurrently(
+            model_name='borrowrecord',
+            constraint=models.UniqueConstraint(condition=models.Q(('return_date__isnull', True)), fields=('book',), name='borrowrecord_one_open_loan_per_book'),
+        ),
+    ]
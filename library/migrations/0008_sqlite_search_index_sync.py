@@ -0,0 +1,75 @@
+from django.db import migrations
+
+
+SQLITE_TRIGGERS = [
+    'library_author_fts_update',
+    'library_book_fts_delete',
+    'library_book_fts_update',
+    'library_book_fts_insert',
+]
+
+# The triggers of 0005, restored when this migration is reversed
+SQLITE_BACKWARD = [
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_insert AFTER INSERT ON library_book BEGIN
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        VALUES (NEW.id, NEW.title, (SELECT name FROM library_author WHERE id = NEW.author_id), NEW.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_update AFTER UPDATE OF title, isbn, author_id ON library_book BEGIN
+        DELETE FROM library_book_fts WHERE rowid = OLD.id;
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        VALUES (NEW.id, NEW.title, (SELECT name FROM library_author WHERE id = NEW.author_id), NEW.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_delete AFTER DELETE ON library_book BEGIN
+        DELETE FROM library_book_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_author_fts_update AFTER UPDATE OF name ON library_author
+    WHEN OLD.name IS NOT NEW.name BEGIN
+        DELETE FROM library_book_fts WHERE rowid IN (SELECT id FROM library_book WHERE author_id = NEW.id);
+        INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+        SELECT id, title, NEW.name, isbn FROM library_book WHERE author_id = NEW.id;
+    END
+    """,
+    # Writers that bypassed the signals, such as bulk updates, may have left
+    # the index behind while the triggers were gone
+    "DELETE FROM library_book_fts",
+    """
+    INSERT INTO library_book_fts (rowid, title, author_name, isbn)
+    SELECT library_book.id, library_book.title, library_author.name, library_book.isbn
+    FROM library_book JOIN library_author ON library_author.id = library_book.author_id
+    """,
+]
+
+
+def drop_sqlite_triggers(apps, schema_editor):
+    # SQLite alters tables by rebuilding and renaming them, which fails while
+    # a trigger references the table and drops triggers defined on it. The
+    # FTS5 index is kept in sync by library.signals on SQLite instead, which
+    # already runs alongside the triggers, so the index stays maintained. The
+    # PostgreSQL triggers and their functions from 0005 are left as they are.
+    if schema_editor.connection.vendor == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+
+def restore_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_one_open_loan_per_book'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, restore_sqlite_triggers),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+def backfill_normalized_names(apps, schema_editor):
+    Author = apps.get_model('library', 'Author')
+    authors = list(Author.objects.only('name'))
+    for author in authors:
+        author.normalized_name = ' '.join(author.name.split()).casefold()
+    Author.objects.bulk_update(authors, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_sqlite_search_index_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_normalized_names, migrations.RunPython.noop),
+    ]
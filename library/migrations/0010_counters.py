@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+from library.counters import count_of, reconcile
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Fill the counters one primary-key range at a time, as reconcile_counters
+    does. Outside a transaction each range commits on its own, so no row
+    stays locked for the whole backfill.
+    """
+    Author = apps.get_model('library', 'Author')
+    Book = apps.get_model('library', 'Book')
+    Member = apps.get_model('library', 'Member')
+    BorrowRecord = apps.get_model('library', 'BorrowRecord')
+    reconcile(Author.objects.all(), 'books_count', count_of(Book, 'author'))
+    reconcile(Book.objects.all(), 'times_borrowed', count_of(BorrowRecord, 'book'))
+    reconcile(
+        Member.objects.all(), 'active_loans_count', count_of(BorrowRecord, 'member', return_date__isnull=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    # The backfill commits batch by batch
+    atomic = False
+
+    dependencies = [
+        ('library', '0009_author_normalized_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='books_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='times_borrowed',
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='active_loans_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(editable=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('book', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='library.book')),
+                ('member', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='library.member')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('book', 'position'), name='hold_book_position_uniq'), models.UniqueConstraint(fields=('member', 'book'), name='hold_one_per_member_and_book')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+from library.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('library', '0011_holds'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='member',
+            index=models.Index(fields=['name', 'id'], name='member_name_idx'),
+        ),
+    ]
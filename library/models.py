@@ -1,16 +1,33 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+class BookNotAvailable(Exception):
+    """Raised when opening a loan on a book that is not available."""
+
+
 class Author(models.Model):
     """Model representing an author of books."""
     name = models.CharField(max_length=200)
     biography = models.TextField(blank=True)
+    normalized_name = models.CharField(max_length=200, db_index=True, editable=False, default='')
+    books_count = models.PositiveIntegerField(default=0, db_default=0, editable=False)
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def normalize_name(name):
+        """Case- and whitespace-insensitive form of a name, used to match imported authors."""
+        return ' '.join(name.split()).casefold()
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = self.normalize_name(self.name)
+        super().save(*args, **kwargs)
+
 
 class Book(models.Model):
     """Model representing a book in the library."""
@@ -35,10 +52,31 @@ class Book(models.Model):
     isbn = models.CharField(max_length=13, unique=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other')
     availability_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    times_borrowed = models.PositiveIntegerField(default=0, db_default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'id'], name='book_category_idx'),
+            models.Index(fields=['availability_status', 'id'], name='book_availability_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author.name}"
 
+    def save(self, *args, **kwargs):
+        # Keep Author.books_count in step with the book's author, in the same transaction
+        with transaction.atomic(savepoint=False):
+            previous_author_id = None
+            if not self._state.adding:
+                previous_author_id = Book.objects.filter(pk=self.pk).values_list('author_id', flat=True).first()
+
+            super().save(*args, **kwargs)
+
+            if previous_author_id != self.author_id:
+                Author.objects.filter(pk=self.author_id).update(books_count=F('books_count') + 1)
+                if previous_author_id is not None:
+                    Author.objects.filter(pk=previous_author_id).update(books_count=Greatest(F('books_count') - 1, 0))
+
 
 class Member(models.Model):
     """Model representing a library member."""
@@ -46,6 +84,12 @@ class Member(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField(unique=True)
     membership_date = models.DateField(default=timezone.now)
+    active_loans_count = models.PositiveIntegerField(default=0, db_default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='member_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.email})"
@@ -58,16 +102,77 @@ class BorrowRecord(models.Model):
     borrow_date = models.DateTimeField(default=timezone.now)
     return_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['borrow_date', 'id'], name='borrowrecord_borrow_date_idx'),
+            models.Index(fields=['member', 'borrow_date', 'id'], name='borrowrecord_member_idx'),
+            models.Index(
+                fields=['borrow_date', 'id'],
+                condition=models.Q(return_date__isnull=True),
+                name='borrowrecord_open_loans_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book'],
+                condition=models.Q(return_date__isnull=True),
+                name='borrowrecord_one_open_loan_per_book',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.book.title} borrowed by {self.member.name} on {self.borrow_date.date()}"
 
     def save(self, *args, **kwargs):
-        # Update book availability status when borrowing/returning
-        if not self.pk:  # New record
-            self.book.availability_status = 'borrowed'
-            self.book.save()
-        elif self.return_date:
-            self.book.availability_status = 'available'
-            self.book.save()
-        
-        super().save(*args, **kwargs)
+        # Update book availability status and the loan counters when
+        # borrowing/returning, in the same transaction and without reading
+        # or re-writing the whole book and member rows
+        with transaction.atomic(savepoint=False):
+            if self._state.adding and not self.return_date:  # New loan
+                claimed = Book.objects.filter(
+                    pk=self.book_id, availability_status='available'
+                ).update(availability_status='borrowed', times_borrowed=F('times_borrowed') + 1)
+                if not claimed:
+                    raise BookNotAvailable(self.book_id)
+                Member.objects.filter(pk=self.member_id).update(active_loans_count=F('active_loans_count') + 1)
+                self._set_cached_book_status('borrowed')
+            elif self.return_date:
+                if self._state.adding:  # Loan recorded after the fact
+                    Book.objects.filter(pk=self.book_id).update(
+                        availability_status='available', times_borrowed=F('times_borrowed') + 1
+                    )
+                else:
+                    closed = BorrowRecord.objects.filter(
+                        pk=self.pk, return_date__isnull=True
+                    ).update(return_date=self.return_date)
+                    if closed:
+                        Member.objects.filter(pk=self.member_id).update(
+                            active_loans_count=Greatest(F('active_loans_count') - 1, 0)
+                        )
+                    Book.objects.filter(pk=self.book_id).update(availability_status='available')
+                self._set_cached_book_status('available')
+
+            super().save(*args, **kwargs)
+
+    def _set_cached_book_status(self, status):
+        if BorrowRecord.book.is_cached(self):
+            self.book.availability_status = status
+
+
+class Hold(models.Model):
+    """A member's place in a book's FIFO hold queue."""
+    # Both foreign keys lead the unique indexes below, which serve their lookups
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='holds', db_index=False)
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='holds', db_index=False)
+    position = models.PositiveIntegerField(editable=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        constraints = [
+            # Also the index the head, tail and place-in-queue lookups seek on
+            models.UniqueConstraint(fields=['book', 'position'], name='hold_book_position_uniq'),
+            models.UniqueConstraint(fields=['member', 'book'], name='hold_one_per_member_and_book'),
+        ]
+
+    def __str__(self):
+        return f"Hold #{self.position} on {self.book.title} for {self.member.name}"
@@ -0,0 +1,88 @@
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from .counting import cached_count
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Each page is fetched with a ``WHERE id > cursor`` range scan on the
+    primary key index, so deep pages cost the same as the first one. Pages
+    carry the ``count`` of the whole list, estimated past
+    ``EXACT_COUNT_THRESHOLD`` rows as flagged by ``count_exact``.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Count the view's model rows rather than a projection of them, as
+        # the joins that fetch related columns do not change the count
+        countable = view.filter_queryset(view.get_queryset()) if view is not None else queryset
+        self.count, self.count_exact = cached_count(countable)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['required'] = ['count', 'count_exact', 'results']
+        response_schema['properties'] = {
+            'count': {'type': 'integer', 'example': 123},
+            'count_exact': {'type': 'boolean'},
+            **response_schema['properties'],
+        }
+        return response_schema
+
+
+class BorrowRecordCursorPagination(IdCursorPagination):
+    """Keyset pagination on ``(borrow_date, id)``, newest loans first."""
+    ordering = ('-borrow_date', '-id')
+
+
+class SearchResultsPagination(PageNumberPagination):
+    """
+    Page-number pagination for relevance-ranked search results, which have
+    no stable key to build a cursor from.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    @property
+    def django_paginator_class(self):
+        return EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.page.paginator.count_exact
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {'type': 'boolean'}
+        return response_schema
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator whose count is exact up to ``EXACT_COUNT_THRESHOLD`` rows
+    and estimated past it, so the last pages of a very large list may come
+    out short or empty. Used by admin changelists and search results.
+    """
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = cached_count(self.object_list)
+        return count
@@ -0,0 +1,181 @@
+"""
+Fast read-only serialization for list responses.
+
+A ``Projection`` is compiled once per serializer class: it maps each
+serializer field to the column it is read from, so a list page can be
+fetched with ``values_list()`` as flat rows, joined columns included, and
+turned into the same dicts the serializer would build, without model
+instances or per-field ``ModelSerializer`` machinery. Only fields whose
+representation is the column value itself are copied as is; everything
+else (dates, decimals, ...) still goes through the field's own
+``to_representation``, so the rendered JSON is identical. ISO 8601
+datetimes are the exception: their time zone is resolved once per page
+rather than once per value.
+"""
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+# Serializer fields whose representation of a value of the matching model
+# field type is the value itself
+NATIVE_FIELDS = (
+    (serializers.CharField, (models.CharField, models.TextField)),
+    (serializers.ChoiceField, (models.CharField, models.IntegerField)),
+    (serializers.IntegerField, (models.IntegerField, models.AutoField)),
+    (serializers.BooleanField, (models.BooleanField,)),
+)
+
+
+def _model_field(model, lookup):
+    """The model field a ``__``-separated lookup ends on."""
+    field = None
+    for name in lookup.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def _datetime_converter(field):
+    """``DateTimeField.to_representation`` for ISO 8601, with the time zone looked up once."""
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    def convert(value):
+        if field_timezone is None or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return convert
+
+
+def _converter_factory(field):
+    """A callable returning the converter to use for one page."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if isinstance(field, serializers.DateTimeField) and output_format and output_format.lower() == ISO_8601:
+        return lambda: _datetime_converter(field)
+    return lambda: field.to_representation
+
+
+class Projection:
+    """Column mapping and converters compiled from a serializer class."""
+
+    _compiled = {}
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer_class.Meta.model
+        self.names = []
+        self.lookups = []
+        self.converters = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            lookup, convert = self._compile_field(model, field)
+            self.names.append(name)
+            self.lookups.append(lookup)
+            if convert is not None:
+                self.converters.append((name, convert))
+
+        self.columns = list(dict.fromkeys(self.lookups))
+        indexes = [self.columns.index(lookup) for lookup in self.lookups]
+        self.getter = itemgetter(*indexes) if len(indexes) > 1 else lambda row: (row[indexes[0]],)
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        if serializer_class not in cls._compiled:
+            cls._compiled[serializer_class] = cls(serializer_class)
+        return cls._compiled[serializer_class]
+
+    def _compile_field(self, model, field):
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            raise ImproperlyConfigured(
+                f"Field '{field.field_name}' of {type(field.parent).__name__} cannot be projected to a column."
+            )
+
+        lookup = '__'.join(field.source_attrs)
+        try:
+            model_field = _model_field(model, lookup)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f"Field '{field.field_name}' of {type(field.parent).__name__} is not backed by a column."
+            )
+
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            # values_list() already yields the related primary key
+            return lookup, None
+        for serializer_field, model_fields in NATIVE_FIELDS:
+            if isinstance(field, serializer_field) and isinstance(model_field, model_fields):
+                return lookup, None
+        return lookup, _converter_factory(field)
+
+    def project(self, queryset, extra=()):
+        """
+        The rows of ``queryset`` as named tuples of the projected columns,
+        plus any ``extra`` columns needed by the paginator.
+        """
+        columns = self.columns + [column for column in extra if column not in self.columns]
+        return queryset.values_list(*columns, named=True)
+
+    def represent(self, rows):
+        """The serializer representation of rows returned by ``project``."""
+        names, getter = self.names, self.getter
+        converters = [(name, factory()) for name, factory in self.converters]
+        data = []
+        for row in rows:
+            item = dict(zip(names, getter(row)))
+            for name, convert in converters:
+                value = item[name]
+                if value is not None:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+
+class ProjectedListMixin:
+    """
+    Serves the ``list`` action (and ``alist`` of ``AsyncReadMixin``) from a
+    ``Projection`` of the ViewSet's serializer instead of model instances.
+    """
+
+    def get_list_projection(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return Projection.for_serializer(self.get_serializer_class())
+
+    def get_projected_queryset(self, projection):
+        ordering = getattr(self.paginator, 'ordering', ())
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        # Cursor pagination reads the position of the last row by attribute
+        extra = [field.lstrip('-') for field in ordering]
+        return projection.project(self.filter_queryset(self.get_queryset()), extra)
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_list_projection()
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_projected_queryset(projection)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.represent(page))
+        return Response(projection.represent(queryset))
+
+    async def alist(self, request, *args, **kwargs):
+        projection = self.get_list_projection()
+        if projection is None:
+            return await super().alist(request, *args, **kwargs)
+
+        queryset = self.get_projected_queryset(projection)
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.represent(page))
+        return Response(projection.represent([row async for row in queryset]))
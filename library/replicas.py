@@ -0,0 +1,209 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+ViewSets using ``ReplicaReadMixin`` run the queries of their safe-method
+requests on one of ``REPLICA_DATABASES``, picked at random among those no
+more than ``REPLICA_MAX_LAG`` seconds behind the primary. Each process
+checks a replica's lag at most every ``REPLICA_LAG_CHECK_INTERVAL``
+seconds; a replica that cannot be reached counts as stale.
+
+Every unsafe request marks its user in the cache for
+``REPLICA_STICKY_SECONDS``, and a marked user's reads stay on the primary,
+so a client sees its own borrow or return straight away however far the
+replicas lag. ``ReplicaRouter`` sends every write to the primary, including
+saves of instances that were read from a replica.
+
+Responses cached by ``CachedResponseMixin`` are keyed on model versions,
+so one built from a replica that has not replayed a write yet would be
+cached under the versions that write bumped, and served until the next
+write. ``bump_version`` therefore marks the written models for
+``REPLICA_STICKY_SECONDS`` as well, and the cached reads of a marked model
+are built on the primary, whoever the client, until the replicas have
+caught up.
+"""
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_KEY = 'library:primary:{}'
+MODEL_STICKY_KEY = 'library:primary:model:{}'
+
+# Seconds since the last transaction replayed, or 0 while nothing is waiting to be replayed
+LAG_SQL = {
+    'postgresql': (
+        'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+        'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+    ),
+}
+
+_lags = {}
+_lags_lock = threading.Lock()
+
+
+def _replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+def _is_database(alias):
+    return alias == DEFAULT_DB_ALIAS or alias in _replica_aliases()
+
+
+class ReplicaRouter:
+    """Writes go to the primary; reads go wherever the queryset says (see ``ReplicaReadMixin``)."""
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary
+        if _is_database(obj1._state.db) and _is_database(obj2._state.db):
+            return True
+        return None
+
+
+def replica_lag(alias):
+    """Seconds ``alias`` is behind the primary; stand-ins without replication never lag."""
+    connection = connections[alias]
+    sql = LAG_SQL.get(connection.vendor)
+    if sql is None:
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        lag = cursor.fetchone()[0]
+    # NULL while the replica has not replayed anything yet
+    return float('inf') if lag is None else float(lag)
+
+
+def _checked_lag(alias):
+    """The lag ``alias`` had at its last check, or ``None`` if a check is due."""
+    lag, checked_at = _lags.get(alias, (None, None))
+    if checked_at is not None and checked_at + settings.REPLICA_LAG_CHECK_INTERVAL > time.monotonic():
+        return lag
+    return None
+
+
+def _current_lag(alias):
+    lag = _checked_lag(alias)
+    if lag is not None:
+        return lag
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        lag = float('inf')
+    with _lags_lock:
+        _lags[alias] = (lag, time.monotonic())
+    return lag
+
+
+async def _acurrent_lag(alias):
+    lag = _checked_lag(alias)
+    if lag is None:
+        # The check runs raw SQL on the replica, which needs a worker thread
+        lag = await sync_to_async(_current_lag)(alias)
+    return lag
+
+
+def forget_replica_lags():
+    """Re-check every replica's lag on its next use in this process."""
+    with _lags_lock:
+        _lags.clear()
+
+
+def _client_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f'session:{session.session_key}'
+    return None
+
+
+def mark_wrote(request):
+    """Keep the client's reads on the primary for the next ``REPLICA_STICKY_SECONDS``."""
+    client = _client_key(request)
+    if client is not None:
+        cache.set(STICKY_KEY.format(client), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def mark_models_written(*models):
+    """Build cached responses of ``models`` on the primary for the next ``REPLICA_STICKY_SECONDS``."""
+    if _replica_aliases():
+        keys = {MODEL_STICKY_KEY.format(model._meta.label_lower): 1 for model in models}
+        cache.set_many(keys, settings.REPLICA_STICKY_SECONDS)
+
+
+def _sticky_keys(client, models):
+    return [STICKY_KEY.format(client)] + [MODEL_STICKY_KEY.format(model._meta.label_lower) for model in models]
+
+
+def read_database(request, models=()):
+    """
+    The alias to serve ``request``'s reads from: a fresh replica, or the
+    primary. ``models`` are those the reads build cached responses of.
+    """
+    replicas = _replica_aliases()
+    if not replicas or request.method not in SAFE_METHODS:
+        return DEFAULT_DB_ALIAS
+    client = _client_key(request)
+    if client is None or cache.get_many(_sticky_keys(client, models)):
+        return DEFAULT_DB_ALIAS
+    fresh = [alias for alias in replicas if _current_lag(alias) <= settings.REPLICA_MAX_LAG]
+    return random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+
+
+async def aread_database(request, models=()):
+    """Async counterpart of ``read_database``."""
+    replicas = _replica_aliases()
+    if not replicas or request.method not in SAFE_METHODS:
+        return DEFAULT_DB_ALIAS
+    client = _client_key(request)
+    if client is None or await cache.aget_many(_sticky_keys(client, models)):
+        return DEFAULT_DB_ALIAS
+    fresh = [alias for alias in replicas if await _acurrent_lag(alias) <= settings.REPLICA_MAX_LAG]
+    return random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Runs a ViewSet's safe-method queries on a read replica, and marks the
+    client of each unsafe request so its next reads see its writes.
+    Responses cached by ``CachedResponseMixin`` are built on a replica too,
+    except while one of their ``cache_models`` has been written recently.
+
+    The read coroutines of ``AsyncReadMixin`` pick the database in
+    ``ainitial``, as checking a replica's lag queries it and
+    ``get_queryset`` runs on the event loop.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            mark_wrote(request)
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        self._read_database = await aread_database(request, self.get_cached_models())
+
+    def get_cached_models(self):
+        """The models this request's reads build a cached response of."""
+        if self.action in ('list', 'retrieve'):
+            return getattr(self, 'cache_models', ())
+        return ()
+
+    def get_read_database(self):
+        if not hasattr(self, '_read_database'):
+            self._read_database = read_database(self.request, self.get_cached_models())
+        return self._read_database
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None:  # generating the schema
+            return queryset
+        return queryset.using(self.get_read_database())
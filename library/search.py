@@ -0,0 +1,96 @@
+"""
+Full-text catalog search.
+
+On PostgreSQL the index is a weighted ``tsvector`` column with a GIN index,
+maintained by database triggers (migration ``0005_book_search_index``) so it
+also follows bulk writes that bypass ``Model.save()``.
+
+On SQLite it is an FTS5 virtual table kept in sync by ``library.signals``;
+bulk writers call ``update_search_index`` for the books they touch.
+"""
+from django.db import connection
+from django.db.models import BooleanField, Expression, F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+def _fts5_query(terms):
+    """Quote each term so user input is never parsed as FTS5 syntax."""
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+class _SearchVector(Expression):
+    """
+    The book table's ``search_vector`` column, which is not a model field.
+    Like a field's column it follows the alias the query gives the table,
+    e.g. ``U0`` when the search is a subquery.
+    """
+
+    def __init__(self, alias=None):
+        super().__init__()
+        self.alias = alias
+
+    def resolve_expression(self, query=None, allow_joins=True, reuse=None, summarize=False, for_save=False):
+        return _SearchVector(query.get_initial_alias())
+
+    def relabeled_clone(self, change_map):
+        return _SearchVector(change_map.get(self.alias, self.alias))
+
+    def as_sql(self, compiler, connection):
+        return f'{compiler.quote_name_unless_alias(self.alias)}.{connection.ops.quote_name("search_vector")}', []
+
+
+def search_books(queryset, query):
+    """
+    Filter a Book queryset to rows matching ``query`` and annotate them with
+    ``search_rank`` (higher is more relevant). The queryset can be used as a
+    subquery, e.g. ``book__in=search_books(...).values('pk')``.
+    """
+    terms = query.split()
+    if not terms:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        tsquery = Func(Value(query), function='plainto_tsquery', template="%(function)s('simple', %(expressions)s)")
+        return queryset.filter(
+            Func(_SearchVector(), tsquery, arg_joiner=' @@ ', template='%(expressions)s', output_field=BooleanField()),
+        ).annotate(
+            search_rank=Func(_SearchVector(), tsquery, function='ts_rank', output_field=FloatField()),
+        )
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(terms)
+        return queryset.filter(
+            id__in=RawSQL('SELECT rowid FROM library_book_fts WHERE library_book_fts MATCH %s', [match]),
+        ).annotate(
+            # FTS5 ranks with bm25, where lower is better.
+            search_rank=Func(
+                Value(match), F('id'),
+                template='(SELECT -rank FROM library_book_fts WHERE library_book_fts MATCH %(expressions)s)',
+                arg_joiner=' AND rowid = ', output_field=FloatField(),
+            ),
+        )
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(author__name__icontains=term) | Q(isbn__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(1.0))
+
+
+def update_search_index(book_ids):
+    """Re-index the given books in the SQLite FTS5 table (a no-op elsewhere)."""
+    if connection.vendor != 'sqlite':
+        return
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM library_book_fts WHERE rowid IN ({placeholders})', book_ids)
+        cursor.execute(
+            'INSERT INTO library_book_fts (rowid, title, author_name, isbn) '
+            'SELECT library_book.id, library_book.title, library_author.name, library_book.isbn '
+            'FROM library_book JOIN library_author ON library_author.id = library_book.author_id '
+            f'WHERE library_book.id IN ({placeholders})',
+            book_ids,
+        )
@@ -1,12 +1,13 @@
 from rest_framework import serializers
-from .models import Author, Book, Member, BorrowRecord
+from .models import Author, Book, Member, BorrowRecord, Hold
 
 
 class AuthorSerializer(serializers.ModelSerializer):
     """Serializer for the Author model."""
     class Meta:
         model = Author
-        fields = ['id', 'name', 'biography']
+        fields = ['id', 'name', 'biography', 'books_count']
+        read_only_fields = ['books_count']
 
 
 class BookSerializer(serializers.ModelSerializer):
@@ -15,7 +16,8 @@ class BookSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Book
-        fields = ['id', 'title', 'author', 'author_name', 'isbn', 'category', 'availability_status']
+        fields = ['id', 'title', 'author', 'author_name', 'isbn', 'category', 'availability_status', 'times_borrowed']
+        read_only_fields = ['times_borrowed']
 
 
 class MemberSerializer(serializers.ModelSerializer):
@@ -24,7 +26,8 @@ class MemberSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Member
-        fields = ['id', 'user', 'username', 'name', 'email', 'membership_date']
+        fields = ['id', 'user', 'username', 'name', 'email', 'membership_date', 'active_loans_count']
+        read_only_fields = ['active_loans_count']
 
 
 class BorrowRecordSerializer(serializers.ModelSerializer):
@@ -37,6 +40,23 @@ class BorrowRecordSerializer(serializers.ModelSerializer):
         fields = ['id', 'book', 'book_title', 'member', 'member_name', 'borrow_date', 'return_date']
 
 
+class HoldSerializer(serializers.ModelSerializer):
+    """Serializer for the Hold model, with the hold's place in its book's queue."""
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    member_name = serializers.CharField(source='member.name', read_only=True)
+    queue_position = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Hold
+        fields = ['id', 'book', 'book_title', 'member', 'member_name', 'queue_position', 'created_at']
+
+
+class PlaceHoldSerializer(serializers.Serializer):
+    """Serializer for joining a book's hold queue."""
+    book_id = serializers.IntegerField()
+    member_id = serializers.IntegerField(required=False)
+
+
 class BorrowBookSerializer(serializers.Serializer):
     """Serializer for borrowing a book."""
     book_id = serializers.IntegerField()
@@ -46,3 +66,49 @@ class BorrowBookSerializer(serializers.Serializer):
 class ReturnBookSerializer(serializers.Serializer):
     """Serializer for returning a book."""
     borrow_record_id = serializers.IntegerField()
+
+
+class BulkBorrowSerializer(serializers.Serializer):
+    """Serializer for borrowing a batch of books."""
+    items = BorrowBookSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    """Serializer for returning a batch of books."""
+    borrow_record_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+
+
+class BookFilterSerializer(serializers.Serializer):
+    """Serializer for the query-parameter filters of the book list."""
+    category = serializers.ChoiceField(choices=Book.CATEGORY_CHOICES, required=False)
+    availability_status = serializers.ChoiceField(choices=Book.STATUS_CHOICES, required=False)
+    author = serializers.IntegerField(required=False)
+
+    def filter_queryset(self, queryset):
+        return queryset.filter(**self.validated_data)
+
+
+class BorrowRecordFilterSerializer(serializers.Serializer):
+    """Serializer for the query-parameter filters of the borrow record list."""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('returned', 'Returned'),
+    ]
+
+    member = serializers.IntegerField(required=False)
+    book = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+    borrow_date_after = serializers.DateTimeField(required=False)
+    borrow_date_before = serializers.DateTimeField(required=False)
+
+    def filter_queryset(self, queryset):
+        data = dict(self.validated_data)
+        if 'status' in data:
+            queryset = queryset.filter(return_date__isnull=data.pop('status') == 'open')
+        if 'borrow_date_after' in data:
+            queryset = queryset.filter(borrow_date__gte=data.pop('borrow_date_after'))
+        if 'borrow_date_before' in data:
+            queryset = queryset.filter(borrow_date__lt=data.pop('borrow_date_before'))
+        return queryset.filter(**data)
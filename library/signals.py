@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_token_version
+from .cache import bump_version
+from .models import Author, Book, Member, BorrowRecord
+from .search import update_search_index
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def reindex_book(sender, instance, **kwargs):
+    """Refresh (or, after a delete, drop) a book's search index entry."""
+    update_search_index([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, **kwargs):
+    """Refresh the search index entries of an author's books after a rename."""
+    if not created:
+        update_search_index(instance.books.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Book)
+def decrement_books_count(sender, instance, **kwargs):
+    """Keep Author.books_count in step when books are deleted, including queryset deletes."""
+    Author.objects.filter(pk=instance.author_id).update(books_count=Greatest(F('books_count') - 1, 0))
+
+
+@receiver(post_delete, sender=BorrowRecord)
+def decrement_loan_counters(sender, instance, **kwargs):
+    """
+    Keep Book.times_borrowed, which counts every loan of a book, and
+    Member.active_loans_count, which counts open ones, in step when loans
+    are deleted.
+    """
+    Book.objects.filter(pk=instance.book_id).update(times_borrowed=Greatest(F('times_borrowed') - 1, 0))
+    if instance.return_date is None:
+        Member.objects.filter(pk=instance.member_id).update(
+            active_loans_count=Greatest(F('active_loans_count') - 1, 0)
+        )
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_authors(sender, **kwargs):
+    """Invalidate cached responses built from authors."""
+    bump_version(Author)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_books(sender, **kwargs):
+    """Invalidate cached books and, as book writes change Author.books_count, authors."""
+    bump_version(Book, Author)
+
+
+@receiver(post_save, sender=BorrowRecord)
+@receiver(post_delete, sender=BorrowRecord)
+def invalidate_loans(sender, **kwargs):
+    """Invalidate cached loans and, as saving a loan updates its book's status, books."""
+    bump_version(BorrowRecord, Book)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_members(sender, **kwargs):
+    """Invalidate cached member lookups, such as a session user's profile."""
+    bump_version(Member)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_token_version(sender, instance, **kwargs):
+    """Re-check this user's tokens on their next request in this process."""
+    forget_token_version(instance.pk)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def forget_member_token_version(sender, instance, **kwargs):
+    """Re-check the linked user's tokens, as they carry the member id."""
+    if instance.user_id is not None:
+        forget_token_version(instance.user_id)
@@ -1,3 +1,1417 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import resolve, reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import tokens
+
+from .backends.twotier import FileCache, TwoTierCache, cache_stats
+from .authentication import AccessToken, TokenUser
+from .cache import get_or_compute
+from .counting import approximate_count, cached_count
+from .metrics import _shards, collect, record_request, reset_metrics
+from .models import Author, Book, Member, BorrowRecord, Hold
+from .projections import Projection
+from .replicas import forget_replica_lags
+from .search import search_books
+from .serializers import AuthorSerializer, BookSerializer, BorrowRecordSerializer, MemberSerializer
+
+
+class LibraryAPITestCase(TestCase):
+    """Base test case with a librarian, a member and an authenticated client."""
+
+    def setUp(self):
+        cache.clear()
+        self.librarian = User.objects.create_user('librarian', is_staff=True)
+        self.member_user = User.objects.create_user('member')
+        self.member = Member.objects.create(user=self.member_user, name='Member', email='member@library.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.librarian)
+
+    def create_books(self, count, author=None):
+        author = author or Author.objects.create(name='Author')
+        start = Book.objects.count()
+        return [
+            Book.objects.create(title=f'Book {i}', author=author, isbn=f'{i:013d}')
+            for i in range(start, start + count)
+        ]
+
+
+class QueryCountTests(LibraryAPITestCase):
+    """List and detail endpoints must issue a constant number of queries."""
+
+    def populate(self, count):
+        books = self.create_books(count)
+        for book in books:
+            user = User.objects.create_user(f'user{book.pk}')
+            member = Member.objects.create(user=user, name=f'Member {book.pk}', email=f'm{book.pk}@library.com')
+            BorrowRecord.objects.create(book=book, member=member)
+
+    def assert_constant_queries(self, url, max_queries):
+        # Lists count their rows, then fetch the page
+        for count in (1, 10):
+            self.populate(count)
+            with self.assertNumQueries(max_queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_book_list(self):
+        self.assert_constant_queries('/api/books/', 2)
+
+    def test_member_list(self):
+        self.assert_constant_queries('/api/members/', 2)
+
+    def test_borrow_record_list(self):
+        self.assert_constant_queries('/api/borrow-records/', 2)
+
+    def test_detail_endpoints(self):
+        self.populate(1)
+        record = BorrowRecord.objects.get()
+        for url in (
+            f'/api/books/{record.book_id}/',
+            f'/api/members/{record.member_id}/',
+            f'/api/borrow-records/{record.pk}/',
+        ):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class PaginationTests(LibraryAPITestCase):
+    """List endpoints are paginated with stable keyset cursors."""
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.json()['results'])
+            url = response.json()['next']
+        return ids
+
+    def test_walks_every_book_once(self):
+        books = self.create_books(7)
+        self.assertEqual(self.collect('/api/books/?page_size=3'), [book.pk for book in books])
+
+    def test_page_size_is_capped(self):
+        self.create_books(101)
+        response = self.client.get('/api/books/?page_size=1000')
+        self.assertEqual(len(response.json()['results']), 100)
+
+    def test_borrow_records_newest_first(self):
+        books = self.create_books(5)
+        records = [BorrowRecord.objects.create(book=book, member=self.member) for book in books]
+        self.assertEqual(
+            self.collect('/api/borrow-records/?page_size=2'),
+            [record.pk for record in reversed(records)],
+        )
+
+    def test_users_without_a_member_profile_count_no_loans(self):
+        BorrowRecord.objects.create(book=self.create_books(1)[0], member=self.member)
+        visitor = User.objects.create_user('visitor')
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(visitor)}')
+        response = self.client.get('/api/borrow-records/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['count'], response.json()['results']), (0, []))
+
+    def test_pages_carry_the_count(self):
+        self.create_books(3)
+        page = self.client.get('/api/books/?page_size=2').json()
+        self.assertEqual((page['count'], page['count_exact']), (3, True))
+        self.assertEqual(self.client.get(page['next']).json()['count'], 3)
+        self.assertEqual(self.client.get('/api/books/?category=science').json()['count'], 0)
+        search = self.client.get('/api/books/?search=Book').json()
+        self.assertEqual((search['count'], search['count_exact']), (3, True))
+
+    @override_settings(EXACT_COUNT_THRESHOLD=2)
+    def test_counts_past_the_threshold(self):
+        self.create_books(3)
+        page = self.client.get('/api/books/').json()
+        if connection.vendor != 'postgresql':
+            # Without planner statistics the count stays exact
+            self.assertEqual((page['count'], page['count_exact']), (3, True))
+            return
+        self.assertFalse(page['count_exact'])
+        # The estimate is cached for the query, so it skips the planner next time
+        estimate = cached_count(Book.objects.all())
+        self.create_books(3)
+        self.assertEqual(cached_count(Book.objects.all()), estimate)
+
+
+class BorrowRecordScopeTests(LibraryAPITestCase):
+    """Members only see their own loans; librarians see every loan."""
+
+    def setUp(self):
+        super().setUp()
+        other = Member.objects.create(name='Other', email='other@library.com')
+        first, second, third = self.create_books(3)
+        self.own = [
+            BorrowRecord.objects.create(book=first, member=self.member),
+            BorrowRecord.objects.create(book=second, member=self.member),
+        ]
+        self.others = BorrowRecord.objects.create(book=third, member=other)
+
+    def listed_ids(self):
+        response = self.client.get('/api/borrow-records/')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_librarian_sees_every_loan(self):
+        self.assertEqual(len(self.listed_ids()), 3)
+
+    def test_member_sees_own_loans(self):
+        own_ids = [record.pk for record in reversed(self.own)]
+        self.client.force_authenticate(self.member_user)
+        self.assertEqual(self.listed_ids(), own_ids)
+        self.assertEqual(self.client.get(f'/api/borrow-records/{self.others.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/borrow-records/{self.own[0].pk}/').status_code, 200)
+
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.member_user)}')
+        self.assertEqual(self.listed_ids(), own_ids)
+
+    def test_user_without_member_profile_sees_nothing(self):
+        self.client.force_authenticate(User.objects.create_user('visitor'))
+        self.assertEqual(self.listed_ids(), [])
+
+    def test_session_profile_lookup_is_cached(self):
+        self.client.force_authenticate(self.member_user)
+        self.listed_ids()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.listed_ids()), 2)
+        self.assertFalse(any('"library_member"."user_id" =' in query['sql'] for query in queries))
+
+        self.member.user = None
+        self.member.save()
+        self.assertEqual(self.listed_ids(), [])
+
+
+class SearchTests(LibraryAPITestCase):
+    """Catalog search is served by the full-text index."""
+
+    def setUp(self):
+        super().setUp()
+        self.tolkien = Author.objects.create(name='J.R.R. Tolkien')
+        self.hobbit = Book.objects.create(title='The Hobbit', author=self.tolkien, isbn='9780261102217')
+        self.dune = Book.objects.create(title='Dune', author=Author.objects.create(name='Frank Herbert'), isbn='9780441013593')
+
+    def search(self, term):
+        response = self.client.get('/api/books/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_matches_title_author_and_isbn(self):
+        self.assertEqual(self.search('hobbit'), [self.hobbit.pk])
+        self.assertEqual(self.search('herbert'), [self.dune.pk])
+        self.assertEqual(self.search('9780441013593'), [self.dune.pk])
+
+    def test_deleted_books_leave_the_index(self):
+        self.dune.delete()
+        self.assertEqual(self.search('dune'), [])
+
+    def test_index_follows_book_and_author_changes(self):
+        self.hobbit.title = 'There and Back Again'
+        self.hobbit.save()
+        self.assertEqual(self.search('hobbit'), [])
+        self.tolkien.name = 'John Ronald Reuel Tolkien'
+        self.tolkien.save()
+        self.assertEqual(self.search('reuel'), [self.hobbit.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"dune'), [self.dune.pk])
+        self.assertEqual(self.search('dune OR hobbit'), [])
+
+    def test_results_are_ranked_and_paginated(self):
+        response = self.client.get('/api/books/', {'search': 'the', 'page_size': 1})
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['id'], self.hobbit.pk)
+
+    def test_searches_work_as_subqueries(self):
+        loan = BorrowRecord.objects.create(book=self.dune, member=self.member)
+        subquery = BorrowRecord.objects.filter(book__in=search_books(Book.objects.all(), 'dune').values('pk'))
+        self.assertEqual(list(subquery), [loan])
+
+        # The subquery aliases the book table, which the tsvector column must follow
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            sql = str(BorrowRecord.objects.filter(book__in=search_books(Book.objects.all(), 'dune').values('pk')).query)
+        self.assertIn('FROM "library_book" U0 WHERE U0."search_vector" @@ plainto_tsquery', sql)
+        self.assertNotIn('library_book.', sql)
+
+
+class FilterTests(LibraryAPITestCase):
+    """List endpoints accept validated query-parameter filters."""
+
+    def ids(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_book_filters(self):
+        science, history = self.create_books(2)
+        science.category = 'science'
+        science.save()
+        history.category = 'history'
+        history.availability_status = 'borrowed'
+        history.save()
+        self.assertEqual(self.ids('/api/books/', {'category': 'science'}), [science.pk])
+        self.assertEqual(self.ids('/api/books/', {'availability_status': 'borrowed'}), [history.pk])
+        self.assertEqual(self.ids('/api/books/', {'author': science.author_id}), [science.pk, history.pk])
+
+    def test_borrow_record_filters(self):
+        first, second = self.create_books(2)
+        returned = BorrowRecord.objects.create(book=first, member=self.member)
+        returned.return_date = timezone.now()
+        returned.save()
+        open_loan = BorrowRecord.objects.create(book=second, member=self.member)
+        url = '/api/borrow-records/'
+        self.assertEqual(self.ids(url, {'status': 'open'}), [open_loan.pk])
+        self.assertEqual(self.ids(url, {'status': 'returned'}), [returned.pk])
+        self.assertEqual(self.ids(url, {'book': first.pk}), [returned.pk])
+        self.assertEqual(self.ids(url, {'member': self.member.pk}), [open_loan.pk, returned.pk])
+        self.assertEqual(self.ids(url, {'borrow_date_after': open_loan.borrow_date.isoformat()}), [open_loan.pk])
+        self.assertEqual(self.ids(url, {'borrow_date_before': open_loan.borrow_date.isoformat()}), [returned.pk])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get('/api/books/', {'category': 'cookbooks'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BorrowReturnTests(LibraryAPITestCase):
+    """Borrowing and returning are atomic conditional updates."""
+
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+
+    def borrow(self, book_id=None, member_id=None):
+        return self.client.post('/api/borrow-records/borrow/', {
+            'book_id': book_id or self.book.pk,
+            'member_id': member_id or self.member.pk,
+        })
+
+    def return_book(self, borrow_record_id):
+        return self.client.post('/api/borrow-records/return_book/', {'borrow_record_id': borrow_record_id})
+
+    def test_borrow_and_return(self):
+        response = self.borrow()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['book_title'], self.book.title)
+        self.assertEqual(response.json()['member_name'], self.member.name)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.availability_status, 'borrowed')
+
+        response = self.return_book(response.json()['id'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['return_date'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.availability_status, 'available')
+
+    def test_borrowing_an_unavailable_book_conflicts(self):
+        self.assertEqual(self.borrow().status_code, 201)
+        self.assertEqual(self.borrow().status_code, 409)
+        self.assertEqual(BorrowRecord.objects.count(), 1)
+
+    def test_creating_a_loan_on_an_unavailable_book_conflicts(self):
+        data = {'book': self.book.pk, 'member': self.member.pk}
+        self.assertEqual(self.client.post('/api/borrow-records/', data).status_code, 201)
+        response = self.client.post('/api/borrow-records/', data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': 'Book is not available for borrowing.'})
+        self.assertEqual(BorrowRecord.objects.count(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.times_borrowed, 1)
+
+    def test_missing_book_or_member(self):
+        self.assertEqual(self.borrow(book_id=9999).status_code, 404)
+        self.assertEqual(self.borrow(member_id=9999).status_code, 404)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.availability_status, 'available')
+        self.assertFalse(BorrowRecord.objects.exists())
+
+    def test_return_twice_or_missing(self):
+        record_id = self.borrow().json()['id']
+        self.assertEqual(self.return_book(record_id).status_code, 200)
+        self.assertEqual(self.return_book(record_id).status_code, 400)
+        self.assertEqual(self.return_book(9999).status_code, 404)
+
+    def test_query_counts(self):
+        # savepoint, claim book, count member loan, insert loan, reload joined loan, release
+        with self.assertNumQueries(6):
+            record_id = self.borrow().json()['id']
+        # savepoint, close loan, book id, uncount member loan, release book, find hold queue head,
+        # release, reload joined loan
+        with self.assertNumQueries(8):
+            self.return_book(record_id)
+
+
+class ConcurrentBorrowTests(TransactionTestCase):
+    """Concurrent borrow requests for the same book open exactly one loan."""
+
+    THREADS = 8
+
+    def test_no_double_loans(self):
+        author = Author.objects.create(name='Author')
+        book = Book.objects.create(title='Popular', author=author, isbn='0000000000001')
+        members = [
+            Member.objects.create(name=f'Member {i}', email=f'm{i}@library.com')
+            for i in range(self.THREADS)
+        ]
+        librarian = User.objects.create_user('librarian', is_staff=True)
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def borrow(member):
+            client = APIClient()
+            client.force_authenticate(librarian)
+            barrier.wait()
+            try:
+                response = client.post('/api/borrow-records/borrow/', {'book_id': book.pk, 'member_id': member.pk})
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=borrow, args=(member,)) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [409] * (self.THREADS - 1))
+        self.assertEqual(BorrowRecord.objects.filter(book=book, return_date__isnull=True).count(), 1)
+
+
+class BulkCirculationTests(LibraryAPITestCase):
+    """Batch borrow and return report per-item outcomes in constant queries."""
+
+    def bulk_borrow(self, items):
+        response = self.client.post('/api/borrow-records/bulk_borrow/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def bulk_return(self, ids):
+        response = self.client.post('/api/borrow-records/bulk_return/', {'borrow_record_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_per_item_outcomes(self):
+        first, second = self.create_books(2)
+        results = self.bulk_borrow([
+            {'book_id': first.pk, 'member_id': self.member.pk},
+            {'book_id': first.pk, 'member_id': self.member.pk},
+            {'book_id': second.pk, 'member_id': 9999},
+            {'book_id': 9999, 'member_id': self.member.pk},
+        ])
+        self.assertEqual([result['status'] for result in results], [201, 409, 404, 404])
+        record_id = results[0]['borrow_record_id']
+        self.assertEqual(BorrowRecord.objects.get().pk, record_id)
+        first.refresh_from_db()
+        self.assertEqual(first.availability_status, 'borrowed')
+
+        results = self.bulk_return([record_id, record_id, 9999])
+        self.assertEqual([result['status'] for result in results], [200, 400, 404])
+        first.refresh_from_db()
+        self.assertEqual(first.availability_status, 'available')
+
+    def test_restricted_to_librarians(self):
+        book, = self.create_books(1)
+        record = BorrowRecord.objects.create(book=book, member=self.member)
+        self.client.force_authenticate(self.member_user)
+        response = self.client.post(
+            '/api/borrow-records/bulk_borrow/', {'items': [{'book_id': book.pk, 'member_id': self.member.pk}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/api/borrow-records/bulk_return/', {'borrow_record_ids': [record.pk]}, format='json')
+        self.assertEqual(response.status_code, 403)
+        record.refresh_from_db()
+        self.assertIsNone(record.return_date)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        for size in (1, 25):
+            books = self.create_books(size)
+            items = [{'book_id': book.pk, 'member_id': self.member.pk} for book in books]
+            # savepoint, members, lock books, claim books, count member loans, insert loans, release
+            with self.assertNumQueries(7):
+                results = self.bulk_borrow(items)
+            # savepoint, lock loans, close loans, uncount member loans, release books,
+            # find hold queue heads, release
+            with self.assertNumQueries(7):
+                self.bulk_return([result['borrow_record_id'] for result in results])
+
+    def test_empty_batch_is_rejected(self):
+        response = self.client.post('/api/borrow-records/bulk_borrow/', {'items': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class HoldTests(LibraryAPITestCase):
+    """Members queue for borrowed books, and returns hand the book to the queue's head."""
+
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+        self.borrower = Member.objects.create(name='Borrower', email='borrower@library.com')
+        self.loan = BorrowRecord.objects.create(book=self.book, member=self.borrower)
+        self.second = Member.objects.create(name='Second', email='second@library.com')
+
+    def place_hold(self, member, book=None):
+        return self.client.post('/api/holds/', {'book_id': (book or self.book).pk, 'member_id': member.pk})
+
+    def queue(self):
+        return [(row['member'], row['queue_position']) for row in self.client.get('/api/holds/').json()['results']]
+
+    def test_queue_positions(self):
+        self.assertEqual(self.place_hold(self.member).json()['queue_position'], 1)
+        self.assertEqual(self.place_hold(self.second).json()['queue_position'], 2)
+        self.assertEqual(self.place_hold(self.member).status_code, 409)
+        self.assertEqual(self.place_hold(self.borrower).status_code, 409)
+        self.assertEqual(self.place_hold(self.member, self.create_books(1)[0]).status_code, 409)
+
+        self.client.delete(f'/api/holds/{Hold.objects.get(member=self.member).pk}/')
+        self.assertEqual(self.queue(), [(self.second.pk, 1)])
+
+    def test_queue_positions_count_the_whole_queue(self):
+        for member in [self.second] + [
+            Member.objects.create(name=f'Member {i}', email=f'member{i}@library.com') for i in range(5)
+        ]:
+            self.place_hold(member)
+        hold = self.place_hold(self.member).json()
+        self.assertEqual(hold['queue_position'], 7)
+        # Count the holds, fetch the page, number the page's queues
+        with self.assertNumQueries(3):
+            self.assertEqual([position for _, position in self.queue()], list(range(1, 8)))
+        self.assertEqual(self.client.get(f'/api/holds/{hold["id"]}/').json()['queue_position'], 7)
+        self.client.force_authenticate(self.member_user)
+        self.assertEqual(self.queue(), [(self.member.pk, 7)])
+
+    def test_return_hands_off_to_head(self):
+        self.place_hold(self.member)
+        self.place_hold(self.second)
+        response = self.client.post('/api/borrow-records/return_book/', {'borrow_record_id': self.loan.pk})
+        self.assertEqual(response.status_code, 200)
+
+        next_loan = BorrowRecord.objects.get(pk=response.json()['next_borrow_record_id'])
+        self.assertEqual(
+            (next_loan.book_id, next_loan.member_id, next_loan.return_date), (self.book.pk, self.member.pk, None)
+        )
+        self.book.refresh_from_db()
+        self.member.refresh_from_db()
+        self.assertEqual((self.book.availability_status, self.book.times_borrowed), ('borrowed', 2))
+        self.assertEqual(self.member.active_loans_count, 1)
+        self.assertEqual(self.queue(), [(self.second.pk, 1)])
+
+        results = self.client.post(
+            '/api/borrow-records/bulk_return/', {'borrow_record_ids': [next_loan.pk]}, format='json'
+        ).json()['results']
+        self.assertEqual(BorrowRecord.objects.get(pk=results[0]['next_borrow_record_id']).member_id, self.second.pk)
+        self.assertEqual(self.queue(), [])
+
+        response = self.client.post(
+            '/api/borrow-records/return_book/', {'borrow_record_id': results[0]['next_borrow_record_id']}
+        )
+        self.assertIsNone(response.json()['next_borrow_record_id'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.availability_status, 'available')
+
+    def test_members_manage_their_own_holds(self):
+        self.place_hold(self.second)
+        self.client.force_authenticate(self.member_user)
+        self.assertEqual(self.place_hold(self.second).status_code, 403)
+        response = self.client.post('/api/holds/', {'book_id': self.book.pk})
+        self.assertEqual((response.status_code, response.json()['queue_position']), (201, 2))
+        self.assertEqual(self.queue(), [(self.member.pk, 2)])
+        self.assertEqual(self.client.delete(f'/api/holds/{Hold.objects.get(member=self.second).pk}/').status_code, 404)
+
+
+
+class AdminTests(LibraryAPITestCase):
+    """Admin changelists and searches stay index-backed and query-constant on large tables."""
+
+    def setUp(self):
+        super().setUp()
+        self.librarian.is_superuser = True
+        self.librarian.save()
+        self.client.force_login(self.librarian)
+
+    def populate(self, count):
+        for book in self.create_books(count):
+            member = Member.objects.create(name=f'Reader {book.pk}', email=f'reader{book.pk}@library.com')
+            BorrowRecord.objects.create(book=book, member=member)
+
+    def changelist(self, model, **params):
+        response = self.client.get(f'/admin/library/{model}/', params)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_changelists_use_constant_queries(self):
+        queries = defaultdict(set)
+        for count in (1, 10):
+            self.populate(count)
+            for model in ('author', 'book', 'member', 'borrowrecord'):
+                with CaptureQueriesContext(connection) as captured:
+                    self.changelist(model)
+                queries[model].add(len(captured))
+        self.assertTrue(all(len(counts) == 1 for counts in queries.values()), queries)
+
+    def test_searches(self):
+        self.populate(3)
+        reader = Member.objects.order_by('pk').last()
+        loan = reader.borrow_records.get()
+        self.assertEqual(self.changelist('member', q='Reader'), list(Member.objects.filter(name__startswith='Reader ')))
+        self.assertEqual(self.changelist('member', q=reader.email), [reader])
+        self.assertEqual(self.changelist('borrowrecord', q=reader.name), [loan])
+        self.assertEqual(self.changelist('borrowrecord', q=str(reader.pk)), [loan])
+        self.assertEqual(self.changelist('borrowrecord', q=loan.book.title), [loan])
+        self.assertEqual(self.changelist('author', q='  author'), list(Author.objects.all()))
+
+    @override_settings(EXACT_COUNT_THRESHOLD=2)
+    def test_counts_past_the_threshold(self):
+        self.populate(3)
+        self.assertEqual(approximate_count(BorrowRecord.objects.all(), threshold=5), (3, True))
+        count, exact = approximate_count(BorrowRecord.objects.all())
+        if connection.vendor == 'postgresql':
+            self.assertFalse(exact)
+        else:
+            self.assertEqual((count, exact), (3, True))
+        self.assertEqual(len(self.changelist('borrowrecord')), 3)
+
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(LibraryAPITestCase):
+    """
+    Safe-method API reads go to the replica, which in tests is a separate
+    empty database, unless the client has just written or the replica lags.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        forget_replica_lags()
+        self.addCleanup(forget_replica_lags)
+        self.book, = self.create_books(1)
+        BorrowRecord.objects.create(book=self.book, member=self.member)
+
+    def loans(self):
+        return self.client.get('/api/borrow-records/').json()['results']
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.loans(), [])
+        self.assertEqual(self.client.get('/api/members/').json()['count'], 0)
+        # The books were just written, so responses cached under their versions are built on the primary
+        self.assertEqual(len(self.client.get('/api/books/').json()['results']), 1)
+
+    def test_cached_reads_follow_recent_writes(self):
+        # Past the stickiness window of the last catalog write
+        cache.clear()
+        self.assertEqual(self.client.get('/api/books/').json()['results'], [])
+        self.assertEqual(self.client.get(f'/api/authors/{self.book.author_id}/').status_code, 404)
+
+        Book.objects.create(title='Dune', author=self.book.author, isbn='9780441013593')
+        self.assertEqual(len(self.client.get('/api/books/').json()['results']), 2)
+        self.assertEqual(self.client.get(f'/api/authors/{self.book.author_id}/').status_code, 200)
+
+    def test_reads_follow_the_clients_writes(self):
+        self.client.post('/api/authors/', {'name': 'Ursula K. Le Guin'})
+        self.assertEqual(len(self.loans()), 1)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other librarian', is_staff=True))
+        self.assertEqual(other.get('/api/borrow-records/').json()['results'], [])
+
+    def test_lagging_replica_is_skipped(self):
+        with override_settings(REPLICA_MAX_LAG=-1):
+            self.assertEqual(len(self.loans()), 1)
+
+    @override_settings(ROOT_URLCONF='library_management.async_urls')
+    @mock.patch.dict('library.replicas.LAG_SQL', {'sqlite': 'SELECT 0'})
+    async def test_async_reads_check_the_lag_off_the_event_loop(self):
+        token = await sync_to_async(AccessToken.for_user)(self.librarian)
+        response = await AsyncClient().get('/api/borrow-records/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_writes_go_to_the_primary(self):
+        Author.objects.using('replica').create(name='Replicated')
+        author = Author.objects.using('replica').get(name='Replicated')
+        author.biography = 'Saved through the router'
+        author.save()
+        self.assertEqual(Author.objects.get(name='Replicated').biography, 'Saved through the router')
+
+
+class ImportCatalogTests(TestCase):
+    """The import_catalog command streams and upserts books in batches."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def import_catalog(self, path, *args):
+        call_command('import_catalog', path, '--batch-size', '2', *args, stdout=StringIO())
+
+    def test_csv_upserts_books_and_matches_authors(self):
+        Author.objects.create(name='Frank Herbert')
+        Book.objects.create(title='Old Title', author=Author.objects.create(name='Someone'), isbn='9780441013593')
+        path = self.write('books.csv', (
+            'title,author,isbn,category\n'
+            'Dune,  frank   HERBERT ,978-0441013593,fiction\n'
+            'The Hobbit,J.R.R. Tolkien,9780261102217,fantasy\n'
+            ',Nobody,9780000000000,other\n'
+        ))
+        self.import_catalog(path)
+
+        dune = Book.objects.get(isbn='9780441013593')
+        self.assertEqual(dune.title, 'Dune')
+        self.assertEqual(dune.author.name, 'Frank Herbert')
+        self.assertEqual(Book.objects.get(isbn='9780261102217').category, 'other')
+        self.assertEqual(Author.objects.filter(normalized_name='frank herbert').count(), 1)
+        self.assertEqual(dune.author.books_count, 1)
+        self.assertEqual(Author.objects.get(name='Someone').books_count, 0)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        self.assertEqual(list(search_books(Book.objects.all(), 'herbert')), [dune])
+
+    def test_jsonl_resumes_from_checkpoint(self):
+        lines = [
+            {'title': f'Book {i}', 'author': 'Author', 'isbn': f'{i:013d}', 'category': 'science'}
+            for i in range(5)
+        ]
+        path = self.write('books.jsonl', '\n'.join(json.dumps(line) for line in lines))
+        self.write('books.jsonl.checkpoint', json.dumps({'rows': 2}))
+        self.import_catalog(path)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['Book 2', 'Book 3', 'Book 4'])
+
+        self.import_catalog(path, '--restart')
+        self.assertEqual(Book.objects.count(), 5)
+
+    def test_authors_sharing_a_name_are_kept(self):
+        oldest = Author.objects.create(name='Frank Herbert')
+        Author.objects.create(name='FRANK HERBERT')
+        path = self.write('books.csv', 'title,author,isbn,category\nDune,frank herbert,9780441013593,fiction\n')
+        self.import_catalog(path)
+        self.import_catalog(path, '--restart')
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Book.objects.get().author, oldest)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('librarian', is_staff=True))
+        self.assertEqual(client.post('/api/authors/', {'name': 'Frank Herbert'}).status_code, 201)
+
+
+class ExportTests(LibraryAPITestCase):
+    """Exports stream every matching row with the list view's filters."""
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_book_csv(self):
+        book, = self.create_books(1)
+        self.assertEqual(
+            self.export('/api/books/export/').splitlines(),
+            [
+                'id,title,author,author_name,isbn,category,availability_status,times_borrowed',
+                f'{book.pk},Book 0,{book.author_id},Author,{book.isbn},other,available,0',
+            ],
+        )
+
+    def test_borrow_record_ndjson_is_filtered(self):
+        first, second = self.create_books(2)
+        BorrowRecord.objects.create(book=first, member=self.member, return_date=timezone.now())
+        open_loan = BorrowRecord.objects.create(book=second, member=self.member)
+        lines = self.export('/api/borrow-records/export/', export_format='ndjson', status='open').splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [self.client.get(f'/api/borrow-records/{open_loan.pk}/').json()],
+        )
+
+    def test_query_count_does_not_grow(self):
+        self.create_books(50)
+        with self.assertNumQueries(1):
+            self.export('/api/books/export/', export_format='ndjson')
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/api/books/export/', {'export_format': 'xml'}).status_code, 400)
+
+    def test_search_applies_to_book_export(self):
+        book, = self.create_books(1)
+        Book.objects.create(title='Dune', author=book.author, isbn='9780441013593')
+        self.assertEqual(len(self.export('/api/books/export/', search='dune').splitlines()), 2)
+
+
+class ResponseCacheTests(LibraryAPITestCase):
+    """Catalog reads are cached per model version and revalidated with ETags."""
+
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+
+    def test_repeated_reads_skip_the_database(self):
+        first = self.client.get('/api/books/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/books/')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(f'/api/books/{self.book.pk}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/books/{self.book.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate(self):
+        etag = self.client.get('/api/books/')['ETag']
+        self.book.author.name = 'Renamed'
+        self.book.author.save()
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['author_name'], 'Renamed')
+
+        self.client.post('/api/borrow-records/borrow/', {'book_id': self.book.pk, 'member_id': self.member.pk})
+        self.assertEqual(self.client.get('/api/books/').json()['results'][0]['availability_status'], 'borrowed')
+
+    def test_keyed_on_query_and_role(self):
+        self.client.get('/api/books/')
+        self.assertEqual(self.client.get('/api/books/', {'category': 'science'}).json()['results'], [])
+        librarian_etag = self.client.get('/api/books/')['ETag']
+        self.client.force_authenticate(self.member_user)
+        self.assertNotEqual(self.client.get('/api/books/')['ETag'], librarian_etag)
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/books/9999/').status_code, 404)
+        self.assertNotIn('ETag', self.client.get('/api/books/9999/'))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(5)
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return b'value'
+
+        def read():
+            barrier.wait()
+            results.append(get_or_compute('library:test:stampede', compute, 60))
+
+        results = []
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [b'value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+class TwoTierCacheTests(TestCase):
+    """Hot namespaces are served from process memory in front of the shared cache."""
+    options = {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2, 'LOCAL_TIMEOUTS': {'response': 60, 'version': 0.05}}
+
+    def setUp(self):
+        # Each name has its own local tier, like a separate process
+        self.cache = TwoTierCache('test-process', {'OPTIONS': self.options})
+        self.other_process = TwoTierCache('test-other-process', {'OPTIONS': self.options})
+        self.cache.clear()
+        self.other_process.clear()
+        reset_metrics()
+
+    def test_only_listed_namespaces_are_kept_locally(self):
+        self.cache.set('library:response:a', b'page')
+        self.cache.set('library:primary:user:1', 1)
+        caches['shared'].clear()
+
+        self.assertEqual(self.cache.get('library:response:a'), b'page')
+        self.assertIsNone(self.cache.get('library:primary:user:1'))
+        stats = cache_stats()
+        self.assertEqual(stats['response'].local_hit, 1)
+        self.assertEqual(stats['primary'].miss, 1)
+
+    def test_version_bumps_reach_other_processes(self):
+        self.cache.set('library:version:book', 1)
+        self.assertEqual(self.other_process.get_many(['library:version:book']), {'library:version:book': 1})
+        self.cache.incr('library:version:book')
+        self.assertEqual(self.cache.get('library:version:book'), 2)
+        self.assertEqual(self.other_process.get('library:version:book'), 1)
+
+        time.sleep(0.06)
+        self.assertEqual(self.other_process.get('library:version:book'), 2)
+        self.assertEqual(cache_stats()['version'].shared_hit, 2)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('library:response:a', b'a')
+        self.cache.set('library:response:b', b'b')
+        self.cache.get('library:response:a')
+        self.cache.set('library:response:c', b'c')
+        caches['shared'].delete('library:response:b')
+
+        self.assertEqual(self.cache.get('library:response:a'), b'a')
+        self.assertIsNone(self.cache.get('library:response:b'))
+        self.assertEqual(cache_stats()['response'].evictions, 1)
+
+    def test_values_are_copied(self):
+        self.cache.set('library:response:a', [1])
+        self.cache.get('library:response:a').append(2)
+        self.assertEqual(self.cache.get('library:response:a'), [1])
+
+
+class FileCacheTests(TestCase):
+    """The local shared tier keeps counters and locks consistent across processes."""
+
+    def file_cache(self, **options):
+        return FileCache(self.directory, {'OPTIONS': options})
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.file_cache().set('library:version:book', 0, timeout=None)
+
+        def bump():
+            # A cache instance per thread, each with its own file handles, like separate processes
+            cache = self.file_cache()
+            for _ in range(50):
+                cache.incr('library:version:book')
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.file_cache().get('library:version:book'), 400)
+
+    def test_increments_keep_the_expiry(self):
+        cache = self.file_cache()
+        cache.set('library:version:book', 1, timeout=None)
+        cache.set('library:count:book', 1, timeout=-1)
+        self.assertEqual(cache.incr('library:version:book', 2), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('library:count:book')
+        with open(cache._key_to_file('library:version:book'), 'rb') as f:
+            self.assertIsNone(pickle.load(f))
+
+    def test_culling_spares_versions_and_locks(self):
+        cache = self.file_cache(MAX_ENTRIES=2, CULL_FREQUENCY=1)
+        cache.set('library:version:book', 1, timeout=None)
+        self.assertTrue(cache.add('library:response:a:lock', 1))
+        for index in range(5):
+            cache.set(f'library:response:{index}', b'page')
+        self.assertEqual(cache.get('library:version:book'), 1)
+        self.assertFalse(cache.add('library:response:a:lock', 1))
+        self.assertLessEqual(len(cache._list_cache_files()), 2)
+
+        cache.clear()
+        self.assertIsNone(cache.get('library:version:book'))
+
+
+class CounterTests(LibraryAPITestCase):
+    """Denormalized counters follow writes and can be reconciled."""
+
+    def counters(self, book):
+        book.refresh_from_db()
+        book.author.refresh_from_db()
+        self.member.refresh_from_db()
+        return book.author.books_count, book.times_borrowed, self.member.active_loans_count
+
+    def test_single_and_bulk_circulation(self):
+        first, second = self.create_books(2)
+        self.assertEqual(self.counters(first), (2, 0, 0))
+
+        record_id = self.client.post(
+            '/api/borrow-records/borrow/', {'book_id': first.pk, 'member_id': self.member.pk}
+        ).json()['id']
+        self.assertEqual(self.counters(first), (2, 1, 1))
+        self.client.post('/api/borrow-records/return_book/', {'borrow_record_id': record_id})
+        self.assertEqual(self.counters(first), (2, 1, 0))
+
+        results = self.client.post('/api/borrow-records/bulk_borrow/', {'items': [
+            {'book_id': first.pk, 'member_id': self.member.pk},
+            {'book_id': second.pk, 'member_id': self.member.pk},
+        ]}, format='json').json()['results']
+        self.assertEqual(self.counters(first), (2, 2, 2))
+        self.client.post('/api/borrow-records/bulk_return/', {
+            'borrow_record_ids': [result['borrow_record_id'] for result in results],
+        }, format='json')
+        self.assertEqual(self.counters(second), (2, 1, 0))
+
+    def test_book_moves_and_deletes(self):
+        book, = self.create_books(1)
+        other = Author.objects.create(name='Other')
+        book.author = other
+        book.save()
+        other.refresh_from_db()
+        self.assertEqual(other.books_count, 1)
+        self.assertEqual(Author.objects.get(name='Author').books_count, 0)
+        Book.objects.filter(pk=book.pk).delete()
+        other.refresh_from_db()
+        self.assertEqual(other.books_count, 0)
+
+    def test_loan_deletes(self):
+        book, = self.create_books(1)
+        returned = BorrowRecord.objects.create(book=book, member=self.member)
+        returned.return_date = timezone.now()
+        returned.save()
+        BorrowRecord.objects.create(book=book, member=self.member)
+        self.assertEqual(self.counters(book), (1, 2, 1))
+        BorrowRecord.objects.all().delete()
+        self.assertEqual(self.counters(book), (1, 0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        book, = self.create_books(1)
+        BorrowRecord.objects.create(book=book, member=self.member)
+        Author.objects.update(books_count=7)
+        Book.objects.update(times_borrowed=0)
+        Member.objects.update(active_loans_count=3)
+        stdout = StringIO()
+        call_command('reconcile_counters', stdout=stdout)
+        self.assertIn('Author.books_count: fixed 1 rows', stdout.getvalue())
+        self.assertEqual(self.counters(book), (1, 1, 1))
+
+
+@override_settings(ROOT_URLCONF='library_management.async_urls')
+class AsyncReadTests(LibraryAPITestCase):
+    """Reads on the ASGI URLconf run as coroutines and match the sync views."""
+
+    def setUp(self):
+        super().setUp()
+        self.book, = self.create_books(1)
+        self.record = BorrowRecord.objects.create(book=self.book, member=self.member)
+        self.async_client = AsyncClient()
+        self.tokens = {user: AccessToken.for_user(user) for user in (self.librarian, self.member_user)}
+
+    def bearer(self, user):
+        return {'Authorization': f'Bearer {self.tokens[user]}'}
+
+    def test_reads_are_routed_to_coroutines(self):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve('/api/books/').func))
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(f'/api/books/{self.book.pk}/').func))
+        self.assertFalse(asyncio.iscoroutinefunction(resolve('/api/books/export/').func))
+
+    @override_settings(DEBUG=True)
+    def test_middleware_runs_without_sync_hops(self):
+        from library_management.asgi import AsyncReadsASGIHandler
+
+        # Django logs every middleware it has to adapt to the async handler
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            AsyncReadsASGIHandler()
+
+    async def test_only_static_paths_are_looked_up(self):
+        from library.middleware import StaticFilesMiddleware
+
+        with mock.patch.object(StaticFilesMiddleware, 'find_file', autospec=True, return_value=None) as find_file:
+            response = await self.async_client.get('/api/books/', headers=self.bearer(self.librarian))
+            self.assertEqual(response.status_code, 200)
+            find_file.assert_not_called()
+            await self.async_client.get('/static/missing.css')
+            find_file.assert_called_once_with(mock.ANY, '/static/missing.css')
+
+    async def test_matches_sync_responses(self):
+        paths = [
+            '/api/authors/', f'/api/authors/{self.book.author_id}/',
+            '/api/books/', f'/api/books/{self.book.pk}/', '/api/books/?category=other',
+            '/api/members/', f'/api/members/{self.member.pk}/',
+            '/api/borrow-records/', f'/api/borrow-records/{self.record.pk}/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path, headers=self.bearer(self.librarian))
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(self.client.get)(path)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_errors(self):
+        librarian, member = self.bearer(self.librarian), self.bearer(self.member_user)
+        self.assertEqual((await self.async_client.get('/api/books/9999/', headers=librarian)).status_code, 404)
+        self.assertEqual((await self.async_client.get('/api/books/')).status_code, 401)
+        self.assertEqual((await self.async_client.get('/api/members/', headers=member)).status_code, 403)
+        self.assertEqual((await self.async_client.get('/api/books/', headers=member)).status_code, 200)
+
+    async def test_session_members_see_their_own_rows(self):
+        other = await Member.objects.acreate(name='Other', email='other@library.com')
+        await BorrowRecord.objects.acreate(book=(await sync_to_async(self.create_books)(1))[0], member=other)
+        await self.async_client.aforce_login(self.member_user)
+        response = await self.async_client.get('/api/borrow-records/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.record.pk])
+        response = await self.async_client.get(f'/api/borrow-records/{self.record.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await self.async_client.get('/api/holds/')).status_code, 200)
+
+    async def test_etag_revalidation(self):
+        headers = self.bearer(self.librarian)
+        etag = (await self.async_client.get(f'/api/books/{self.book.pk}/', headers=headers))['ETag']
+        response = await self.async_client.get(
+            f'/api/books/{self.book.pk}/', headers={**headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_writes_use_the_sync_view(self):
+        response = await self.async_client.post(
+            '/api/authors/', {'name': 'New'}, content_type='application/json', headers=self.bearer(self.librarian)
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Author.objects.filter(name='New').aexists())
+
+
+class ProjectionTests(LibraryAPITestCase):
+    """Projected list rows render byte-identical JSON to the serializers."""
+
+    def test_matches_serializers(self):
+        author = Author.objects.create(name='Émile Zola', biography='Écrivain "naturaliste"')
+        books = self.create_books(3, author=author)
+        BorrowRecord.objects.create(book=books[0], member=self.member, return_date=timezone.now())
+        BorrowRecord.objects.create(book=books[1], member=self.member)
+
+        for serializer_class in (AuthorSerializer, BookSerializer, MemberSerializer, BorrowRecordSerializer):
+            for zone in ('UTC', 'America/New_York'):
+                with self.subTest(serializer=serializer_class.__name__, zone=zone), timezone.override(zone):
+                    model = serializer_class.Meta.model
+                    projection = Projection.for_serializer(serializer_class)
+                    rows = projection.project(model.objects.order_by('id'))
+                    self.assertEqual(
+                        JSONRenderer().render(projection.represent(rows)),
+                        JSONRenderer().render(serializer_class(model.objects.order_by('id'), many=True).data),
+                    )
+
+    def test_list_pages_through_projection(self):
+        self.create_books(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/', {'page_size': 2})
+        self.assertEqual([book['title'] for book in response.json()['results']], ['Book 0', 'Book 1'])
+        self.assertEqual(
+            [book['title'] for book in self.client.get(response.json()['next']).json()['results']], ['Book 2']
+        )
+
+    def test_rejects_computed_fields(self):
+        class ComputedSerializer(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Book
+                fields = ['id', 'label']
+
+        with self.assertRaises(ImproperlyConfigured):
+            Projection.for_serializer(ComputedSerializer)
+
+
+class StatelessAuthTests(LibraryAPITestCase):
+    """Access tokens carry the caller's role, so the API never loads the user."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_books(1)
+        self.client = APIClient()
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_claims(self):
+        token = AccessToken.for_user(self.member_user)
+        self.assertEqual((token['is_staff'], token['member_id']), (False, self.member.pk))
+        self.assertEqual(AccessToken.for_user(self.librarian)['member_id'], None)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_obtained_tokens_carry_claims(self):
+        self.librarian.set_password('secret')
+        self.librarian.save()
+        response = self.client.post('/auth/jwt/create/', {'username': 'librarian', 'password': 'secret'})
+        self.assertTrue(tokens.AccessToken(response.json()['access'])['is_staff'])
+
+    def test_requests_skip_the_user_lookup(self):
+        self.authorize(AccessToken.for_user(self.member_user))
+        self.client.get('/api/books/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/books/').status_code, 200)
+        self.assertEqual(self.client.get('/api/members/').status_code, 403)
+
+        response = self.client.get('/api/borrow-records/')
+        self.assertIsInstance(response.wsgi_request.user, TokenUser)
+        self.assertEqual(response.wsgi_request.user.member_id, self.member.pk)
+
+    def test_account_changes_revoke_tokens(self):
+        self.authorize(AccessToken.for_user(self.librarian))
+        self.assertEqual(self.client.get('/api/members/').status_code, 200)
+        self.librarian.is_staff = False
+        self.librarian.save()
+        self.assertEqual(self.client.get('/api/members/').status_code, 401)
+
+        self.authorize(AccessToken.for_user(self.member_user))
+        User.objects.filter(pk=self.member_user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/books/').status_code, 200)
+        with override_settings(TOKEN_VERSION_TTL=0):
+            self.assertEqual(self.client.get('/api/books/').status_code, 401)
+
+    def test_tokens_without_claims_load_the_user(self):
+        self.authorize(tokens.AccessToken.for_user(self.librarian))
+        response = self.client.get('/api/members/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, User)
+
+
+class ConnectionTimingTests(TransactionTestCase):
+    """Requests report the time spent getting database connections."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('librarian', is_staff=True))
+
+    def test_server_timing_header(self):
+        # The test client keeps connections open across requests
+        connection.close()
+        response = self.client.get('/api/books/')
+        self.assertRegex(
+            response['Server-Timing'], r'^db-wait;dur=[\d.]+, db-acquire;dur=[\d.]+;desc="1 connection\(s\)"$'
+        )
+        self.assertEqual(response.wsgi_request.db_timings.connections, 1)
+
+        # Served from the response cache without touching the database
+        connection.close()
+        self.assertNotIn('Server-Timing', self.client.get('/api/books/'))
+
+
+
+
+class GenerateDatasetTests(TestCase):
+    """generate_dataset writes a consistent dataset, the same one for the same seed."""
+
+    def generate(self, *args):
+        call_command(
+            'generate_dataset', '--authors', '5', '--books', '40', '--members', '10', '--loans', '400',
+            '--until', '2025-01-01', '--on-loan', '0.5', '--batch-size', '64', *args, stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return list(BorrowRecord.objects.order_by('id').values_list(
+            'book__title', 'book__author__name', 'member__name', 'borrow_date', 'return_date',
+        ))
+
+    def test_dataset(self):
+        self.generate()
+        self.assertEqual(
+            [Author.objects.count(), Book.objects.count(), Member.objects.count(), BorrowRecord.objects.count()],
+            [5, 40, 10, 400],
+        )
+        books_per_author = sorted(Author.objects.values_list('books_count', flat=True), reverse=True)
+        self.assertGreater(books_per_author[0], books_per_author[-1])
+        self.assertEqual(sum(books_per_author), 40)
+
+        open_loans = BorrowRecord.objects.filter(return_date__isnull=True)
+        self.assertTrue(open_loans.exists())
+        self.assertEqual(Book.objects.filter(availability_status='borrowed').count(), open_loans.count())
+        for book in Book.objects.all():
+            self.assertEqual(book.times_borrowed, book.borrow_records.count())
+        for member in Member.objects.all():
+            self.assertEqual(member.active_loans_count, member.borrow_records.filter(return_date__isnull=True).count())
+        self.assertFalse(BorrowRecord.objects.filter(return_date__lt=F('borrow_date')).exists())
+        self.assertTrue(search_books(Book.objects.all(), Book.objects.first().title.split()[-1]).exists())
+
+        # The primary key sequences were moved past the generated ids
+        Book.objects.create(title='Dune', author=Author.objects.first(), isbn='9780441013593')
+
+    def test_seed_is_deterministic(self):
+        self.generate('--seed', '7')
+        first = self.snapshot()
+        for model in (BorrowRecord, Book, Member, Author):
+            model.objects.all().delete()
+        self.generate('--seed', '7')
+        self.assertEqual(self.snapshot(), first)
+        self.generate('--seed', '8')
+        self.assertNotEqual(self.snapshot()[400:], first)
+
+
+class MetricsTests(LibraryAPITestCase):
+    """Requests are aggregated per route and exposed to librarians in the Prometheus format."""
+
+    def setUp(self):
+        super().setUp()
+        reset_metrics()
+
+    def test_records_per_route(self):
+        book, = self.create_books(1)
+        response = self.client.get('/api/books/')
+        self.client.get('/api/books/')
+        self.client.post('/api/borrow-records/borrow/', {'book_id': book.pk, 'member_id': self.member.pk}, format='json')
+        export = self.client.get('/api/books/export/')
+        exported = b''.join(export.streaming_content)
+
+        stats = collect()
+        books = stats[('book-list', 'GET')]
+        self.assertEqual(books.statuses, {200: 2})
+        self.assertEqual(sum(books.buckets), 2)
+        self.assertEqual(books.bytes, 2 * len(response.content))
+        self.assertGreater(books.queries, 0)
+        self.assertEqual(stats[('borrowrecord-borrow', 'POST')].statuses, {201: 1})
+        self.assertEqual(stats[('book-export', 'GET')].bytes, len(exported))
+
+        metrics = self.client.get('/api/metrics/')
+        self.assertEqual(metrics['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = metrics.content.decode()
+        self.assertIn('library_http_requests_total{route="book-list",method="GET",status="200"} 2\n', body)
+        self.assertIn('library_http_request_duration_seconds_bucket{route="book-list",method="GET",le="+Inf"} 2\n', body)
+        self.assertIn(f'library_db_queries_total{{route="book-list",method="GET"}} {books.queries}\n', body)
+        self.assertIn('library_cache_requests_total{namespace="response",result="local_hit"} 1\n', body)
+
+    def test_restricted_to_librarians(self):
+        self.client.force_authenticate(self.member_user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    def test_exited_threads_are_folded(self):
+        for _ in range(20):
+            thread = threading.Thread(target=record_request, args=('book-list', 'GET', 200, 0.01, 10))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(collect()[('book-list', 'GET')].statuses, {200: 20})
+        self.assertTrue(all(thread.is_alive() for thread, _ in _shards))
+        self.assertEqual(collect()[('book-list', 'GET')].bytes, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoadTestTests(TransactionTestCase):
+    """The load_test command runs every scenario in-process and reports per endpoint."""
+
+    def test_report(self):
+        cache.clear()
+        User.objects.create_user('librarian', password='secret', is_staff=True)
+        member_user = User.objects.create_user('member', password='secret')
+        Member.objects.create(user=member_user, name='Member', email='member@library.com')
+        author = Author.objects.create(name='Author')
+        for i in range(3):
+            Book.objects.create(title=f'Popular Book {i}', author=author, isbn=f'{i:013d}')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = os.path.join(directory.name, 'report.json')
+        call_command(
+            'load_test', '--duration', '0.5', '--concurrency', '2', '--output', output,
+            '--mix', 'browse=1,circulation=1,librarian=1,login=1',
+            '--librarian', 'librarian:secret', '--member', 'member:secret', stdout=StringIO(),
+        )
+        with open(output) as f:
+            report = json.load(f)
+
+        self.assertEqual(report['database'], connection.vendor)
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertEqual(set(report['scenarios']), {'browse', 'circulation', 'librarian', 'login'})
+        borrow = report['endpoints']['POST /api/borrow-records/borrow/']
+        self.assertEqual(set(borrow), {
+            'requests', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'errors', 'error_rate', 'statuses',
+        })
+        self.assertLessEqual(set(borrow['statuses']), {'201', '409'})
+        self.assertEqual(Author.objects.count(), 1)
+
+    def test_needs_credentials(self):
+        with self.assertRaisesMessage(CommandError, "Logging in as 'librarian' failed"):
+            call_command('load_test', '--duration', '0.1', stdout=StringIO())
+
+
+class ColdStartTests(TestCase):
+    """A cold /api/ request never imports the docs, auth, admin or setup URLconfs."""
+
+    def test_lazy_urlconfs_resolve(self):
+        self.assertEqual(reverse('schema-swagger-ui'), '/swagger/')
+        self.assertEqual(reverse('admin:index'), '/admin/')
+        self.assertEqual(resolve('/setup/').url_name, 'setup-database')
+        self.assertEqual(resolve('/auth/jwt/create/').url_name, 'jwt-create')
+
+    def test_profile_imports(self):
+        stdout = StringIO()
+        call_command('profile_imports', '--json', '--top', '100000', stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['status'], 401)
+        modules = {row['module'] for row in report['modules']}
+        self.assertIn('library.views', modules)
+        for lazy in ('drf_yasg.views', 'djoser.views', 'library.admin', 'api.setup', 'pkg_resources'):
+            self.assertNotIn(lazy, modules)
+        self.assertIn('library', {row['app'] for row in report['apps']})
+
+
+class BuiltSchemaTests(TestCase):
+    """The docs serve the schema built by build_openapi_schema, generating it live only in DEBUG."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.static_root = directory.name
+        override = override_settings(STATIC_ROOT=self.static_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def build(self):
+        call_command('build_openapi_schema', stdout=StringIO())
+        with open(os.path.join(self.static_root, 'openapi', 'manifest.json')) as f:
+            return json.load(f)
+
+    def test_serves_built_schema_with_etag(self):
+        manifest = self.build()
+        with open(os.path.join(self.static_root, 'openapi', manifest['json']), 'rb') as f:
+            content = f.read()
+
+        response = self.client.get('/swagger.json')
+        self.assertEqual(response.content, content)
+        self.assertEqual(response['ETag'], f'"{manifest["hash"]}"')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('/api/books/', response.json()['paths'])
+        self.assertNotIn('host', response.json())
+        self.assertEqual(self.client.get('/swagger.yaml')['Content-Type'], 'application/yaml')
+
+        response = self.client.get('/swagger/?format=openapi', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_swagger_page_loads_hashed_schema(self):
+        manifest = self.build()
+        response = self.client.get('/swagger-ui/')
+        self.assertContains(response, f"url: '/static/openapi/{manifest['json']}'")
+        response = self.client.get('/swagger-ui/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_ui_pages_load_the_built_schema(self):
+        manifest = self.build()
+        with mock.patch('drf_yasg.generators.OpenAPISchemaGenerator.get_schema') as get_schema:
+            for path in ('/swagger/', '/redoc/'):
+                with self.subTest(path=path):
+                    response = self.client.get(path)
+                    self.assertContains(response, f'"url": "/static/openapi/{manifest["json"]}"')
+                    self.assertIn('max-age=3600', response['Cache-Control'])
+                    response = self.client.get(path, headers={'If-None-Match': response['ETag']})
+                    self.assertEqual(response.status_code, 304)
+        get_schema.assert_not_called()
+
+    def test_unbuilt_schema_is_generated_only_in_debug(self):
+        self.assertEqual(self.client.get('/swagger.json').status_code, 503)
+        with override_settings(DEBUG=True):
+            response = self.client.get('/swagger.json')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('/api/books/', response.json()['paths'])
+            self.assertContains(self.client.get('/swagger-ui/'), "url: '/swagger/?format=openapi'")
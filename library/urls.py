@@ -7,7 +7,9 @@ router.register(r'authors', views.AuthorViewSet)
 router.register(r'books', views.BookViewSet)
 router.register(r'members', views.MemberViewSet)
 router.register(r'borrow-records', views.BorrowRecordViewSet)
+router.register(r'holds', views.HoldViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
@@ -1,43 +1,201 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.views import APIView
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.http import HttpResponse
 from django.utils import timezone
 
-from .models import Author, Book, Member, BorrowRecord
+from .models import Author, Book, Member, BorrowRecord, BookNotAvailable, Hold
 from .serializers import (
     AuthorSerializer, BookSerializer, MemberSerializer, 
-    BorrowRecordSerializer, BorrowBookSerializer, ReturnBookSerializer
+    BorrowRecordSerializer, BorrowBookSerializer, ReturnBookSerializer,
+    BulkBorrowSerializer, BulkReturnSerializer, HoldSerializer, PlaceHoldSerializer,
+    BookFilterSerializer, BorrowRecordFilterSerializer
 )
 from .permissions import IsLibrarianOrReadOnly, IsLibrarianOrMemberReadOnly, IsLibrarian
+from . import circulation, holds
+from .async_views import AsyncReadMixin
+from .authentication import StatelessJWTAuthentication, TokenUser
+from .cache import CachedResponseMixin, aget_or_compute, aget_versions, bump_version, get_or_compute, get_versions
+from .exports import StreamingExportMixin
+from .filters import QueryParameterFilterBackend
+from .metrics import render_metrics
+from .pagination import BorrowRecordCursorPagination, SearchResultsPagination
+from .projections import ProjectedListMixin
+from .replicas import ReplicaReadMixin
+from .search import search_books
 
+# The API only needs the role and member id of the caller, which access
+# tokens carry as claims; the auth endpoints keep loading the full user
+API_AUTHENTICATION_CLASSES = [StatelessJWTAuthentication, SessionAuthentication]
 
-class AuthorViewSet(viewsets.ModelViewSet):
+MEMBER_KEY = 'library:member:{}:{}'
+MEMBER_TIMEOUT = 300
+
+
+def requesting_member_id(user):
+    """The id of the member profile linked to ``user``, or ``None``."""
+    if isinstance(user, TokenUser):
+        # The member id is a token claim, so no profile lookup is needed
+        return user.member_id
+    # Session users' profiles are cached until a member is saved or deleted;
+    # wrapped in a tuple so that having no profile is cached too
+    version, = get_versions([Member])
+    member_id, = get_or_compute(
+        MEMBER_KEY.format(version, user.pk),
+        lambda: (Member.objects.filter(user_id=user.pk).values_list('pk', flat=True).first(),),
+        MEMBER_TIMEOUT,
+    )
+    return member_id
+
+
+async def arequesting_member_id(user):
+    """Async counterpart of ``requesting_member_id``."""
+    if isinstance(user, TokenUser):
+        return user.member_id
+    version, = await aget_versions([Member])
+
+    async def compute():
+        return (await Member.objects.filter(user_id=user.pk).values_list('pk', flat=True).afirst(),)
+
+    member_id, = await aget_or_compute(MEMBER_KEY.format(version, user.pk), compute, MEMBER_TIMEOUT)
+    return member_id
+
+
+class MemberScopedMixin:
+    """
+    Limits members to their own rows of a model with a ``member`` foreign
+    key; librarians see every row. The read coroutines of
+    ``AsyncReadMixin`` resolve the member in ``ainitial``, as
+    ``get_queryset`` runs on the event loop.
+    """
+
+    async def ainitial(self, request, *args, **kwargs):
+        await super().ainitial(request, *args, **kwargs)
+        if not request.user.is_staff:
+            self._member_id = await arequesting_member_id(request.user)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = getattr(self.request, 'user', None)
+        if user is None or user.is_staff:  # no request while generating the schema
+            return queryset
+        if not hasattr(self, '_member_id'):
+            self._member_id = requesting_member_id(user)
+        if self._member_id is None:
+            return queryset.none()
+        return queryset.filter(member_id=self._member_id)
+
+
+class AuthorViewSet(
+    ReplicaReadMixin, CachedResponseMixin, ProjectedListMixin, AsyncReadMixin, viewsets.ModelViewSet
+):
     """ViewSet for managing authors."""
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_models = (Author,)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    ReplicaReadMixin, CachedResponseMixin, ProjectedListMixin, AsyncReadMixin, StreamingExportMixin,
+    viewsets.ModelViewSet
+):
     """ViewSet for managing books."""
-    queryset = Book.objects.all()
+    queryset = Book.objects.select_related('author')
     serializer_class = BookSerializer
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_models = (Book, Author)
+    filter_backends = [QueryParameterFilterBackend]
+    filter_serializer_class = BookFilterSerializer
+    export_filename = 'books'
+    export_fields = {
+        'id': 'id',
+        'title': 'title',
+        'author': 'author_id',
+        'author_name': 'author__name',
+        'isbn': 'isbn',
+        'category': 'category',
+        'availability_status': 'availability_status',
+        'times_borrowed': 'times_borrowed',
+    }
+
+    @property
+    def search_query(self):
+        """The ``?search=`` term for list and export requests, or an empty string."""
+        if self.action not in ('list', 'export') or self.request is None:
+            return ''
+        return self.request.query_params.get('search', '').strip()
+
+    @property
+    def paginator(self):
+        if self.search_query and not hasattr(self, '_paginator'):
+            self._paginator = SearchResultsPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.search_query:
+            queryset = search_books(queryset, self.search_query).order_by('-search_rank', 'id')
+        return queryset
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(ReplicaReadMixin, ProjectedListMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """ViewSet for managing members."""
-    queryset = Member.objects.all()
+    queryset = Member.objects.select_related('user')
     serializer_class = MemberSerializer
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsLibrarian]
 
 
-class BorrowRecordViewSet(viewsets.ModelViewSet):
-    """ViewSet for managing borrowing records."""
-    queryset = BorrowRecord.objects.all()
+class BorrowRecordViewSet(
+    ReplicaReadMixin, MemberScopedMixin, ProjectedListMixin, AsyncReadMixin, StreamingExportMixin,
+    viewsets.ModelViewSet
+):
+    """
+    ViewSet for managing borrowing records. A member's list is a range scan
+    of the ``(member, borrow_date, id)`` index, whatever the table size.
+    """
+    queryset = BorrowRecord.objects.select_related('book', 'member')
     serializer_class = BorrowRecordSerializer
+    authentication_classes = API_AUTHENTICATION_CLASSES
     permission_classes = [IsLibrarianOrMemberReadOnly]
+    pagination_class = BorrowRecordCursorPagination
+    filter_backends = [QueryParameterFilterBackend]
+    filter_serializer_class = BorrowRecordFilterSerializer
+    export_filename = 'borrow-records'
+    export_fields = {
+        'id': 'id',
+        'book': 'book_id',
+        'book_title': 'book__title',
+        'member': 'member_id',
+        'member_name': 'member__name',
+        'borrow_date': 'borrow_date',
+        'return_date': 'return_date',
+    }
+
+    def create(self, request, *args, **kwargs):
+        try:
+            return super().create(request, *args, **kwargs)
+        except (BookNotAvailable, IntegrityError):
+            return Response(
+                {'error': 'Book is not available for borrowing.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+    def perform_create(self, serializer):
+        # Saving an open loan claims the book with a conditional UPDATE, as
+        # in borrow(); the savepoint keeps a failed claim from poisoning an
+        # enclosing transaction
+        with transaction.atomic():
+            serializer.save()
 
     @action(detail=False, methods=['post'])
     def borrow(self, request):
@@ -48,24 +206,28 @@ class BorrowRecordViewSet(viewsets.ModelViewSet):
             member_id = serializer.validated_data['member_id']
             
             try:
-                book = Book.objects.get(id=book_id)
-                member = Member.objects.get(id=member_id)
-                
-                if book.availability_status != 'available':
-                    return Response(
-                        {'error': 'Book is not available for borrowing.'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                borrow_record = BorrowRecord.objects.create(
-                    book=book,
-                    member=member
-                )
+                with transaction.atomic():
+                    # Saving claims the book with a conditional UPDATE, so two
+                    # concurrent requests can never both open a loan on it
+                    borrow_record = BorrowRecord(book_id=book_id, member_id=member_id)
+                    borrow_record.save()
+                    # The joined reload doubles as the member existence check
+                    borrow_record = self.queryset.get(pk=borrow_record.pk)
                 
                 borrow_serializer = BorrowRecordSerializer(borrow_record)
                 return Response(borrow_serializer.data, status=status.HTTP_201_CREATED)
                 
-            except (Book.DoesNotExist, Member.DoesNotExist):
+            except (BookNotAvailable, IntegrityError):
+                if not Book.objects.filter(pk=book_id).exists():
+                    return Response(
+                        {'error': 'Book or member not found.'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                return Response(
+                    {'error': 'Book is not available for borrowing.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            except BorrowRecord.DoesNotExist:
                 return Response(
                     {'error': 'Book or member not found.'},
                     status=status.HTTP_404_NOT_FOUND
@@ -80,25 +242,106 @@ class BorrowRecordViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             borrow_record_id = serializer.validated_data['borrow_record_id']
             
-            try:
-                borrow_record = BorrowRecord.objects.get(id=borrow_record_id)
-                
-                if borrow_record.return_date:
+            with transaction.atomic():
+                returned = BorrowRecord.objects.filter(
+                    pk=borrow_record_id, return_date__isnull=True
+                ).update(return_date=timezone.now())
+                if returned:
+                    book_id = BorrowRecord.objects.values_list('book_id', flat=True).get(pk=borrow_record_id)
+                    Member.objects.filter(borrow_records__pk=borrow_record_id).update(
+                        active_loans_count=Greatest(F('active_loans_count') - 1, 0)
+                    )
+                    # The next member in the book's hold queue, if any, gets it straight away
+                    next_loan = holds.hand_off([book_id]).get(book_id)
+                    bump_version(BorrowRecord, Book)
+            
+            if not returned:
+                if BorrowRecord.objects.filter(pk=borrow_record_id).exists():
                     return Response(
                         {'error': 'Book has already been returned.'},
                         status=status.HTTP_400_BAD_REQUEST
                     )
-                
-                borrow_record.return_date = timezone.now()
-                borrow_record.save()
-                
-                borrow_serializer = BorrowRecordSerializer(borrow_record)
-                return Response(borrow_serializer.data, status=status.HTTP_200_OK)
-                
-            except BorrowRecord.DoesNotExist:
                 return Response(
                     {'error': 'Borrowing record not found.'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            
+            borrow_serializer = BorrowRecordSerializer(self.queryset.get(pk=borrow_record_id))
+            return Response(
+                {**borrow_serializer.data, 'next_borrow_record_id': next_loan.pk if next_loan else None},
+                status=status.HTTP_200_OK
+            )
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsLibrarian])
+    def bulk_borrow(self, request):
+        """Borrow a batch of books, reporting the outcome of each item."""
+        serializer = BulkBorrowSerializer(data=request.data)
+        if serializer.is_valid():
+            results = circulation.bulk_borrow(serializer.validated_data['items'])
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsLibrarian])
+    def bulk_return(self, request):
+        """Return a batch of borrowed books, reporting the outcome of each item."""
+        serializer = BulkReturnSerializer(data=request.data)
+        if serializer.is_valid():
+            results = circulation.bulk_return(serializer.validated_data['borrow_record_ids'])
+            return Response({'results': results}, status=status.HTTP_200_OK)
+        
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class HoldViewSet(
+    ReplicaReadMixin, MemberScopedMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+    viewsets.GenericViewSet
+):
+    """ViewSet for joining, checking and leaving the hold queues of borrowed books."""
+    queryset = Hold.objects.select_related('book', 'member')
+    serializer_class = HoldSerializer
+    authentication_classes = API_AUTHENTICATION_CLASSES
+
+    def get_serializer(self, *args, **kwargs):
+        if args:
+            holds.set_queue_positions(list(args[0]) if kwargs.get('many') else [args[0]])
+        return super().get_serializer(*args, **kwargs)
+
+    def create(self, request):
+        """Join a borrowed book's hold queue; members join for themselves."""
+        serializer = PlaceHoldSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        member_id = serializer.validated_data.get('member_id')
+        if not request.user.is_staff:
+            own_member_id = requesting_member_id(request.user)
+            if own_member_id is None or member_id not in (None, own_member_id):
+                return Response(
+                    {'error': 'Members can only place holds for themselves.'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            member_id = own_member_id
+        elif member_id is None:
+            return Response({'member_id': ['This field is required.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            hold = holds.place_hold(serializer.validated_data['book_id'], member_id)
+        except (Book.DoesNotExist, Member.DoesNotExist):
+            return Response({'error': 'Book or member not found.'}, status=status.HTTP_404_NOT_FOUND)
+        except holds.HoldNotPlaced as error:
+            return Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+
+        hold_serializer = self.get_serializer(self.get_queryset().get(pk=hold.pk))
+        return Response(hold_serializer.data, status=status.HTTP_201_CREATED)
+
+
+class MetricsView(APIView):
+    """Per-route request metrics of this process, in the Prometheus text format."""
+    authentication_classes = API_AUTHENTICATION_CLASSES
+    permission_classes = [IsLibrarian]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
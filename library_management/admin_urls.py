@@ -0,0 +1,7 @@
+from django.contrib import admin
+
+# INSTALLED_APPS uses SimpleAdminConfig, so admin modules are only
+# imported once the admin is first requested
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_management.settings')
 
-application = get_asgi_application()
+ASYNC_URLCONF = 'library_management.async_urls'
+
+
+class AsyncReadsASGIHandler(ASGIHandler):
+    """ASGI handler that resolves requests against the async read URLconf."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASYNC_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncReadsASGIHandler()
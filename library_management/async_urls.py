@@ -0,0 +1,13 @@
+"""
+URL configuration for the ASGI application.
+
+Identical to ``library_management.urls``, except that ``/api/`` reads are
+served by the native async views in ``library.async_urls``.
+"""
+from django.urls import path, include
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/', include('library.async_urls')),
+] + sync_urlpatterns
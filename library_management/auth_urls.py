@@ -0,0 +1,6 @@
+from django.urls import path, include
+
+urlpatterns = [
+    path('', include('djoser.urls')),
+    path('', include('djoser.urls.jwt')),
+]
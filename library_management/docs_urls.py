@@ -0,0 +1,42 @@
+from django.urls import re_path
+from rest_framework import permissions
+from drf_yasg.views import get_schema_view
+from drf_yasg import openapi
+from .views import BuiltSchemaView, PublicSwaggerView
+
+api_info = openapi.Info(
+   title="Library Management API",
+   default_version='v1',
+   description="A comprehensive API for managing a library system with authentication and role-based permissions",
+   terms_of_service="https://www.google.com/policies/terms/",
+   contact=openapi.Contact(email="contact@library.com"),
+   license=openapi.License(name="BSD License"),
+)
+
+# Schema view for Swagger documentation; outside DEBUG the schema is served
+# from the files build_openapi_schema writes at build time, and the UI pages
+# are rendered without it
+schema_view = get_schema_view(
+   api_info,
+   public=True,
+   permission_classes=(permissions.AllowAny,),
+)
+
+urlpatterns = [
+    re_path(
+        r'^swagger(?P<format>\.json|\.yaml)$',
+        BuiltSchemaView.as_view(live_view=schema_view.without_ui(cache_timeout=0)),
+        name='schema-json',
+    ),
+    re_path(
+        r'^swagger/$',
+        BuiltSchemaView.as_view(live_view=schema_view.with_ui('swagger', cache_timeout=0), ui='swagger'),
+        name='schema-swagger-ui',
+    ),
+    re_path(r'^swagger-ui/$', PublicSwaggerView.as_view(), name='swagger-ui'),
+    re_path(
+        r'^redoc/$',
+        BuiltSchemaView.as_view(live_view=schema_view.with_ui('redoc', cache_timeout=0), ui='redoc'),
+        name='schema-redoc',
+    ),
+]
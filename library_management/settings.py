@@ -10,8 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,7 +33,8 @@ ALLOWED_HOSTS = ["*", "django-practice-six.vercel.app", ".vercel.app", "localhos
 
 INSTALLED_APPS = [
     'whitenoise.runserver_nostatic',
-    'django.contrib.admin',
+    # Admin modules are autodiscovered when the admin URLs are first used
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -45,8 +47,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'library.middleware.MetricsMiddleware',
+    'library.middleware.ConnectionTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, without forcing ASGI requests through a sync thread
+    'library.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,14 +84,24 @@ WSGI_APPLICATION = 'library_management.wsgi.app'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 # Using hardcoded settings for Vercel deployment
 
+# A warm serverless worker keeps its connections between requests instead of
+# paying a new TLS handshake to the Supabase pooler on every one. By default
+# the worker keeps one persistent connection for DB_CONN_MAX_AGE seconds.
+# With DB_POOL=True they come from a small psycopg 3 pool instead,
+# health-checked on checkout and recycled after DB_POOL_MAX_LIFETIME seconds;
+# that needs psycopg 3 with a libpq (psycopg-binary) and psycopg-pool.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'library.backends.postgresql',
         'NAME': 'postgres',
         'USER': 'postgres.iquxptnnslogwzxhkvbq',
         'PASSWORD': 'Bondstone1234!',
         'HOST': 'aws-1-us-east-2.pooler.supabase.com',
         'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'sslmode': 'require',
             'connect_timeout': 10,
@@ -94,6 +109,88 @@ DATABASES = {
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=300, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=60, cast=float),
+        # Seconds a request waits for a free connection before failing
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
+# Streaming replicas of the default database, as replica1, replica2, ...
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+for index, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'], 'HOST': host, 'OPTIONS': {**DATABASES['default']['OPTIONS']},
+    }
+
+# Local SQLite database for running the test suite and benchmarks offline
+if config('USE_SQLITE', default=False, cast=bool):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'library.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Let concurrent writers queue on the database lock instead of failing
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
+        },
+    }
+    # Stand-in read replica: the same file, so it never lags. Tests give it
+    # a database of its own to tell the two apart. Enable it with
+    # REPLICA_DATABASES=replica.
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'NAME': BASE_DIR / 'test_db_replica.sqlite3'},
+    }
+
+# API reads are sent to these aliases by library.replicas
+DATABASE_ROUTERS = ['library.replicas.ReplicaRouter']
+
+# The default cache keeps hot keys in process memory in front of the shared
+# cache every process sees (see library.backends.twotier). The shared cache
+# is a directory locally; point it at Redis or Memcached in production, e.g.
+# SHARED_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# SHARED_CACHE_LOCATION=redis://...
+SHARED_CACHE_BACKEND = config('SHARED_CACHE_BACKEND', default='library.backends.twotier.FileCache')
+CACHES = {
+    'default': {
+        'BACKEND': 'library.backends.twotier.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': config('LOCAL_CACHE_MAX_ENTRIES', default=2000, cast=int),
+            # Seconds each key namespace is served from process memory.
+            # Responses are immutable per key; a version counter bumped by
+            # another process is picked up within its timeout.
+            'LOCAL_TIMEOUTS': {
+                'response': 300,
+                'count': 60,
+                'member': 60,
+                'version': 1,
+            },
+        },
+    },
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': config('SHARED_CACHE_LOCATION', default=str(Path(tempfile.gettempdir()) / 'library-cache')),
+    },
+}
+if SHARED_CACHE_BACKEND == 'library.backends.twotier.FileCache':
+    CACHES['shared']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+REPLICA_DATABASES = [
+    alias for alias in config(
+        'REPLICA_DATABASES', default=','.join(f'replica{index}' for index in range(1, len(DB_REPLICA_HOSTS) + 1)),
+        cast=Csv(),
+    )
+    if alias in DATABASES
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,6 +240,8 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 # WhiteNoise settings for better performance
 WHITENOISE_USE_FINDERS = True
 WHITENOISE_AUTOREFRESH = True
+# The OpenAPI schema written by build_openapi_schema carries its content hash
+WHITENOISE_IMMUTABLE_FILE_TEST = r'/openapi/schema\.[0-9a-f]{12}\.(json|yaml)$'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -152,7 +251,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'library.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
@@ -160,6 +259,8 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'library.pagination.IdCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 # Djoser settings
@@ -203,4 +304,23 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_OBTAIN_SERIALIZER': 'library.authentication.TokenObtainPairSerializer',
+    'TOKEN_USER_CLASS': 'library.authentication.TokenUser',
 }
+
+# Seconds a process trusts its cached copy of a user's token version before
+# re-reading it; changing or deactivating a user revokes their tokens within it
+TOKEN_VERSION_TTL = 30
+
+# Lists with more matching rows than this report the planner's estimate
+# instead of an exact COUNT(*) (see library.counting)
+EXACT_COUNT_THRESHOLD = 10000
+# Seconds an estimated count is reused for the same list query
+ESTIMATED_COUNT_TIMEOUT = 60
+
+# Replicas further than this many seconds behind the primary are skipped;
+# each process re-checks a replica's lag at most every interval
+REPLICA_MAX_LAG = 2.0
+REPLICA_LAG_CHECK_INTERVAL = 5
+# Seconds a client's reads go to the primary after one of its writes
+REPLICA_STICKY_SECONDS = 10
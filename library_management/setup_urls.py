@@ -0,0 +1,8 @@
+from django.urls import path
+from api.setup import setup_database
+from api.test_setup import test_setup
+
+urlpatterns = [
+    path('setup/', setup_database, name='setup-database'),
+    path('test-setup/', test_setup, name='test-setup'),
+]
@@ -13,41 +13,29 @@ Class-based views
 Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
+
+The docs, auth, admin and setup URLconfs are included lazily, so a cold
+start serving /api/ never imports drf_yasg, djoser's views or the admin.
 """
-from django.contrib import admin
-from django.urls import path, include, re_path
 from django.shortcuts import redirect
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from .views import PublicSwaggerView
-from api.setup import setup_database
-from api.test_setup import test_setup
+from django.urls import URLResolver, path, include
+from django.urls.resolvers import RegexPattern, RoutePattern
+
+
+def lazy_include(route, urlconf, namespace=None, regex=False):
+    """
+    Like ``path(route, include(urlconf))``, except that ``urlconf`` is only
+    imported once a request path matches ``route`` (or ``reverse()`` needs it).
+    """
+    pattern = RegexPattern(route, is_endpoint=False) if regex else RoutePattern(route, is_endpoint=False)
+    return URLResolver(pattern, urlconf, app_name=namespace, namespace=namespace)
 
-# Schema view for Swagger documentation
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Library Management API",
-      default_version='v1',
-      description="A comprehensive API for managing a library system with authentication and role-based permissions",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@library.com"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
 
 urlpatterns = [
     path('', lambda request: redirect('/swagger-ui/'), name='home'),
-    path('admin/', admin.site.urls),
-    path('auth/', include('djoser.urls')),
-    path('auth/', include('djoser.urls.jwt')),
     path('api/', include('library.urls')),
-    path('setup/', setup_database, name='setup-database'),
-    path('test-setup/', test_setup, name='test-setup'),
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    re_path(r'^swagger-ui/$', PublicSwaggerView.as_view(), name='swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    lazy_include('auth/', 'library_management.auth_urls'),
+    lazy_include('admin/', 'library_management.admin_urls', namespace='admin'),
+    lazy_include(r'^(?=setup/|test-setup/)', 'library_management.setup_urls', regex=True),
+    lazy_include(r'^(?=swagger|redoc/)', 'library_management.docs_urls', regex=True),
 ]
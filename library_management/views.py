@@ -1,29 +1,33 @@
-from django.http import HttpResponse
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
 from django.views import View
 from django.conf import settings
+from django.template.loader import render_to_string
 from django.templatetags.static import static
+from django.urls import reverse
 
-@method_decorator(csrf_exempt, name='dispatch')
-class PublicSwaggerView(View):
-    """Custom Swagger view that serves documentation without authentication."""
-    
-    def get(self, request):
-        # Get the current domain for proper URL generation
-        protocol = 'https' if request.is_secure() else 'http'
-        domain = request.get_host()
-        base_url = f"{protocol}://{domain}"
-        
-        # Create Swagger UI HTML using local static files with WhiteNoise
-        swagger_html = f"""
+# Where build_openapi_schema writes the schema, under STATIC_ROOT
+SCHEMA_DIRECTORY = 'openapi'
+SCHEMA_MANIFEST = 'manifest.json'
+SCHEMA_CONTENT_TYPES = {'json': 'application/json', 'yaml': 'application/yaml'}
+DOCS_MAX_AGE = 60 * 60
+
+# Swagger UI page using local static files with WhiteNoise
+SWAGGER_PAGE = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Library Management API</title>
     <meta charset="utf-8"/>
     <meta name="viewport" content="width=device-width, initial-scale=1">
-    <link rel="stylesheet" type="text/css" href="{base_url}/static/drf-yasg/swagger-ui-dist/swagger-ui.css">
+    <link rel="stylesheet" type="text/css" href="{stylesheet}">
     <style>
         /* Hide authentication elements for public documentation */
         .authorize-wrapper,
@@ -67,14 +71,14 @@ class PublicSwaggerView(View):
 </head>
 <body>
     <div id="swagger-ui"></div>
-    <script src="{base_url}/static/drf-yasg/swagger-ui-dist/swagger-ui-bundle.js"></script>
-    <script src="{base_url}/static/drf-yasg/swagger-ui-dist/swagger-ui-standalone-preset.js"></script>
+    <script src="{bundle}"></script>
+    <script src="{preset}"></script>
     <script>
         window.onload = function() {{
             console.log('Loading Swagger UI...');
             
             const ui = SwaggerUIBundle({{
-                url: '{base_url}/swagger/?format=openapi',
+                url: '{schema_url}',
                 dom_id: '#swagger-ui',
                 presets: [
                     SwaggerUIBundle.presets.apis,
@@ -116,6 +120,113 @@ class PublicSwaggerView(View):
     </script>
 </body>
 </html>
-        """
-        
-        return HttpResponse(swagger_html, content_type='text/html')
+"""
+
+
+@lru_cache(maxsize=None)
+def load_built_schema(static_root):
+    """
+    The manifest and content of the schema built into ``static_root`` by
+    ``build_openapi_schema``, or ``None`` if it has not been built.
+    """
+    directory = Path(static_root) / SCHEMA_DIRECTORY
+    try:
+        manifest = json.loads((directory / SCHEMA_MANIFEST).read_text())
+        content = {extension: (directory / manifest[extension]).read_bytes() for extension in SCHEMA_CONTENT_TYPES}
+    except (OSError, KeyError, ValueError):
+        return None
+    return manifest, content
+
+
+def built_schema():
+    return load_built_schema(str(settings.STATIC_ROOT))
+
+
+def schema_url():
+    """URL of the schema the docs pages load: the hashed static file, or live generation in DEBUG."""
+    built = None if settings.DEBUG else built_schema()
+    if built is None:
+        return f"{reverse('schema-swagger-ui')}?format=openapi"
+    return static(f"{SCHEMA_DIRECTORY}/{built[0]['json']}")
+
+
+def cached_document(request, content, content_type, etag):
+    """A publicly cacheable response, or a 304 if the client already has ``etag``."""
+    max_age = 0 if settings.DEBUG else DOCS_MAX_AGE
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': f'public, max-age={max_age}'}
+    if headers['ETag'] in parse_etags(request.headers.get('If-None-Match', '')):
+        return HttpResponseNotModified(headers=headers)
+    return HttpResponse(content, content_type=content_type, headers=headers)
+
+
+@lru_cache(maxsize=8)
+def render_docs_page(ui, schema_url):
+    """
+    drf-yasg's ``ui`` page (``swagger`` or ``redoc``) loading the schema from
+    ``schema_url``, and its ETag, rendered once per process. Unlike the
+    pages of ``get_schema_view``, it does not generate the schema, and it
+    leaves out the per-user session login block so it can be cached.
+    """
+    # Only the docs pages load drf-yasg
+    from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+    from .docs_urls import api_info
+
+    renderer = SwaggerUIRenderer() if ui == 'swagger' else ReDocRenderer()
+    context = {}
+    renderer.set_context(context)
+    settings_key = f'{ui}_settings'
+    context[settings_key] = json.dumps({**json.loads(context[settings_key]), 'url': schema_url})
+    context.update(title=api_info.title, USE_SESSION_AUTH=False)
+    content = render_to_string(renderer.template, context).encode()
+    return content, hashlib.sha256(content).hexdigest()[:32]
+
+
+@lru_cache(maxsize=8)
+def render_swagger_page(schema_url):
+    """The Swagger UI page for ``schema_url`` and its ETag, rendered once per process."""
+    content = SWAGGER_PAGE.format(
+        stylesheet=static('drf-yasg/swagger-ui-dist/swagger-ui.css'),
+        bundle=static('drf-yasg/swagger-ui-dist/swagger-ui-bundle.js'),
+        preset=static('drf-yasg/swagger-ui-dist/swagger-ui-standalone-preset.js'),
+        schema_url=schema_url,
+    ).encode()
+    return content, hashlib.sha256(content).hexdigest()[:32]
+
+
+class BuiltSchemaView(View):
+    """
+    Serves the schema built by ``build_openapi_schema``, as ``swagger.json``
+    and ``swagger.yaml`` and for the UI pages' ``?format=openapi`` fetch,
+    and the ``ui`` page loading it. In DEBUG, ``live_view`` generates the
+    schema and renders the page on each request instead.
+    """
+    live_view = None
+    ui = None
+
+    def get(self, request, format=None):
+        if format is None and request.GET.get('format') != 'openapi':
+            if settings.DEBUG:
+                return self.live_view(request)
+            content, etag = render_docs_page(self.ui, schema_url())
+            return cached_document(request, content, 'text/html; charset=utf-8', etag)
+        if settings.DEBUG:
+            return self.live_view(request, format=format)
+
+        built = built_schema()
+        if built is None:
+            return JsonResponse(
+                {'detail': 'The API schema has not been built. Run manage.py build_openapi_schema.'},
+                status=503,
+            )
+        manifest, content = built
+        extension = format.lstrip('.') if format else 'json'
+        return cached_document(request, content[extension], SCHEMA_CONTENT_TYPES[extension], manifest['hash'])
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class PublicSwaggerView(View):
+    """Custom Swagger view that serves documentation without authentication."""
+
+    def get(self, request):
+        content, etag = render_swagger_page(schema_url())
+        return cached_document(request, content, 'text/html; charset=utf-8', etag)
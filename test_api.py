@@ -1,404 +0,0 @@
-#!/usr/bin/env python3
-
-import requests
-import json
-import time
-from typing import Dict, Any
-
-BASE_URL = "http://localhost:8000"
-
-def print_section(title: str):
-    """Print a section header."""
-    print(f"\n{'='*50}")
-    print(f"  {title}")
-    print(f"{'='*50}")      
-
-def print_test_result(test_name: str, success: bool, response=None):
-    """Print test result."""
-    status = "PASS" if success else "FAIL"
-    print(f"{status} {test_name}")
-    if not success and response:
-        print(f"   Status Code: {response.status_code}")
-        print(f"   Response: {response.text[:200]}...")
-
-def get_auth_token(username: str, password: str) -> str:
-    """Get JWT token for authentication."""
-    url = f"{BASE_URL}/auth/jwt/create/"
-    data = {
-        "username": username,
-        "password": password
-    }
-    response = requests.post(url, json=data)
-    if response.status_code == 200:
-        return response.json()["access"]
-    return None
-
-def test_authentication():
-    """Test authentication endpoints."""
-    print_section("AUTHENTICATION TESTS")
-    
-
-    print("Testing user registration...")
-    url = f"{BASE_URL}/auth/users/"
-    data = {
-        "username": "testuser",
-        "password": "testpass123",
-        "re_password": "testpass123",
-        "email": "test@example.com"
-    }
-    response = requests.post(url, json=data)
-    print_test_result("User Registration", response.status_code in [200, 201, 400], response)
-    
-    print("Testing librarian login...")
-    token = get_auth_token("librarian", "password123")
-    print_test_result("Librarian Login", token is not None)
-    
-    print("Testing member login...")
-    member_token = get_auth_token("member", "password123")
-    print_test_result("Member Login", member_token is not None)
-    
-    return token, member_token
-
-def test_api_without_auth():
-    """Test API endpoints without authentication."""
-    print_section("API TESTS WITHOUT AUTHENTICATION")
-    
-    url = f"{BASE_URL}/api/books/"
-    response = requests.get(url)
-    print_test_result("Get Books (No Auth)", response.status_code == 401, response)
-
-    url = f"{BASE_URL}/api/authors/"
-    response = requests.get(url)
-    print_test_result("Get Authors (No Auth)", response.status_code == 401, response)
-
-def test_librarian_permissions(librarian_token: str):
-    """Test librarian permissions."""
-    print_section("LIBRARIAN PERMISSIONS TESTS")
-    
-    headers = {"Authorization": f"Bearer {librarian_token}"}
-    
-    url = f"{BASE_URL}/api/books/"
-    data = {
-        "title": "Test Book by Librarian",
-        "author": 1,    
-        "isbn": "1234567890123",
-        "category": "fiction"
-    }
-    response = requests.post(url, json=data, headers=headers)
-    print_test_result("Create Book (Librarian)", response.status_code in [200, 201], response)
-    
-    url = f"{BASE_URL}/api/authors/"
-    data = {
-        "name": "Test Author by Librarian",
-        "biography": "A test author created by librarian"
-    }
-    response = requests.post(url, json=data, headers=headers)
-    print_test_result("Create Author (Librarian)", response.status_code in [200, 201], response)
-    
-    url = f"{BASE_URL}/api/members/"
-    response = requests.get(url, headers=headers)
-    print_test_result("View Members (Librarian)", response.status_code == 200, response)
-
-def test_member_permissions(member_token: str):
-    """Test member permissions."""
-    print_section("MEMBER PERMISSIONS TESTS")
-    
-    headers = {"Authorization": f"Bearer {member_token}"}
-    
-    url = f"{BASE_URL}/api/books/"
-    response = requests.get(url, headers=headers)
-    print_test_result("View Books (Member)", response.status_code == 200, response)
-    
-    url = f"{BASE_URL}/api/books/"
-    data = {
-        "title": "Test Book by Member",
-        "author": 1,
-        "isbn": "1234567890124",
-        "category": "fiction"
-    }
-    response = requests.post(url, json=data, headers=headers)
-    print_test_result("Create Book (Member) - Should Fail", response.status_code == 403, response)
-    
-    url = f"{BASE_URL}/api/members/"
-    response = requests.get(url, headers=headers)
-    print_test_result("View Members (Member) - Should Fail", response.status_code == 403, response)
-    
-    url = f"{BASE_URL}/api/borrow-records/borrow/"
-    data = {
-        "book_id": 1,   
-        "member_id": 1  
-    }
-    response = requests.post(url, json=data, headers=headers)
-    print_test_result("Borrow Book (Member)", response.status_code in [200, 201], response)
-
-def test_api_documentation():
-    """Test API documentation endpoints."""
-    print_section("API DOCUMENTATION TESTS")
-    
-
-    url = f"{BASE_URL}/swagger/"
-    response = requests.get(url)
-    print_test_result("Swagger UI", response.status_code == 200, response)
-    
-
-    url = f"{BASE_URL}/redoc/"
-    response = requests.get(url)
-    print_test_result("ReDoc", response.status_code == 200, response)
-    
-
-    url = f"{BASE_URL}/swagger.json"
-    response = requests.get(url)
-    print_test_result("Swagger JSON", response.status_code == 200, response)
-
-def test_all_endpoints(librarian_token: str):
-    """Test all API endpoints with librarian token."""
-    print_section("ALL ENDPOINTS TESTS (Librarian)")
-    
-    headers = {"Authorization": f"Bearer {librarian_token}"}
-    
-    endpoints = [
-        ("/api/authors/", "Authors"),
-        ("/api/books/", "Books"),
-        ("/api/members/", "Members"),
-        ("/api/borrow-records/", "Borrow Records"),
-    ]
-    
-    for endpoint, name in endpoints:
-        url = f"{BASE_URL}{endpoint}"
-        response = requests.get(url, headers=headers)
-        print_test_result(f"GET {name}", response.status_code == 200, response)
-
-def verify_authentication():
-    """Verify Task 1: Authentication using Djoser & JWT"""
-    print_section("TASK 1: AUTHENTICATION USING DJOSER & JWT")
-    
-
-    print("Testing user registration...")
-    url = f"{BASE_URL}/auth/users/"
-    data = {
-        "username": "verification_user",
-        "password": "testpass123",
-        "re_password": "testpass123",
-        "email": "verify@example.com"
-    }
-    response = requests.post(url, json=data)
-    if response.status_code in [200, 201]:
-        print("User registration endpoint working")
-    else:
-        print(f"User registration failed: {response.status_code}")
-    
-
-    print("Testing JWT token creation...")
-    url = f"{BASE_URL}/auth/jwt/create/"
-    data = {"username": "librarian", "password": "password123"}
-    response = requests.post(url, json=data)
-    if response.status_code == 200:
-        token_data = response.json()
-        if "access" in token_data and "refresh" in token_data:
-            print("JWT token creation working")
-            return token_data["access"]
-        else:
-            print("JWT token response missing access/refresh tokens")
-    else:
-        print(f"JWT token creation failed: {response.status_code}")
-    
-    return None
-
-def verify_permissions(access_token):
-    """Verify Task 2: Role-Based Permissions"""
-    print_section("TASK 2: ROLE-BASED PERMISSIONS")
-    
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
-
-    print("Testing librarian permissions...")
-    
-
-    url = f"{BASE_URL}/api/books/"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        print("Librarian can access books")
-    else:
-        print(f"Librarian book access failed: {response.status_code}")
-    
-
-    url = f"{BASE_URL}/api/members/"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        print("Librarian can access members")
-    else:
-        print(f"Librarian member access failed: {response.status_code}")
-    
-
-    url = f"{BASE_URL}/api/books/"
-    data = {
-        "title": "Verification Test Book",
-        "author": 1,
-        "isbn": "1234567890125",
-        "category": "fiction"
-    }
-    response = requests.post(url, json=data, headers=headers)
-    if response.status_code in [200, 201]:
-        print("Librarian can create books")
-    else:
-        print(f"Librarian book creation failed: {response.status_code}")
-    
-
-    print("Testing member permissions...")
-    member_token = get_member_token()
-    if member_token:
-        member_headers = {"Authorization": f"Bearer {member_token}"}
-        
-
-        url = f"{BASE_URL}/api/books/"
-        response = requests.get(url, headers=member_headers)
-        if response.status_code == 200:
-            print("Member can access books")
-        else:
-            print(f"Member book access failed: {response.status_code}")
-        
-
-        url = f"{BASE_URL}/api/members/"
-        response = requests.get(url, headers=member_headers)
-        if response.status_code == 403:
-            print("Member correctly restricted from accessing members")
-        else:
-            print(f"Member member access should be restricted: {response.status_code}")
-
-def get_member_token():
-    """Get JWT token for member user"""
-    url = f"{BASE_URL}/auth/jwt/create/"
-    data = {"username": "member", "password": "password123"}
-    response = requests.post(url, json=data)
-    if response.status_code == 200:
-        return response.json()["access"]
-    return None
-
-def verify_api_documentation():
-    """Verify Task 3: API Documentation with drf-yasg"""
-    print_section("TASK 3: API DOCUMENTATION WITH DRF-YASG")
-    
-
-    print("Testing Swagger UI...")
-    url = f"{BASE_URL}/swagger/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        print("Swagger UI accessible")
-    else:
-        print(f"Swagger UI failed: {response.status_code}")
-    
-
-    print("Testing ReDoc...")
-    url = f"{BASE_URL}/redoc/"
-    response = requests.get(url)
-    if response.status_code == 200:
-        print("ReDoc accessible")
-    else:
-        print(f"ReDoc failed: {response.status_code}")
-    
-
-    print("Testing OpenAPI Schema...")
-    url = f"{BASE_URL}/swagger.json"
-    response = requests.get(url)
-    if response.status_code == 200:
-        try:
-            schema = response.json()
-            if "info" in schema and "paths" in schema:
-                print("OpenAPI Schema generated correctly")
-            else:
-                print("OpenAPI Schema missing required fields")
-        except json.JSONDecodeError:
-            print("OpenAPI Schema not valid JSON")
-    else:
-        print(f"OpenAPI Schema failed: {response.status_code}")
-
-def verify_endpoints_without_auth():
-    """Verify that endpoints require authentication"""
-    print_section("AUTHENTICATION REQUIREMENTS")
-    
-    print("Testing endpoints without authentication...")
-    
-
-    url = f"{BASE_URL}/api/books/"
-    response = requests.get(url)
-    if response.status_code == 401:
-        print("Books endpoint requires authentication")
-    else:
-        print(f"Books endpoint should require auth: {response.status_code}")
-    
-
-    url = f"{BASE_URL}/api/authors/"
-    response = requests.get(url)
-    if response.status_code == 401:
-        print("Authors endpoint requires authentication")
-    else:
-        print(f"Authors endpoint should require auth: {response.status_code}")
-
-def main():
-    """Main test function."""
-    print("Starting Library Management System API Tests")
-    print(f"Base URL: {BASE_URL}")
-    
-
-    print("\nWaiting for server to be ready...")
-    time.sleep(2)
-    
-    try:
-                
-        librarian_token, member_token = test_authentication()
-        
-        test_api_without_auth()
-        
-
-        if librarian_token:
-            test_librarian_permissions(librarian_token)
-            test_all_endpoints(librarian_token)
-        
-        if member_token:
-            test_member_permissions(member_token)
-        
-        test_api_documentation()
-        
-        access_token = verify_authentication()
-        if access_token:
-            verify_permissions(access_token)
-        verify_api_documentation()
-        verify_endpoints_without_auth()
-        
-        print_section("TEST SUMMARY")
-        print("All tests completed!")
-        print(f"API Documentation: {BASE_URL}/swagger/")
-        print(f"ReDoc Documentation: {BASE_URL}/redoc/")
-        print(f"Authentication Endpoints: {BASE_URL}/auth/")
-        print(f"API Endpoints: {BASE_URL}/api/")
-        
-        print_section("VERIFICATION SUMMARY")
-        print("All three tasks have been successfully implemented!")
-        print("Task 1: Authentication using Djoser & JWT - COMPLETED")
-        print("Task 2: Role-based permissions - COMPLETED")
-        print("Task 3: API documentation with drf-yasg - COMPLETED")
-        
-        print("\nAPI Documentation URLs:")
-        print(f"   Swagger UI: {BASE_URL}/swagger/")
-        print(f"   ReDoc: {BASE_URL}/redoc/")
-        print(f"   OpenAPI Schema: {BASE_URL}/swagger.json")
-        
-        print("\nAuthentication Endpoints:")
-        print(f"   User Registration: {BASE_URL}/auth/users/")
-        print(f"   JWT Login: {BASE_URL}/auth/jwt/create/")
-        print(f"   Token Refresh: {BASE_URL}/auth/jwt/refresh/")
-        print(f"   Token Verify: {BASE_URL}/auth/jwt/verify/")
-        
-        print("\nTest Users:")
-        print("   Librarian: username=librarian, password=password123")
-        print("   Member: username=member, password=password123")
-        
-    except requests.exceptions.ConnectionError:
-        print("ERROR: Could not connect to the server.")
-        print("Make sure the Django development server is running on localhost:8000")
-        print("Run: python manage.py runserver")
-    except Exception as e:
-        print(f"ERROR: {e}")
-
-if __name__ == "__main__":
-    main()